@@ -1,5 +1,7 @@
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
 from src.api.conversation.routers import router as conversation_router
@@ -7,8 +9,35 @@ from src.api.auth.routers import router as auth_router
 from src.api.feedback.routers import router as feedback_router
 from src.api.rag.routers import router as rag_router
 from src.api.similar.routers import router as similar_router
+from src.rag.config import EMBED_WARMUP_ON_STARTUP
+from src.retrieval.model_registry import warmup_models, model_stats
+from src.rag.context_packer import get_tokenizer
+from src.retrieval.clients import init_clients, close_clients, client_stats
+from src.retrieval.index_schema import verify_index_schema
+from src.retrieval.query_cache import get_query_cache
+from src.retrieval.result_cache import get_result_cache
+from src.rag.llm_client import get_llm_client
 
-app = FastAPI(title="LexAI API", version="1.0.0", description="JWT Authenticated API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Embedding modeli ilk /ask isteğinde değil, açılışta bir kez yüklenir
+    if EMBED_WARMUP_ON_STARTUP:
+        await run_in_threadpool(warmup_models)
+    # Bağlam paketleme tokenizer'ı da ilk /ask'te değil açılışta yüklenir (indirme dahil)
+    await run_in_threadpool(get_tokenizer)
+    # OpenSearch / Qdrant bağlantıları istek yolunda değil, burada kurulur
+    await run_in_threadpool(init_clients)
+    # Sorgu alanları ile canlı OpenSearch mapping'i uyuşmuyorsa açılışta dur (OS_SCHEMA_CHECK)
+    await run_in_threadpool(verify_index_schema)
+    await get_llm_client().start()
+    yield
+    await get_llm_client().close()
+    await run_in_threadpool(close_clients)
+    await run_in_threadpool(get_query_cache().persist)
+
+
+app = FastAPI(title="LexAI API", version="1.0.0", description="JWT Authenticated API", lifespan=lifespan)
 
 
 origins = [
@@ -32,6 +61,19 @@ app.include_router(similar_router)
 app.include_router(conversation_router)
 
 
+@app.get("/api/health", tags=["Health"])
+def health():
+    """Servis durumu, yüklü embedding modelleri ve arama istemcilerinin son sağlık kontrolü."""
+    return {
+        "status": "ok",
+        "models": model_stats(),
+        "clients": client_stats(),
+        "query_cache": get_query_cache().stats(),
+        "result_cache": get_result_cache().stats(),
+        "llm": get_llm_client().snapshot(),
+    }
+
+
 def custom_openapi():
     if app.openapi_schema:
         return app.openapi_schema
@@ -1,17 +1,22 @@
 from uuid import uuid4
-from fastapi import APIRouter, Depends, HTTPException
+from types import SimpleNamespace
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
-import logging, re
+import asyncio, json, logging, re, time
+from typing import Literal
 
 from src.api.auth.security import get_current_user
+from src.core.db import SessionLocal
 from src.core.deps import get_db
 from src.models.auth.user_model import User
-from src.retrieval.retrieve_combined import hybrid_search
-from src.rag.prompt_builder import SYSTEM_PROMPT, build_user_prompt
-from src.rag.query_llm import query_llm
-from src.rag.config import MAX_TOTAL_PASSAGES, LLM_MODEL_NAME
-from src.user_input.query_service import process_user_query
+from src.rag.config import LLM_BACKEND, LLM_MODEL_NAME
+from src.rag.prompt_builder import SYSTEM_PROMPT
+from src.rag.query_llm import aquery_llm, astream_llm, clean_response
+from src.rag.llm_client import ClientDisconnected, LLMQueueTimeout, run_until_disconnect
+from src.user_input.query_service import StageTimer, process_user_query, prepare_answer
 from src.models.feedback import feedback_crud
 from src.models.feedback.feedback_schemas import FeedbackCreate
 from src.models.conversation.conversation_crud import (
@@ -46,6 +51,7 @@ class QueryRequest(BaseModel):
     query: str
     topn: int = 8
     session_id: str | None = None
+    fusion: Literal["rrf", "zscore", "weighted"] | None = None   # None → FUSION_METHOD
 
 
 class AskResponse(BaseModel):
@@ -55,62 +61,53 @@ class AskResponse(BaseModel):
     answer_id: str
     feedback_id: str
     session_id: str
+    timings: dict[str, float] = {}
+    retrieval: dict = {}
 
 
-@router.post("/ask", response_model=AskResponse)
-def ask(
-    req: QueryRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-):
-    cleaned_query, precomputed_answer = process_user_query(req.query)
-
-    if not req.session_id:
-        session = create_session(db, user_id=current_user.id, title="Yeni Sohbet")
-        session_id = str(session.id)
-    else:
-        existing = get_session_by_id(db, req.session_id, current_user.id)
-        session_id = str(existing.id) if existing else str(
-            create_session(db, user_id=current_user.id, title="Yeni Sohbet").id
-        )
-
-    user_msg = add_message(
+def _store_answer(db, *, session_id, user_msg, current_user, question, answer, model, meta_info, timings, retrieval=None):
+    assistant_msg = add_message(
         db=db,
         session_id=session_id,
-        sender=SenderType.user,
-        content=cleaned_query,
-        meta_info={"raw_query": req.query},
+        sender=SenderType.assistant,
+        content=answer,
+        meta_info=meta_info,
+    )
+    fb = feedback_crud.create_feedback(
+        db,
+        FeedbackCreate(
+            user_id=current_user.id,
+            question_id=user_msg.id,
+            answer_id=assistant_msg.id,
+            question_text=question,
+            answer_text=answer,
+            vote=None,
+            model=model,
+        ),
+    )
+    return AskResponse(
+        question=question,
+        answer=answer,
+        question_id=str(user_msg.id),
+        answer_id=str(assistant_msg.id),
+        feedback_id=str(fb.id),
+        session_id=session_id,
+        timings=timings,
+        retrieval=retrieval or {},
+    )
+
+
+def _resolve_session(db, req: QueryRequest, current_user) -> str:
+    if not req.session_id:
+        return str(create_session(db, user_id=current_user.id, title="Yeni Sohbet").id)
+    existing = get_session_by_id(db, req.session_id, current_user.id)
+    return str(existing.id) if existing else str(
+        create_session(db, user_id=current_user.id, title="Yeni Sohbet").id
     )
 
-    if precomputed_answer:
-        assistant_msg = add_message(
-            db=db,
-            session_id=session_id,
-            sender=SenderType.assistant,
-            content=precomputed_answer,
-            meta_info={"reason": "precomputed_from_query_service"},
-        )
-        fb = feedback_crud.create_feedback(
-            db,
-            FeedbackCreate(
-                user_id=current_user.id,
-                question_id=user_msg.id,
-                answer_id=assistant_msg.id,
-                question_text=cleaned_query,
-                answer_text=precomputed_answer,
-                vote=None,
-                model="rule-based",
-            ),
-        )
-        return AskResponse(
-            question=cleaned_query,
-            answer=precomputed_answer,
-            question_id=str(user_msg.id),
-            answer_id=str(assistant_msg.id),
-            feedback_id=str(fb.id),
-            session_id=session_id,
-        )
 
+def _conversation_context(db, session_id: str, cleaned_query: str):
+    """Son mesajlardan (konuşma geçmişi, konu ile zenginleştirilmiş arama sorgusu) üretir."""
     history_msgs = get_last_messages(db, session_id=session_id, limit=6)
     conversation_history = [
         {"user": m.content} if m.sender == SenderType.user else {"assistant": m.content}
@@ -128,99 +125,177 @@ def ask(
         context_query = f"{context_topic} {cleaned_query}"
     else:
         context_query = cleaned_query
+    return conversation_history, context_query
 
-    topn = max(1, min(req.topn, 20))
-    hits = hybrid_search(context_query, topn=topn)
-
-    seen, passages = set(), []
-    for h in hits:
-        if h.doc_id in seen:
-            continue
-        payload = dict(h.payload or {})
-        payload["doc_id"] = h.doc_id
-        full_txt = (
-            payload.get("karar_metni")
-            or payload.get("karar_metni_meta")
-            or payload.get("karar_metni_raw")
-            or getattr(h, "text_full", None)
-            or ""
-        ).strip()
-        if not full_txt:
-            continue
-        payload["karar_metni"] = full_txt
-        payload["dava_turu"] = payload.get("dava_turu") or payload.get("dava_turu_norm") or ""
-        payload["karar"] = payload.get("karar") or payload.get("sonuc") or ""
-        payload["karar_preview"] = payload.get("karar_preview") or full_txt[:300]
-        passages.append(payload)
-        seen.add(h.doc_id)
-        if len(passages) >= MAX_TOTAL_PASSAGES:
-            break
-
-    if not passages:
-        raise HTTPException(status_code=404, detail="İlgili karar metni bulunamadı.")
 
-    up_out = build_user_prompt(cleaned_query, passages, conversation_history)
-    user_prompt, early_answer = up_out if isinstance(up_out, tuple) else (up_out, None)
+def _start_turn(db, req: QueryRequest, current_user, cleaned_query: str):
+    session_id = _resolve_session(db, req, current_user)
+    user_msg = add_message(
+        db=db,
+        session_id=session_id,
+        sender=SenderType.user,
+        content=cleaned_query,
+        meta_info={"raw_query": req.query},
+    )
+    return session_id, user_msg
 
-    if early_answer:
-        assistant_msg = add_message(
-            db=db, session_id=session_id, sender=SenderType.assistant, content=early_answer
-        )
-        fb = feedback_crud.create_feedback(
-            db,
-            FeedbackCreate(
-                user_id=current_user.id,
-                question_id=user_msg.id,
-                answer_id=assistant_msg.id,
-                question_text=cleaned_query,
-                answer_text=early_answer,
-                vote=None,
-                model="rule-based",
-            ),
+
+def _prepare(db, session_id: str, cleaned_query: str, topn: int, timer: StageTimer, fusion: str | None = None):
+    with timer.stage("context"):
+        conversation_history, context_query = _conversation_context(db, session_id, cleaned_query)
+    return prepare_answer(
+        cleaned_query,
+        context_query=context_query,
+        conversation_history=conversation_history,
+        topn=max(1, min(topn, 20)),
+        timer=timer,
+        fusion=fusion,
+    )
+
+
+@router.post("/ask", response_model=AskResponse)
+async def ask(
+    req: QueryRequest,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    # DB ve retrieval gibi senkron işler threadpool'da; LLM üretimi event loop'ta beklenir
+    timer = StageTimer()
+    cleaned_query, precomputed_answer, route = process_user_query(req.query, timer)
+    session_id, user_msg = await run_in_threadpool(_start_turn, db, req, current_user, cleaned_query)
+
+    # Selamlama / hukuk dışı sorgular retrieval ve LLM'e hiç uğramaz
+    if precomputed_answer:
+        return await run_in_threadpool(
+            _store_answer,
+            db, session_id=session_id, user_msg=user_msg, current_user=current_user,
+            question=cleaned_query, answer=precomputed_answer, model="rule-based",
+            meta_info={"reason": "precomputed_from_query_service", "route": route},
+            timings=timer.timings,
         )
-        return AskResponse(
-            question=cleaned_query,
-            answer=early_answer,
-            question_id=str(user_msg.id),
-            answer_id=str(assistant_msg.id),
-            feedback_id=str(fb.id),
-            session_id=session_id,
+
+    result = await run_in_threadpool(_prepare, db, session_id, cleaned_query, req.topn, timer, req.fusion)
+
+    if not result.passages:
+        raise HTTPException(status_code=404, detail="İlgili karar metni bulunamadı.")
+
+    if result.user_prompt is None:
+        return await run_in_threadpool(
+            _store_answer,
+            db, session_id=session_id, user_msg=user_msg, current_user=current_user,
+            question=cleaned_query, answer=result.answer, model="rule-based",
+            meta_info={"reason": "rule_based_after_retrieval", "route": result.route},
+            timings=timer.timings, retrieval=result.retrieval,
         )
 
-    ans, _ = query_llm(
-        SYSTEM_PROMPT,
-        user_prompt,
-        return_prompt=True,
-        num_ctx=16384,
-        num_predict=1024,
-    )
+    try:
+        with timer.stage("generate"):
+            ans = await run_until_disconnect(
+                request, aquery_llm(SYSTEM_PROMPT, result.user_prompt, num_ctx=16384, num_predict=1024)
+            )
+    except ClientDisconnected:
+        logger.info("[ask] client disconnected, generation cancelled (session=%s)", session_id)
+        return Response(status_code=499)
+    except LLMQueueTimeout as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    logger.info("[ask] stage timings (ms): %s", timer.timings)
 
-    assistant_msg = add_message(
-        db=db,
-        session_id=session_id,
-        sender=SenderType.assistant,
-        content=ans,
-        meta_info={"model": "llama3:8b", "passage_count": len(passages)},
+    return await run_in_threadpool(
+        _store_answer,
+        db, session_id=session_id, user_msg=user_msg, current_user=current_user,
+        question=cleaned_query, answer=ans, model=LLM_MODEL_NAME,
+        meta_info={
+            "model": LLM_MODEL_NAME, "backend": LLM_BACKEND, "passage_count": len(result.passages),
+            "timings": timer.timings, "retrieval": result.retrieval,
+        },
+        timings=timer.timings,
+        retrieval=result.retrieval,
     )
 
-    fb = feedback_crud.create_feedback(
-        db,
-        FeedbackCreate(
-            user_id=current_user.id,
-            question_id=user_msg.id,
-            answer_id=assistant_msg.id,
-            question_text=cleaned_query,
-            answer_text=ans,
-            vote=None,
-            model=LLM_MODEL_NAME,
-        ),
-    )
 
-    return AskResponse(
-        question=cleaned_query,
-        answer=ans,
-        question_id=str(user_msg.id),
-        answer_id=str(assistant_msg.id),
-        feedback_id=str(fb.id),
-        session_id=session_id,
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+@router.post("/ask/stream")
+async def ask_stream(
+    req: QueryRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    /ask'in server-sent events (SSE) karşılığı. Olay sırası:
+      cases → bulunan karar id'leri (retrieval biter bitmez)
+      token → LLM'den gelen her metin parçası
+      done  → temizlenmiş nihai cevap + question/answer/feedback id'leri
+      error → üretim sırasında hata
+    Kural tabanlı cevaplar doğrudan tek bir "done" olayı olarak döner.
+    İstemci bağlantıyı koparırsa akış iptal edilir ve Ollama üretimi durur.
+    """
+    timer = StageTimer()
+    t_start = time.perf_counter()
+    cleaned_query, precomputed_answer, route = process_user_query(req.query, timer)
+    session_id, user_msg = await run_in_threadpool(_start_turn, db, req, current_user, cleaned_query)
+    user_id, user_msg_id = current_user.id, user_msg.id
+
+    result = None
+    if not precomputed_answer:
+        result = await run_in_threadpool(_prepare, db, session_id, cleaned_query, req.topn, timer, req.fusion)
+        if not result.passages:
+            raise HTTPException(status_code=404, detail="İlgili karar metni bulunamadı.")
+
+    def _finish(answer: str, model: str, meta_info) -> dict:
+        # Akış sırasında istek kapsamındaki oturum kapanmış olabilir; kayıt için ayrı oturum aç
+        with SessionLocal() as sdb:
+            resp = _store_answer(
+                sdb, session_id=session_id, user_msg=SimpleNamespace(id=user_msg_id),
+                current_user=SimpleNamespace(id=user_id), question=cleaned_query, answer=answer,
+                model=model, meta_info=meta_info, timings=timer.timings,
+                retrieval=result.retrieval if result else None,
+            )
+        return resp.model_dump()
+
+    async def events():
+        if precomputed_answer or result.user_prompt is None:
+            answer = precomputed_answer or result.answer
+            # LLM'e gidilmedi: retrieval sonrası kural cevabında gerçek rota result.route'tur
+            meta = {"route": route if precomputed_answer else result.route}
+            yield _sse("done", await run_in_threadpool(_finish, answer, "rule-based", meta))
+            return
+
+        yield _sse("cases", {
+            "session_id": session_id,
+            "question_id": str(user_msg_id),
+            "doc_ids": [p["doc_id"] for p in result.passages],
+        })
+
+        parts = []
+        t_gen = time.perf_counter()
+        try:
+            async for piece in astream_llm(SYSTEM_PROMPT, result.user_prompt, num_ctx=16384, num_predict=1024):
+                if not parts:
+                    timer.timings["ttft"] = round((time.perf_counter() - t_start) * 1000, 1)
+                parts.append(piece)
+                yield _sse("token", {"t": piece})
+        except asyncio.CancelledError:
+            logger.info("[ask/stream] client disconnected, generation cancelled (session=%s)", session_id)
+            raise
+        except Exception as e:
+            logger.exception("[ask/stream] generation failed")
+            yield _sse("error", {"detail": str(e)})
+            return
+        timer.timings["generate"] = round((time.perf_counter() - t_gen) * 1000, 1)
+
+        answer = clean_response("".join(parts))
+        yield _sse("done", await run_in_threadpool(_finish, answer, LLM_MODEL_NAME, {
+            "model": LLM_MODEL_NAME, "backend": LLM_BACKEND, "passage_count": len(result.passages),
+            "timings": timer.timings, "retrieval": result.retrieval, "stream": True,
+        }))
+        logger.info("[ask/stream] stage timings (ms): %s", timer.timings)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
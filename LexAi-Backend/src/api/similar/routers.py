@@ -21,7 +21,7 @@ def analyze_similar_cases(
 ):
     """
     🔹 Kullanıcının girdiği metne göre hibrit arama (Qdrant + OpenSearch) yapar.
-    🔹 En benzer davaları `karar_metni_meta` (tam karar metni) ile birlikte döner.
+    🔹 En benzer davaları tam karar metni (`karar_metni`) ile birlikte döner.
     🔹 Ayrıca bu davalardan çıkan kanun atıflarını derleyip `related_laws` içinde döner.
 
     ---
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Literal, Optional
 from pydantic import BaseModel
 from datetime import datetime
 
@@ -7,6 +7,7 @@ class SimilarRequest(BaseModel):
     query: str
     topn: int = 5
     include_summaries: bool = True
+    fusion: Optional[Literal["rrf", "zscore", "weighted"]] = None   # None → FUSION_METHOD
 
 
 class CaseItem(BaseModel):
@@ -33,3 +34,4 @@ class SimilarResponse(BaseModel):
     related_laws: List[LawItem]
     total_cases_found: int
     timestamp: datetime
+    retrieval: Dict[str, Any] = {}   # bacak bazında retrieval süreleri / durumları
@@ -1,6 +1,7 @@
 from datetime import datetime
 from typing import List, Any
-from src.retrieval.retrieve_combined import hybrid_search
+from src.retrieval.index_schema import FULL_TEXT_FIELD, PREVIEW_FIELD, QDRANT_FULL_TEXT_FIELD
+from src.retrieval.retrieve_combined import hybrid_search_with_meta
 from src.models.similar.similar_schemas import (
     SimilarRequest,
     SimilarResponse,
@@ -19,7 +20,7 @@ def _as_text(value: Any) -> str:
 
 
 def find_similar_and_laws(request: SimilarRequest) -> SimilarResponse:
-    hits = hybrid_search(query=request.query, topn=request.topn)
+    hits, retrieval_meta = hybrid_search_with_meta(query=request.query, topn=request.topn, fusion=request.fusion)
 
     similar_cases: List[CaseItem] = []
     for h in hits:
@@ -31,7 +32,7 @@ def find_similar_and_laws(request: SimilarRequest) -> SimilarResponse:
             gerekce=_as_text(p.get("gerekce")) if request.include_summaries else None,
             karar=_as_text(p.get("karar")) if request.include_summaries else None,
             karar_metni=_as_text(
-                p.get("karar_metni_meta") or p.get("karar_metni") or p.get("karar_preview")
+                p.get(QDRANT_FULL_TEXT_FIELD) or p.get(FULL_TEXT_FIELD) or p.get(PREVIEW_FIELD)
             ),  # 🔹 tam karar metnini ekliyoruz
             hikaye=_as_text(p.get("hikaye")) if request.include_summaries else None,
             similarity_score=round(float(h.score_norm), 4),
@@ -57,4 +58,5 @@ def find_similar_and_laws(request: SimilarRequest) -> SimilarResponse:
         related_laws=related_laws,
         total_cases_found=len(similar_cases),
         timestamp=datetime.utcnow(),
+        retrieval=retrieval_meta,
     )
@@ -16,24 +16,93 @@ OS_INDEX = "lexai_cases"
 
 QDRANT_HOST = "localhost"
 QDRANT_PORT = 6333
+QDRANT_GRPC_PORT = 6334
+QDRANT_PREFER_GRPC = True
 QDRANT_COLLECTION = "lexai_cases"
 
+# ======================================
+# 🔌 İstemci havuzu (OpenSearch + Qdrant)
+# ======================================
+OS_POOL_MAXSIZE = 20               # OpenSearch HTTP bağlantı havuzu boyutu
+OS_TIMEOUT = 60                    # OpenSearch istek zaman aşımı (saniye)
+OS_MAX_RETRIES = 2                 # Bağlantı hatasında OpenSearch yeniden deneme sayısı
+OS_SCHEMA_CHECK = "fail"           # Açılışta mapping kontrolü (index_schema): "fail" | "warn" | "off"
+OS_SYNONYMS_FILE = "configs/synonyms.yml"  # Arama analizörü eş anlamlı grupları (index_schema; göreli yol LexAi-Backend köküne göre)
+OS_MIN_SHOULD_MATCH = "3<75%"      # BM25: 3 terime kadar hepsi, fazlasında %75 eşleşmeli ("and" yerine)
+QDRANT_POOL_MAXSIZE = 20           # Qdrant HTTP (REST) bağlantı havuzu boyutu
+QDRANT_TIMEOUT = 60.0              # Qdrant istek zaman aşımı (saniye)
+QDRANT_KEEPALIVE_SEC = 30          # gRPC keep-alive ping / HTTP keep-alive süresi
+CLIENT_HEALTHCHECK_INTERVAL = 30   # Arka plan sağlık kontrolü aralığı (saniye, 0=kapalı)
+
 
 EMBED_MODEL_NAME = "BAAI/bge-m3"   # Sentence embedding modeli
+EMBED_WARMUP_ON_STARTUP = True     # API açılışında embedding modelini yükleyip ısıt
+EMBED_BACKEND = "torch"            # "torch" | "onnx" | "onnx-int8" (ONNX yalnızca CPU; önce onnx_embedder kalite kontrolü)
+ONNX_CACHE_DIR = "data/models/onnx"  # ONNX export / int8 model önbelleği
+
+QUERY_CACHE_SIZE = 2048            # Sorgu vektörü LRU önbelleği kapasitesi
+QUERY_CACHE_TTL = None             # Girdi ömrü (saniye); None = süresiz
+QUERY_CACHE_SHELF = None           # Örn. "data/cache/query_vectors" → yeniden başlatmada sıcak başlangıç
+QUERY_CACHE_SHELF_MAX = 5000       # Diske yazılacak en fazla sorgu vektörü
 
 
-MAX_PASSAGE_CHARS = 5000           # Her pasajdan LLM'e en fazla kaç karakter verilecek
+MAX_PASSAGE_CHARS = 3000           # Her karardan LLM'e verilecek sorguya duyarlı özün en fazla uzunluğu (karakter)
+SLICE_ENABLED = True               # Karar metinlerini baştan kesmek yerine sorguya göre dilimle
+SLICE_UNIT_CHARS = 400             # Dilimleme birimi: ardışık cümlelerden ~bu uzunlukta parçalar
+SLICE_MAX_UNITS = 48               # Karar başına en fazla birim (uzun metinlerde birim boyu büyür)
+SLICE_ENCODE_PER_HIT = 6           # Karar başına encode edilecek en fazla birim (sözcük örtüşmesiyle ön seçilir)
+SLICE_ENCODE_BUDGET = 24           # İstek başına encode edilecek toplam birim sınırı
+SLICE_ENCODE_BUDGET_CHARS = 12000  # İstek başına encode edilecek toplam karakter sınırı
+
+QDRANT_CHUNKED = False             # True: Qdrant'ta karar başına tek vektör yerine örtüşen parça (chunk) vektörleri
+CHUNK_CHARS = 1500                 # Parça uzunluğu (karakter)
+CHUNK_OVERLAP = 300                # Ardışık parçaların örtüşmesi (karakter)
+CHUNK_MAX_PER_DOC = 32             # Karar başına en fazla parça
+CHUNK_POOLING = "max"              # Parça skorlarını karara indirgeme: "max" | "sum"
+CHUNK_OVERFETCH = 4                # Parça modunda Qdrant'tan TOP_K_QDRANT * bu kadar parça çekilir
+
+QDRANT_QUANT_MODE = "rescore"      # "ignore" (float32 tam vektör) | "rescore" (int8 + oversampling + float yeniden skor) | "quantized" (yalnız int8)
+QDRANT_QUANT_OVERSAMPLING = 2.0    # rescore modunda int8 aşamasında limit × bu kadar aday çekilir
+QDRANT_QUANT_ALWAYS_RAM = True     # int8 vektörler RAM'de tutulsun (koleksiyon ayarı; mevcut koleksiyonda güncellenir)
 MAX_TOTAL_PASSAGES = 8             # LLM'e en fazla kaç pasaj gönderilecek
+CONTEXT_TOKEN_BUDGET = 6000        # Prompt'taki karar metinleri için toplam token bütçesi
+PASSAGE_TOKEN_BUDGET = 1500        # Tek bir karar için en fazla token (HÜKÜM/gerekçe dilimlerine kırpılır)
+LLM_TOKENIZER_NAME = None          # Token sayımı için HF tokenizer; None → LLM_MODEL_NAME'den türetilir (yüklenemezse karakter tahmini)
+CHARS_PER_TOKEN = 3.0              # Tokenizer yoksa Türkçe metin için karakter/token tahmini
 
 
 
 TOP_K_OS = 50                      # OpenSearch’ten kaç sonuç alınsın
 TOP_K_QDRANT = 50                  # Qdrant’tan kaç sonuç alınsın
 MMR_LAMBDA = 0.7                   # MMR denge katsayısı (0=çeşitlilik, 1=benzerlik)
+MMR_MAX_CANDIDATES = 50            # MMR'a girecek en fazla aday (vektörleştirilmiş MMR binlerce adayı kaldırır)
 DEFAULT_TOPN = 8                   # Kullanıcıya gösterilecek sonuç sayısı
+FUSION_METHOD = "rrf"              # BM25 + dense birleştirme: "rrf" | "zscore" | "weighted" (istek başına değiştirilebilir)
+FUSION_WEIGHTS = {"qdrant": 0.75, "opensearch": 0.25}  # Kaynak ağırlıkları (rrf / zscore / weighted)
+RRF_K = 60                         # RRF sabiti: 1 / (RRF_K + sıra)
+OS_LEG_TIMEOUT = 3.0               # BM25 bacağı için süre sınırı (saniye); aşılırsa yalnız dense sonuç
+QDRANT_LEG_TIMEOUT = 5.0           # Dense bacak (sorgu encode + Qdrant) için süre sınırı (saniye)
+RETRIEVAL_LEG_WORKERS = 8          # Bacakları eşzamanlı çalıştıran thread sayısı
+
+RESULT_CACHE_ENABLED = True        # hybrid_search sonuç önbelleği
+RESULT_CACHE_BACKEND = "memory"    # "memory" (süreç içi LRU) | "shared" (RESULT_CACHE_URL, yoksa bellek içi KV)
+RESULT_CACHE_URL = None            # Örn. "redis://localhost:6379/0" (shared backend için)
+RESULT_CACHE_SIZE = 1024           # Süreç içi önbellek kapasitesi
+RESULT_CACHE_TTL = 6 * 3600        # Girdi ömrü (saniye)
+QDRANT_META_COLLECTION = "lexai_meta"   # İndeks nesil sayaçlarının tutulduğu yan koleksiyon
+INDEX_VERSION_CHECK_INTERVAL = 30  # İndeks sürümü en fazla kaç saniyede bir kontrol edilsin
+REINDEX_KEEP_VERSIONS = 2          # Blue/green: canlı + geri dönüş için saklanan önceki sürüm sayısı (toplam)
+REINDEX_MIN_COUNT_RATIO = 0.95     # Yeni sürüm belge sayısı ≥ canlı × bu oran olmadan alias taşınmaz
+REINDEX_MIN_SAMPLE_HIT_RATE = 0.8  # Örnek sorguların en az bu oranı sonuç dönmeli
 
 
-LLM_BACKEND = "ollama"             # "ollama", "openai", "vllm" vb. olabilir
-LLM_MODEL_NAME = "qwen2.5:7b-instruct"         # Ollama'da yüklü model adı
-LLM_BASE_URL = "http://localhost:11434"  # LLM API endpoint
-LLM_TIMEOUT = 60                   # İstek zaman aşımı (saniye)
\ No newline at end of file
+LLM_BACKEND = "ollama"             # "ollama" | "openai" (chat-completions) | "vllm" (OpenAI uyumlu + toplu üretim)
+LLM_MODEL_NAME = "qwen2.5:7b-instruct"         # Arka uçta yüklü model adı
+LLM_BASE_URL = "http://localhost:11434"  # LLM API endpoint (openai/vllm için /v1 eklenir)
+LLM_API_KEY = None                 # OpenAI uyumlu sunucular için Bearer anahtarı
+LLM_TIMEOUT = 120                  # İstek zaman aşımı (saniye); tek parça cevapta tüm üretimi kapsar
+LLM_MAX_CONCURRENCY = 2            # Aynı anda LLM'e giden üretim sayısı (Ollama OLLAMA_NUM_PARALLEL ile eşleşmeli)
+LLM_POOL_MAXSIZE = 16              # LLM HTTP bağlantı havuzu boyutu
+LLM_QUEUE_TIMEOUT = 120            # Üretim yuvası için en fazla bekleme (saniye); aşılırsa 503
+LLM_BATCH_MAX = 8                  # vllm: tek /v1/completions çağrısında birleştirilecek en fazla prompt
+LLM_BATCH_WINDOW_MS = 20           # vllm: eşzamanlı istekleri toplamak için bekleme penceresi (ms)
\ No newline at end of file
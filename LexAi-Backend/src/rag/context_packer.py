@@ -0,0 +1,174 @@
+"""
+context_packer.py
+-----------------
+Karar metinlerini token bütçesine göre prompt'a yerleştirir.
+
+- Token sayımı LLM_MODEL_NAME'in tokenizer'ı ile yapılır (LLM_TOKENIZER_NAME boşsa
+  model adından türetilir; verilmişse modelle uyuşmadığında açılışta uyarılır).
+  Tokenizer yüklenemezse CHARS_PER_TOKEN üzerinden (temkinli) karakter tahminine düşülür.
+- Pasajlar alaka skoruna ("score") göre sıralanır ve bütçe dolana kadar eklenir.
+- PASSAGE_TOKEN_BUDGET'ı aşan kararlar slices_utils.extract_key_slices ile
+  HÜKÜM / baş / son dilimlerine indirilir; hâlâ sığmıyorsa token sınırında kesilir.
+
+Kullanım:
+    packed = pack_passages(texts_with_scores)
+    packed.texts, packed.tokens_used
+"""
+from __future__ import annotations
+
+import logging
+import math
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from src.rag.config import (
+    CONTEXT_TOKEN_BUDGET, PASSAGE_TOKEN_BUDGET, MAX_TOTAL_PASSAGES, LLM_TOKENIZER_NAME, CHARS_PER_TOKEN,
+    LLM_MODEL_NAME,
+)
+from src.rag.slices_utils import extract_key_slices
+
+logger = logging.getLogger("uvicorn.error")
+
+MIN_PASSAGE_TOKENS = 80   # bundan az yer kaldıysa yeni pasaj eklenmez
+SLICE_SEP = " … "
+
+# Ollama model ailesi → aynı tokenizer'ı kullanan HF deposu (ailenin boyutları tokenizer'ı paylaşır)
+_OLLAMA_TOKENIZERS: Dict[str, str] = {
+    "qwen2.5": "Qwen/Qwen2.5-7B-Instruct",
+    "qwen2": "Qwen/Qwen2-7B-Instruct",
+    "llama3.1": "meta-llama/Llama-3.1-8B-Instruct",
+    "mistral": "mistralai/Mistral-7B-Instruct-v0.3",
+}
+
+_tokenizer: Any = None
+_tokenizer_name: Optional[str] = None
+_tokenizer_loaded = False
+_lock = threading.Lock()
+
+
+def tokenizer_for_model(model: str) -> Optional[str]:
+    """Model adından HF tokenizer: HF deposu (vllm/openai) aynen, Ollama etiketi aile tablosundan."""
+    if "/" in model:
+        return model
+    return _OLLAMA_TOKENIZERS.get(model.split(":", 1)[0].lower())
+
+
+def _tokenizer_family(name: str) -> str:
+    """Qwen/Qwen2.5-14B-Instruct → qwen2.5-instruct (boyut tokenizer'ı değiştirmez)."""
+    base = name.rsplit("/", 1)[-1].lower()
+    return re.sub(r"-\d+(\.\d+)?b(?=-|$)", "", base)
+
+
+def resolve_tokenizer_name(model: str = LLM_MODEL_NAME, configured: Optional[str] = LLM_TOKENIZER_NAME) -> Optional[str]:
+    """
+    Kullanılacak tokenizer adı. configured boşsa modelden türetilir; verilmişse ve
+    modelin ailesiyle uyuşmuyorsa uyarılır (token bütçesi yanlış sayılır).
+    """
+    derived = tokenizer_for_model(model)
+    if not configured:
+        if derived is None:
+            logger.warning("[context_packer] %s için tokenizer türetilemedi; LLM_TOKENIZER_NAME verin "
+                           "(şimdilik karakter tahmini)", model)
+        return derived
+    if derived is not None and _tokenizer_family(configured) != _tokenizer_family(derived):
+        logger.warning("[context_packer] LLM_TOKENIZER_NAME=%s, LLM_MODEL_NAME=%s ile uyuşmuyor (beklenen %s); "
+                       "token bütçesi yanlış sayılabilir", configured, model, derived)
+    return configured
+
+
+def get_tokenizer() -> Optional[Any]:
+    """HF tokenizer'ı bir kez yüklemeyi dener; başarısızsa None (karakter tahmini)."""
+    global _tokenizer, _tokenizer_name, _tokenizer_loaded
+    if _tokenizer_loaded:
+        return _tokenizer
+    with _lock:
+        if not _tokenizer_loaded:
+            name = resolve_tokenizer_name()
+            _tokenizer = None
+            if name is not None:
+                try:
+                    from transformers import AutoTokenizer
+                    _tokenizer, _tokenizer_name = AutoTokenizer.from_pretrained(name), name
+                except Exception as e:
+                    logger.warning("[context_packer] tokenizer %s yüklenemedi, karakter tahmini kullanılacak: %s",
+                                   name, e)
+            _tokenizer_loaded = True
+    return _tokenizer
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    tok = get_tokenizer()
+    if tok is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(tok.encode(text, add_special_tokens=False))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    if max_tokens <= 0 or not text:
+        return ""
+    tok = get_tokenizer()
+    if tok is None:
+        return text[: int(max_tokens * CHARS_PER_TOKEN)]
+    ids = tok.encode(text, add_special_tokens=False)
+    if len(ids) <= max_tokens:
+        return text
+    return tok.decode(ids[:max_tokens], skip_special_tokens=True)
+
+
+def fit_passage(text: str, max_tokens: int) -> Tuple[str, int]:
+    """Metni max_tokens'a sığdırır → (metin, token sayısı)."""
+    n = count_tokens(text)
+    if n <= max_tokens:
+        return text, n
+    sliced = SLICE_SEP.join(extract_key_slices(text))
+    n = count_tokens(sliced)
+    if n > max_tokens:
+        sliced = truncate_tokens(sliced, max_tokens)
+        n = count_tokens(sliced)
+    return sliced, n
+
+
+@dataclass
+class PackedContext:
+    texts: List[str] = field(default_factory=list)
+    tokens_used: int = 0
+    budget: int = CONTEXT_TOKEN_BUDGET
+    trimmed: int = 0
+    dropped: int = 0
+    tokenizer: str = "chars"
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "passages": len(self.texts), "tokens_used": self.tokens_used, "budget": self.budget,
+            "trimmed": self.trimmed, "dropped": self.dropped, "tokenizer": self.tokenizer,
+        }
+
+
+def pack_passages(
+    items: Sequence[Tuple[str, float]],
+    budget: int = CONTEXT_TOKEN_BUDGET,
+    per_passage: int = PASSAGE_TOKEN_BUDGET,
+    max_passages: int = MAX_TOTAL_PASSAGES,
+) -> PackedContext:
+    """
+    items: (metin, skor) çiftleri. Skora göre azalan sırada (eşitlikte gelen sırada)
+    bütçe dolana kadar doldurur.
+    """
+    packed = PackedContext(budget=budget, tokenizer=_tokenizer_name if get_tokenizer() is not None else "chars")
+    order = sorted(range(len(items)), key=lambda i: -float(items[i][1] or 0.0))
+    for i in order:
+        text = (items[i][0] or "").replace("\n", " ").strip()
+        remaining = budget - packed.tokens_used
+        if not text or len(packed.texts) >= max_passages or remaining < MIN_PASSAGE_TOKENS:
+            packed.dropped += 1
+            continue
+        fitted, n = fit_passage(text, min(per_passage, remaining))
+        if fitted != text:
+            packed.trimmed += 1
+        packed.texts.append(fitted)
+        packed.tokens_used += n
+    return packed
@@ -0,0 +1,245 @@
+"""
+llm_backends.py
+---------------
+config.LLM_BACKEND / LLM_MODEL_NAME / LLM_BASE_URL ile seçilen LLM arka uçları.
+
+    "ollama" → OllamaBackend        (/api/generate, ham ChatML prompt)
+    "openai" → OpenAICompatBackend  (/v1/chat/completions)
+    "vllm"   → OpenAICompatBackend  (+ /v1/completions üzerinden toplu (batched) üretim;
+                                     vLLM continuous batching ile aynı anda işler)
+
+Tüm arka uçlar aynı LLMRequest'i alır: hem ChatML'e çevrilmiş `prompt`, hem de
+`messages` listesi taşınır; her arka uç kendi API'sine uygun olanı kullanır.
+Örnekleme ayarları Ollama "options" sözlüğü biçimindedir (num_predict, num_ctx, ...);
+OpenAI uyumlu arka uç bunları karşılıklarına çevirir.
+"""
+from __future__ import annotations
+
+import json
+import threading
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+
+from src.rag.config import (
+    LLM_BACKEND, LLM_MODEL_NAME, LLM_BASE_URL, LLM_API_KEY, LLM_POOL_MAXSIZE, LLM_TIMEOUT,
+)
+
+
+@dataclass
+class LLMRequest:
+    prompt: str
+    messages: List[Dict[str, str]]
+    options: Dict[str, Any] = field(default_factory=dict)
+    model: Optional[str] = None
+
+
+class LLMBackend:
+    name = "base"
+    supports_batching = False
+
+    def __init__(self, base_url: str, model: str, timeout: float = LLM_TIMEOUT, pool_maxsize: int = LLM_POOL_MAXSIZE):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.timeout = timeout
+        self.pool_maxsize = pool_maxsize
+        self._client: Optional[httpx.AsyncClient] = None
+        self._sync_client: Optional[httpx.Client] = None
+        self._sync_lock = threading.Lock()
+
+    def _headers(self) -> Dict[str, str]:
+        return {}
+
+    def _client_kwargs(self) -> Dict[str, Any]:
+        return dict(
+            base_url=self.base_url,
+            headers=self._headers(),
+            timeout=httpx.Timeout(self.timeout, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=self.pool_maxsize,
+                max_keepalive_connections=self.pool_maxsize,
+                keepalive_expiry=60.0,
+            ),
+        )
+
+    async def start(self) -> None:
+        if self._client is None:
+            self._client = httpx.AsyncClient(**self._client_kwargs())
+
+    def sync_client(self) -> httpx.Client:
+        """Senkron çağrılar (query_llm) için kalıcı havuzlu istemci; ilk kullanımda kurulur."""
+        if self._sync_client is None:
+            with self._sync_lock:
+                if self._sync_client is None:
+                    self._sync_client = httpx.Client(**self._client_kwargs())
+        return self._sync_client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._sync_client is not None:
+            self._sync_client.close()
+            self._sync_client = None
+
+    async def generate(self, req: LLMRequest) -> str:
+        raise NotImplementedError
+
+    async def generate_batch(self, reqs: List[LLMRequest]) -> List[str]:
+        """Toplu üretim desteklemeyen arka uçlar için: tek tek üret."""
+        return [await self.generate(r) for r in reqs]
+
+    def stream(self, req: LLMRequest) -> AsyncIterator[str]:
+        raise NotImplementedError
+
+    def generate_sync(self, req: LLMRequest) -> str:
+        raise NotImplementedError
+
+    @staticmethod
+    def _raise_for_status(status: int, body: str) -> None:
+        if status >= 400:
+            raise RuntimeError(f"LLM generate error: {status}\nDetail: {body}")
+
+
+# ==================== Ollama ====================
+
+class OllamaBackend(LLMBackend):
+    name = "ollama"
+
+    def _payload(self, req: LLMRequest, stream: bool) -> Dict[str, Any]:
+        return {"model": req.model or self.model, "prompt": req.prompt, "stream": stream, "options": req.options}
+
+    async def generate(self, req: LLMRequest) -> str:
+        await self.start()
+        r = await self._client.post("/api/generate", json=self._payload(req, False))
+        self._raise_for_status(r.status_code, r.text)
+        return (r.json().get("response") or "").strip()
+
+    async def stream(self, req: LLMRequest) -> AsyncIterator[str]:
+        await self.start()
+        async with self._client.stream("POST", "/api/generate", json=self._payload(req, True)) as r:
+            if r.status_code >= 400:
+                self._raise_for_status(r.status_code, (await r.aread()).decode(errors="ignore"))
+            async for line in r.aiter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise RuntimeError(f"Ollama generate error: {chunk['error']}")
+                piece = chunk.get("response") or ""
+                if piece:
+                    yield piece
+                if chunk.get("done"):
+                    break
+
+    def generate_sync(self, req: LLMRequest) -> str:
+        r = self.sync_client().post("/api/generate", json=self._payload(req, False))
+        self._raise_for_status(r.status_code, r.text)
+        return (r.json().get("response") or "").strip()
+
+
+# ==================== OpenAI uyumlu (OpenAI / vLLM / Ollama /v1) ====================
+
+class OpenAICompatBackend(LLMBackend):
+    name = "openai"
+
+    def __init__(self, base_url: str, model: str, api_key: Optional[str] = None, batching: bool = False, **kw: Any):
+        base = base_url.rstrip("/")
+        super().__init__(base if base.endswith("/v1") else base + "/v1", model, **kw)
+        self.api_key = api_key
+        self.supports_batching = batching
+        # top_k / repetition_penalty vLLM ek parametreleridir; OpenAI bilinmeyen alanı 400 ile reddeder
+        self.extra_sampling = batching
+        if batching:
+            self.name = "vllm"
+
+    def _headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+
+    def _sampling(self, options: Dict[str, Any]) -> Dict[str, Any]:
+        """Ollama options → OpenAI alanları; top_k / repetition_penalty yalnızca extra_sampling ile (vLLM)."""
+        body: Dict[str, Any] = {
+            "max_tokens": options.get("num_predict", 1024),
+            "temperature": options.get("temperature", 0.2),
+            "top_p": options.get("top_p", 0.8),
+        }
+        if options.get("stop"):
+            body["stop"] = options["stop"]
+        if not self.extra_sampling:
+            return body
+        if options.get("top_k") is not None:
+            body["top_k"] = options["top_k"]
+        if options.get("repeat_penalty") is not None:
+            body["repetition_penalty"] = options["repeat_penalty"]
+        return body
+
+    def _chat_body(self, req: LLMRequest, stream: bool) -> Dict[str, Any]:
+        return {"model": req.model or self.model, "messages": req.messages, "stream": stream, **self._sampling(req.options)}
+
+    async def generate(self, req: LLMRequest) -> str:
+        await self.start()
+        r = await self._client.post("/chat/completions", json=self._chat_body(req, False))
+        self._raise_for_status(r.status_code, r.text)
+        return (r.json()["choices"][0]["message"].get("content") or "").strip()
+
+    async def generate_batch(self, reqs: List[LLMRequest]) -> List[str]:
+        """
+        Aynı örnekleme ayarlarına sahip istekleri tek bir /v1/completions çağrısında gönderir
+        (prompt listesi). Prompt'lar zaten ChatML şablonuna çevrilmiş durumdadır.
+        """
+        if not self.supports_batching:
+            return await super().generate_batch(reqs)
+        return await self._complete(reqs)
+
+    async def _complete(self, reqs: List[LLMRequest]) -> List[str]:
+        await self.start()
+        body = {
+            "model": reqs[0].model or self.model,
+            "prompt": [r.prompt for r in reqs],
+            **self._sampling(reqs[0].options),
+        }
+        r = await self._client.post("/completions", json=body)
+        self._raise_for_status(r.status_code, r.text)
+        out = [""] * len(reqs)
+        for ch in r.json().get("choices", []):
+            out[int(ch.get("index", 0))] = (ch.get("text") or "").strip()
+        return out
+
+    async def stream(self, req: LLMRequest) -> AsyncIterator[str]:
+        await self.start()
+        async with self._client.stream("POST", "/chat/completions", json=self._chat_body(req, True)) as r:
+            if r.status_code >= 400:
+                self._raise_for_status(r.status_code, (await r.aread()).decode(errors="ignore"))
+            async for line in r.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                chunk = json.loads(data)
+                for ch in chunk.get("choices", []):
+                    piece = (ch.get("delta") or {}).get("content") or ""
+                    if piece:
+                        yield piece
+
+    def generate_sync(self, req: LLMRequest) -> str:
+        r = self.sync_client().post("/chat/completions", json=self._chat_body(req, False))
+        self._raise_for_status(r.status_code, r.text)
+        return (r.json()["choices"][0]["message"].get("content") or "").strip()
+
+
+def build_backend(
+    kind: str = LLM_BACKEND,
+    base_url: str = LLM_BASE_URL,
+    model: str = LLM_MODEL_NAME,
+    api_key: Optional[str] = LLM_API_KEY,
+) -> LLMBackend:
+    kind = (kind or "ollama").lower()
+    if kind == "ollama":
+        return OllamaBackend(base_url, model)
+    if kind == "openai":
+        return OpenAICompatBackend(base_url, model, api_key=api_key, batching=False)
+    if kind == "vllm":
+        return OpenAICompatBackend(base_url, model, api_key=api_key, batching=True)
+    raise ValueError("LLM_BACKEND 'ollama' | 'openai' | 'vllm' olmalı")
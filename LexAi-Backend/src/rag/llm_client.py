@@ -0,0 +1,247 @@
+"""
+llm_client.py
+-------------
+Seçili LLM arka ucu (llm_backends.py) önünde duran asenkron istemci.
+
+- Kalıcı bağlantı havuzu arka uçta tutulur — her çağrıda yeni bağlantı açılmaz
+- Sunucunun paralelliğine eşit sınırlı semafor (LLM_MAX_CONCURRENCY);
+  fazlası kuyrukta bekler, kuyruk süresi ölçülür
+- İstek iptali: HTTP istemcisi bağlantıyı koparırsa üretim görevi iptal edilir,
+  httpx bağlantıyı kapatır ve sunucu üretimi durdurur
+- Toplu üretim (vllm): LLM_BATCH_WINDOW_MS içinde gelen eşzamanlı istekler
+  RequestCoalescer ile tek /v1/completions çağrısında birleştirilir
+
+Üretim event loop'ta beklendiği için yavaş bir cevap, /conversation ve /auth
+isteklerine hizmet eden threadpool'u meşgul etmez.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Dict, List, Optional, Tuple, TypeVar
+
+from fastapi import Request
+
+from src.rag.config import LLM_MAX_CONCURRENCY, LLM_QUEUE_TIMEOUT, LLM_BATCH_MAX, LLM_BATCH_WINDOW_MS
+from src.rag.llm_backends import LLMBackend, LLMRequest, build_backend
+
+logger = logging.getLogger("uvicorn.error")
+
+T = TypeVar("T")
+
+
+class LLMQueueTimeout(RuntimeError):
+    """Üretim yuvası LLM_QUEUE_TIMEOUT içinde boşalmadı."""
+
+
+class ClientDisconnected(RuntimeError):
+    """HTTP istemcisi cevap beklerken bağlantıyı kapattı."""
+
+
+class RequestCoalescer:
+    """
+    Kısa bir pencere içinde gelen üretim isteklerini toplar ve aynı örnekleme
+    ayarlarına sahip olanları tek generate_batch çağrısıyla gönderir.
+
+    İptal edilen bir çağıranın prompt'u, toplu istek henüz gönderilmediyse gruptan
+    çıkarılır; gönderildiyse sonucu yok sayılır.
+    """
+
+    def __init__(self, client: "AsyncLLMClient", max_batch: int = LLM_BATCH_MAX, window_ms: float = LLM_BATCH_WINDOW_MS):
+        self.client = client
+        self.max_batch = max(1, int(max_batch))
+        self.window = max(0.0, float(window_ms)) / 1000.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._inflight: set = set()
+        self.batches = 0
+        self.batched_requests = 0
+
+    async def submit(self, req: LLMRequest) -> str:
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((req, fut))
+        return await fut
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            groups: Dict[str, List[Tuple[LLMRequest, asyncio.Future]]] = defaultdict(list)
+            for req, fut in batch:
+                key = json.dumps([req.model, req.options], sort_keys=True, default=str)
+                groups[key].append((req, fut))
+            for group in groups.values():
+                task = asyncio.create_task(self._send(group))
+                self._inflight.add(task)
+                task.add_done_callback(self._inflight.discard)
+
+    async def _send(self, group: List[Tuple[LLMRequest, asyncio.Future]]) -> None:
+        try:
+            async with self.client._slot():
+                live = [(r, f) for r, f in group if not f.done()]
+                if not live:
+                    return
+                self.batches += 1
+                self.batched_requests += len(live)
+                texts = await self.client.backend.generate_batch([r for r, _ in live])
+        except BaseException as e:
+            for _, f in group:
+                if not f.done():
+                    f.set_exception(e if isinstance(e, Exception) else RuntimeError("batch cancelled"))
+            if not isinstance(e, Exception):
+                raise
+            return
+        for (_, f), text in zip(live, texts):
+            if not f.done():
+                f.set_result(text)
+
+    async def close(self) -> None:
+        tasks = [t for t in [self._worker, *self._inflight] if t is not None]
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._worker = None
+
+
+class AsyncLLMClient:
+    def __init__(
+        self,
+        backend: Optional[LLMBackend] = None,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        queue_timeout: Optional[float] = LLM_QUEUE_TIMEOUT,
+        batch_max: int = LLM_BATCH_MAX,
+        batch_window_ms: float = LLM_BATCH_WINDOW_MS,
+    ):
+        self.backend = backend or build_backend()
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.queue_timeout = queue_timeout
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._coalescer = (
+            RequestCoalescer(self, batch_max, batch_window_ms)
+            if self.backend.supports_batching and batch_max > 1 else None
+        )
+        self.stats: Dict[str, Any] = {
+            "requests": 0, "in_flight": 0, "queued": 0, "cancelled": 0, "queue_timeouts": 0, "errors": 0,
+            "queue_ms_total": 0.0, "queue_ms_max": 0.0,
+        }
+
+    @property
+    def model(self) -> str:
+        return self.backend.model
+
+    # ---------------- yaşam döngüsü ----------------
+
+    async def start(self) -> None:
+        await self.backend.start()
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.max_concurrency)
+
+    async def close(self) -> None:
+        if self._coalescer is not None:
+            await self._coalescer.close()
+        await self.backend.close()
+
+    @asynccontextmanager
+    async def _slot(self):
+        """Semafor yuvası alır; bekleme süresini kuyruk metriği olarak kaydeder."""
+        await self.start()
+        t0 = time.perf_counter()
+        self.stats["queued"] += 1
+        try:
+            if self.queue_timeout:
+                await asyncio.wait_for(self._sem.acquire(), timeout=self.queue_timeout)
+            else:
+                await self._sem.acquire()
+        except asyncio.TimeoutError:
+            self.stats["queue_timeouts"] += 1
+            raise LLMQueueTimeout(f"LLM kuyruğu {self.queue_timeout}s içinde boşalmadı")
+        finally:
+            self.stats["queued"] -= 1
+
+        wait_ms = (time.perf_counter() - t0) * 1000
+        self.stats["queue_ms_total"] += wait_ms
+        self.stats["queue_ms_max"] = max(self.stats["queue_ms_max"], wait_ms)
+        self.stats["requests"] += 1
+        self.stats["in_flight"] += 1
+        try:
+            yield wait_ms
+        except asyncio.CancelledError:
+            self.stats["cancelled"] += 1
+            raise
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        finally:
+            self.stats["in_flight"] -= 1
+            self._sem.release()
+
+    # ---------------- üretim ----------------
+
+    async def generate(self, req: LLMRequest) -> str:
+        if self._coalescer is not None:
+            return await self._coalescer.submit(req)
+        async with self._slot():
+            return await self.backend.generate(req)
+
+    async def stream(self, req: LLMRequest) -> AsyncIterator[str]:
+        async with self._slot():
+            async for piece in self.backend.stream(req):
+                yield piece
+
+    def snapshot(self) -> Dict[str, Any]:
+        s = dict(self.stats)
+        s["queue_ms_avg"] = round(s["queue_ms_total"] / s["requests"], 1) if s["requests"] else 0.0
+        s["max_concurrency"] = self.max_concurrency
+        s["backend"] = self.backend.name
+        s["model"] = self.backend.model
+        if self._coalescer is not None:
+            s["batches"] = self._coalescer.batches
+            s["batched_requests"] = self._coalescer.batched_requests
+        return s
+
+
+async def run_until_disconnect(request: Request, aw: Awaitable[T], poll_interval: float = 0.5) -> T:
+    """
+    aw'yi çalıştırır; HTTP istemcisi bu sırada bağlantıyı koparırsa görevi iptal edip
+    ClientDisconnected yükseltir (Ollama tarafında üretim de durur).
+    """
+    task = asyncio.ensure_future(aw)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+                raise ClientDisconnected("client disconnected during generation")
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+
+
+_llm_client = AsyncLLMClient()
+
+
+def get_llm_client() -> AsyncLLMClient:
+    return _llm_client
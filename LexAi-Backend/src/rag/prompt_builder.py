@@ -1,7 +1,12 @@
 import hashlib
+import logging
 from typing import List, Dict, Optional, Tuple
 import re
-from src.rag.config import MAX_PASSAGE_CHARS, MAX_TOTAL_PASSAGES
+from src.rag.config import CONTEXT_TOKEN_BUDGET
+from src.retrieval.index_schema import FULL_TEXT_FIELD, PREVIEW_FIELD, QDRANT_FULL_TEXT_FIELD
+from src.rag.context_packer import count_tokens, pack_passages
+
+logger = logging.getLogger("uvicorn.error")
 
 SYSTEM_PROMPT = """
 #[ROL]
@@ -53,6 +58,7 @@ Cevabın kullanıcıyı bilgilendirsin, ancak hukuki tavsiye verme.
 GREETINGS_RE = re.compile(r"^\s*(merhaba|selam|günaydın|iyi günler|iyi akşamlar|nasılsın)\b", re.IGNORECASE)
 NONSENSE_RE = re.compile(r"^[\?\*\.\,]+$")
 NON_TURKISH_RE = re.compile(r"[A-Za-z]{3,}")
+OFF_TOPIC_WORDS = ["yemek", "spor", "film", "müzik", "tarif", "tatil", "oyun"]
 
 
 def _sha1(s: str) -> str:
@@ -68,35 +74,54 @@ def _sanitize_user_query(q: str) -> str:
 
 def _text_fields(payload: Dict) -> Tuple[str, str]:
     text_full = (
-        payload.get("karar_metni")
-        or payload.get("karar_metni_meta")
-        or payload.get("karar_metni_raw")
+        payload.get(FULL_TEXT_FIELD)
+        or payload.get(QDRANT_FULL_TEXT_FIELD)
         or payload.get("karar")
         or payload.get("text")
         or payload.get("full_text")
         or ""
     ).strip()
-    text_repr = (payload.get("karar_preview") or text_full[:400]).strip()
-    if len(text_full) > MAX_PASSAGE_CHARS:
-        text_full = text_full[:MAX_PASSAGE_CHARS]
+    text_repr = (payload.get(PREVIEW_FIELD) or text_full[:400]).strip()
+    # kırpma context_packer'da token bütçesine göre yapılır
     return text_repr, text_full
 
 
+def route_query(query: str) -> Tuple[str, Optional[str]]:
+    """
+    Kural tabanlı yönlendirme: (rota, hazır_cevap)
+    rota ∈ {"greeting", "unclear", "non_turkish", "off_topic", "legal"}
+    "legal" dışındaki rotalar model çalıştırmadan hazır cevapla döner.
+    """
+    q_clean = _sanitize_user_query(query or "")
+
+    if GREETINGS_RE.match(q_clean):
+        return "greeting", "Sizi dinliyorum, sorunuz nedir?"
+    if NONSENSE_RE.match(q_clean) or len(q_clean) < 2:
+        return "unclear", "Sorunuzu tam olarak anlayamadım, biraz daha açık yazar mısınız?"
+    if NON_TURKISH_RE.search(q_clean) and not re.search(r"[çğıöşüÇĞİÖŞÜ]", q_clean):
+        return "non_turkish", "Üzgünüm, yalnızca Türkçe dilinde yanıt verebilirim."
+    if any(w in q_clean.lower() for w in OFF_TOPIC_WORDS):
+        return "off_topic", "Bu konu hukuk kapsamına girmiyor."
+    return "legal", None
+
+
 def build_user_prompt(
     query: str,
     passages: List[Dict],
     conversation_history: Optional[List[Dict]] = None,
+    *,
+    token_budget: int = CONTEXT_TOKEN_BUDGET,
+    pack_info: Optional[Dict] = None,
 ) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Karar metinleri alaka skoruna göre token_budget'a sığacak şekilde yerleştirilir.
+    pack_info verilirse kullanılan token sayısı vb. içine yazılır.
+    """
     q_clean = _sanitize_user_query(query or "")
 
-    if GREETINGS_RE.match(q_clean):
-        return None, "Sizi dinliyorum, sorunuz nedir?"
-    if NONSENSE_RE.match(q_clean) or len(q_clean) < 2:
-        return None, "Sorunuzu tam olarak anlayamadım, biraz daha açık yazar mısınız?"
-    if NON_TURKISH_RE.search(q_clean) and not re.search(r"[çğıöşüÇĞİÖŞÜ]", q_clean):
-        return None, "Üzgünüm, yalnızca Türkçe dilinde yanıt verebilirim."
-    if any(w in q_clean.lower() for w in ["yemek", "spor", "film", "müzik", "tarif", "tatil", "oyun"]):
-        return None, "Bu konu hukuk kapsamına girmiyor."
+    _, early_answer = route_query(q_clean)
+    if early_answer:
+        return None, early_answer
 
     parts: List[str] = []
 
@@ -119,7 +144,7 @@ def build_user_prompt(
             or p.get("karar_ozeti")
             or p.get("karar")
             or p.get("sonuc")
-            or p.get("karar_preview")
+            or p.get(PREVIEW_FIELD)
         )
         if title:
             similar_titles.append(str(title).strip())
@@ -139,21 +164,17 @@ def build_user_prompt(
         key = _sha1(full_text)
         if key not in seen:
             seen.add(key)
-            uniq.append(full_text)
+            uniq.append((full_text, p.get("score") or 0.0))
 
-    print(f"[DEBUG] build_user_prompt → Toplam {len(passages)} pasaj geldi.")
-    print(f"[DEBUG] Filtre sonrası {len(uniq)} eşsiz pasaj kaldı.")
-    if uniq:
-        print(f"[DEBUG] İlk pasaj örneği: {uniq[0][:300]}")
-    else:
-        print("[DEBUG] Hiç karar metni bulunamadı.")
+    logger.debug("[prompt_builder] %d passages in, %d unique with full text", len(passages or []), len(uniq))
+
+    packed = pack_passages(uniq, budget=token_budget)
+    logger.debug("[prompt_builder] token budget: %d/%d tokens, %d passages (%d trimmed, %d dropped)",
+                 packed.tokens_used, packed.budget, len(packed.texts), packed.trimmed, packed.dropped)
 
-    if uniq:
+    if packed.texts:
         parts.append("<|im_start|>system\n--- BENZER DAVALARIN TAM KARAR METİNLERİ ---")
-        cap_n = max(1, int(MAX_TOTAL_PASSAGES))
-        cap_c = max(200, int(MAX_PASSAGE_CHARS))
-        for i, txt in enumerate(uniq[:cap_n], 1):
-            snippet = txt.replace("\n", " ")[:cap_c]
+        for i, snippet in enumerate(packed.texts, 1):
             parts.append(f"[{i}] {snippet}")
         parts.append("<|im_end|>")
     else:
@@ -165,4 +186,8 @@ def build_user_prompt(
         "tekrarsız ve öğretici bir hukuki açıklama oluştur.<|im_end|>\n<|im_start|>assistant\n"
     )
 
-    return "\n".join(parts), None
+    prompt = "\n".join(parts)
+    if pack_info is not None:
+        pack_info.update(packed.as_dict())
+        pack_info["prompt_tokens"] = count_tokens(prompt)
+    return prompt, None
@@ -1,10 +1,17 @@
+import logging
 import re
 import requests
-from typing import List, Dict, Optional, Union, Tuple
+from typing import AsyncIterator, List, Dict, Optional, Union, Tuple
 
-# Varsayılanlar (gerekirse config’ten enjekte edebilirsin)
-OLLAMA_URL_DEFAULT = "http://localhost:11434/api/generate"
-MODEL_DEFAULT = "qwen2.5:7b-instruct"
+from src.rag.config import LLM_BACKEND, LLM_BASE_URL, LLM_MODEL_NAME
+from src.rag.llm_backends import LLMRequest
+from src.rag.llm_client import get_llm_client
+
+# Varsayılanlar config'ten (LLM_BACKEND / LLM_BASE_URL / LLM_MODEL_NAME)
+OLLAMA_URL_DEFAULT = f"{LLM_BASE_URL.rstrip('/')}/api/generate"
+MODEL_DEFAULT = LLM_MODEL_NAME
+
+logger = logging.getLogger("uvicorn.error")
 
 
 def _build_prompt_from_messages(messages: List[Dict[str, str]]) -> str:
@@ -22,6 +29,31 @@ def _build_prompt_from_messages(messages: List[Dict[str, str]]) -> str:
     return "\n".join(parts)
 
 
+def _ollama_options(
+    *,
+    num_ctx: int,
+    num_predict: int,
+    temperature: float,
+    top_p: float,
+    top_k: int,
+    repeat_penalty: float,
+    stop: Optional[List[str]],
+    extra_options: Optional[Dict],
+) -> Dict:
+    opts = {
+        "temperature": temperature,
+        "top_p": top_p,
+        "top_k": top_k,
+        "num_predict": num_predict,
+        "repeat_penalty": repeat_penalty,
+        "num_ctx": num_ctx,
+        "stop": stop or ["<|im_end|>"],
+    }
+    if extra_options:
+        opts.update(extra_options)
+    return opts
+
+
 def _post_ollama_generate(
     full_prompt: str,
     *,
@@ -37,23 +69,14 @@ def _post_ollama_generate(
     timeout: int = 120,
     extra_options: Optional[Dict] = None,
 ) -> str:
-    opts = {
-        "temperature": temperature,
-        "top_p": top_p,
-        "top_k": top_k,
-        "num_predict": num_predict,
-        "repeat_penalty": repeat_penalty,
-        "num_ctx": num_ctx,
-        "stop": stop or ["<|im_end|>"],
-    }
-    if extra_options:
-        opts.update(extra_options)
-
     payload = {
         "model": model,
         "prompt": full_prompt,
         "stream": False,
-        "options": opts,
+        "options": _ollama_options(
+            num_ctx=num_ctx, num_predict=num_predict, temperature=temperature, top_p=top_p,
+            top_k=top_k, repeat_penalty=repeat_penalty, stop=stop, extra_options=extra_options,
+        ),
     }
 
     r = requests.post(url, json=payload, timeout=timeout)
@@ -98,6 +121,69 @@ def clean_response(text: str) -> str:
     return text.strip()
 
 
+def build_messages(
+    a: Union[str, List[Dict[str, str]]],
+    b: Optional[str] = None,
+    *,
+    history: Optional[List[Dict[str, str]]] = None,
+) -> List[Dict[str, str]]:
+    """
+    Ortak mesaj listesi kurulumu.
+      1) build_messages(messages=[...])
+      2) build_messages(system_prompt, user_prompt, history=[...])
+    """
+    # Yeni stil: messages listesi
+    if isinstance(a, list):
+        return a
+
+    # Eski stil: a=system_prompt, b=user_prompt (+ history)
+    system_prompt: str = a or ""
+    user_prompt: str = b or ""
+
+    # --- bağlamlı yanıt için yönlendirme ---
+    if history:
+        user_prompt += (
+            "\n\nYukarıdaki konuşmaları dikkate alarak, yeni soruya bağlamı koruyan, "
+            "neden-sonuç ilişkisi kuran, çıkarım içeren ve tekrarsız bir hukuki açıklama üret."
+        )
+
+    messages: List[Dict[str, str]] = []
+    if system_prompt:
+        messages.append({"role": "system", "content": system_prompt})
+
+    if history:
+        for turn in history:
+            r = turn.get("role")
+            c = turn.get("content", "")
+            if r in ("user", "assistant", "system") and c:
+                messages.append({"role": r, "content": c})
+
+    messages.append({"role": "user", "content": user_prompt})
+    return messages
+
+
+def build_full_prompt(
+    a: Union[str, List[Dict[str, str]]],
+    b: Optional[str] = None,
+    *,
+    history: Optional[List[Dict[str, str]]] = None,
+) -> str:
+    """build_messages çıktısını ChatML prompt'a çevirir (Ollama / vLLM completions)."""
+    full_prompt = _build_prompt_from_messages(build_messages(a, b, history=history))
+
+    logger.debug("[query_llm] prompt (%d chars):\n%s", len(full_prompt), full_prompt)
+    return full_prompt
+
+
+def _llm_request(a, b, history, options: Dict, model: Optional[str]) -> LLMRequest:
+    return LLMRequest(
+        prompt=build_full_prompt(a, b, history=history),
+        messages=build_messages(a, b, history=history),
+        options=options,
+        model=model,
+    )
+
+
 def query_llm(
     a: Union[str, List[Dict[str, str]]],
     b: Optional[str] = None,
@@ -125,10 +211,8 @@ def query_llm(
     return_prompt=False -> "response"
     """
 
-    # Yeni stil: messages listesi
-    if isinstance(a, list):
-        messages = a
-        full_prompt = _build_prompt_from_messages(messages)
+    if LLM_BACKEND == "ollama":
+        full_prompt = build_full_prompt(a, b, history=history)
         resp = _post_ollama_generate(
             full_prompt,
             url=url, model=model,
@@ -137,49 +221,66 @@ def query_llm(
             repeat_penalty=repeat_penalty, stop=stop,
             timeout=timeout, extra_options=extra_options,
         )
-        resp = clean_response(resp)
-        return (resp, full_prompt) if return_prompt else resp
-
-    # Eski stil: a=system_prompt, b=user_prompt (+ history)
-    system_prompt: str = a or ""
-    user_prompt: str = b or ""
-
-    # --- bağlamlı yanıt için yönlendirme ---
-    if history:
-        user_prompt += (
-            "\n\nYukarıdaki konuşmaları dikkate alarak, yeni soruya bağlamı koruyan, "
-            "neden-sonuç ilişkisi kuran, çıkarım içeren ve tekrarsız bir hukuki açıklama üret."
-        )
-
-    messages: List[Dict[str, str]] = []
-    if system_prompt:
-        messages.append({"role": "system", "content": system_prompt})
+    else:
+        req = _llm_request(a, b, history, _ollama_options(
+            num_ctx=num_ctx, num_predict=num_predict, temperature=temperature, top_p=top_p,
+            top_k=top_k, repeat_penalty=repeat_penalty, stop=stop, extra_options=extra_options,
+        ), model)
+        full_prompt = req.prompt
+        # Paylaşılan arka uç: bağlantı havuzu çağrılar arasında korunur
+        resp = get_llm_client().backend.generate_sync(req)
 
-    if history:
-        for turn in history:
-            r = turn.get("role")
-            c = turn.get("content", "")
-            if r in ("user", "assistant", "system") and c:
-                messages.append({"role": r, "content": c})
+    # --- Gereksiz kalıpları temizle ---
+    resp = clean_response(resp)
 
-    messages.append({"role": "user", "content": user_prompt})
+    return (resp, full_prompt) if return_prompt else resp
 
-    full_prompt = _build_prompt_from_messages(messages)
 
-    print("\n=== PROMPT DEBUG ===")
-    print(full_prompt)
-    print("====================\n")
+# --- Asenkron varyantlar (LLM_BACKEND arka ucu + eşzamanlılık sınırı, bkz. llm_client.py) ---
 
-    resp = _post_ollama_generate(
-        full_prompt,
-        url=url, model=model,
-        num_ctx=num_ctx, num_predict=num_predict,
-        temperature=temperature, top_p=top_p, top_k=top_k,
-        repeat_penalty=repeat_penalty, stop=stop,
-        timeout=timeout, extra_options=extra_options,
-    )
+async def aquery_llm(
+    a: Union[str, List[Dict[str, str]]],
+    b: Optional[str] = None,
+    *,
+    history: Optional[List[Dict[str, str]]] = None,
+    num_ctx: int = 16384,
+    num_predict: int = 1024,
+    model: Optional[str] = None,
+    temperature: float = 0.2,
+    top_p: float = 0.8,
+    top_k: int = 40,
+    repeat_penalty: float = 1.1,
+    stop: Optional[List[str]] = None,
+    extra_options: Optional[Dict] = None,
+) -> str:
+    """query_llm'in event loop'u bloklamayan karşılığı; temizlenmiş cevabı döner."""
+    req = _llm_request(a, b, history, _ollama_options(
+        num_ctx=num_ctx, num_predict=num_predict, temperature=temperature, top_p=top_p,
+        top_k=top_k, repeat_penalty=repeat_penalty, stop=stop, extra_options=extra_options,
+    ), model)
+    resp = await get_llm_client().generate(req)
+    return clean_response(resp)
 
-    # --- Gereksiz kalıpları temizle ---
-    resp = clean_response(resp)
 
-    return (resp, full_prompt) if return_prompt else resp
+async def astream_llm(
+    a: Union[str, List[Dict[str, str]]],
+    b: Optional[str] = None,
+    *,
+    history: Optional[List[Dict[str, str]]] = None,
+    num_ctx: int = 16384,
+    num_predict: int = 1024,
+    model: Optional[str] = None,
+    temperature: float = 0.2,
+    top_p: float = 0.8,
+    top_k: int = 40,
+    repeat_penalty: float = 1.1,
+    stop: Optional[List[str]] = None,
+    extra_options: Optional[Dict] = None,
+) -> AsyncIterator[str]:
+    """aquery_llm'in akış (stream) karşılığı; ham token parçalarını üretir (nihai metin için clean_response)."""
+    req = _llm_request(a, b, history, _ollama_options(
+        num_ctx=num_ctx, num_predict=num_predict, temperature=temperature, top_p=top_p,
+        top_k=top_k, repeat_penalty=repeat_penalty, stop=stop, extra_options=extra_options,
+    ), model)
+    async for piece in get_llm_client().stream(req):
+        yield piece
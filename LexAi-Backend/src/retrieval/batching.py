@@ -0,0 +1,118 @@
+"""
+batching.py
+-----------
+Toplu embedding işleri için uzunluğa göre kovalanmış (length-bucketed) batch'leme.
+
+Kayıtlar token uzunluğuna göre sıralanır ve batch'ler kayıt sayısına göre değil,
+dolgulu (padded) token sayısına göre kurulur: batch_boyu × en_uzun ≤ token_budget.
+Benzer uzunluktaki metinler aynı batch'e düştüğü için dolgu israfı azalır; vektörler
+girdi sırasına geri dizilir, yani sonuç sıralı encode ile aynıdır.
+
+Kullanım:
+    emb, stats = encode_bucketed(model, texts, token_budget=8192)
+    stats.tokens_per_sec, stats.padding_ratio
+"""
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+@dataclass
+class BatchStats:
+    records: int = 0
+    batches: int = 0
+    tokens: int = 0            # gerçek (dolgusuz) token
+    padded_tokens: int = 0     # modele giden (dolgulu) token
+    seconds: float = 0.0
+
+    @property
+    def tokens_per_sec(self) -> float:
+        return self.tokens / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def padding_ratio(self) -> float:
+        return 1.0 - self.tokens / self.padded_tokens if self.padded_tokens else 0.0
+
+    def merge(self, other: "BatchStats") -> None:
+        self.records += other.records
+        self.batches += other.batches
+        self.tokens += other.tokens
+        self.padded_tokens += other.padded_tokens
+        self.seconds += other.seconds
+
+    def summary(self) -> str:
+        return (f"{self.records} records, {self.batches} batches, {self.tokens} tokens, "
+                f"{self.tokens_per_sec:,.0f} tok/s, padding {self.padding_ratio:.1%}")
+
+
+def token_lengths(model: Any, texts: Sequence[str]) -> List[int]:
+    """Modelin tokenizer'ı ile (max_seq_length'te kesilmiş) token uzunlukları."""
+    max_len = int(getattr(model, "max_seq_length", 512) or 512)
+    tok = getattr(model, "tokenizer", None)
+    if tok is None:
+        return [min(max_len, max(1, len(t) // 4)) for t in texts]
+    ids = tok(list(texts), add_special_tokens=True, truncation=True, max_length=max_len)["input_ids"]
+    return [len(x) for x in ids]
+
+
+def plan_batches(lengths: Sequence[int], token_budget: int, max_batch: int) -> List[List[int]]:
+    """
+    Uzundan kısaya sıralı indeksleri batch'lere böler. En uzun batch'ler önce gelir;
+    bellek yetmezse iş başında hata verir.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: -lengths[i])
+    batches: List[List[int]] = []
+    cur: List[int] = []
+    cur_max = 0
+    for i in order:
+        L = max(1, int(lengths[i]))
+        new_max = max(cur_max, L)
+        if cur and (new_max * (len(cur) + 1) > token_budget or len(cur) >= max_batch):
+            batches.append(cur)
+            cur, new_max = [], L
+        cur.append(i)
+        cur_max = new_max
+    if cur:
+        batches.append(cur)
+    return batches
+
+
+def encode_bucketed(
+    model: Any,
+    texts: Sequence[str],
+    token_budget: int,
+    max_batch: int = 64,
+    lengths: Optional[Sequence[int]] = None,
+    on_batch: Optional[Callable[[int], None]] = None,
+    **encode_kwargs: Any,
+) -> Tuple[np.ndarray, BatchStats]:
+    """
+    texts'i token bütçeli batch'lerle encode eder; satırlar texts sırasındadır.
+    on_batch(n) her batch sonrası işlenen kayıt sayısıyla çağrılır (ilerleme çubuğu için).
+    """
+    stats = BatchStats(records=len(texts))
+    if not texts:
+        return np.zeros((0, model.get_sentence_embedding_dimension()), dtype=np.float32), stats
+
+    lengths = list(lengths) if lengths is not None else token_lengths(model, texts)
+    encode_kwargs.setdefault("normalize_embeddings", True)
+    encode_kwargs.setdefault("show_progress_bar", False)
+
+    out: Optional[np.ndarray] = None
+    t0 = time.perf_counter()
+    for idx in plan_batches(lengths, token_budget, max_batch):
+        e = np.asarray(model.encode([texts[i] for i in idx], batch_size=len(idx), **encode_kwargs), dtype=np.float32)
+        if out is None:
+            out = np.empty((len(texts), e.shape[1]), dtype=np.float32)
+        out[idx] = e
+        stats.batches += 1
+        stats.tokens += sum(lengths[i] for i in idx)
+        stats.padded_tokens += max(lengths[i] for i in idx) * len(idx)
+        if on_batch is not None:
+            on_batch(len(idx))
+    stats.seconds = time.perf_counter() - t0
+    return out, stats
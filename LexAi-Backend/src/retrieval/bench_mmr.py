@@ -0,0 +1,83 @@
+"""
+bench_mmr.py
+------------
+Vektörleştirilmiş MMR (src.retrieval.mmr) ile eski döngü tabanlı MMR'ın
+mikro karşılaştırması. Model / servis gerektirmez; rastgele birim vektörler kullanır.
+
+Kullanım:
+    python -m src.retrieval.bench_mmr
+    python -m src.retrieval.bench_mmr --sizes 50 500 2000 5000 --topn 8 --dim 1024
+"""
+import argparse
+import time
+from typing import List
+
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+
+from src.retrieval.mmr import mmr_indices
+
+
+def legacy_mmr_indices(q: np.ndarray, embs: np.ndarray, top_n: int, lambda_: float) -> List[int]:
+    """retrieve_combined.mmr_select'in önceki (aday başına cosine_similarity çağıran) döngüsü."""
+    rel = cosine_similarity(embs, q.reshape(1, -1)).reshape(-1)
+    selected = []
+    remaining = list(range(len(embs)))
+    first = int(np.argmax(rel))
+    selected.append(first)
+    remaining.remove(first)
+
+    while len(selected) < min(top_n, len(embs)) and remaining:
+        max_score, best = -1e9, None
+        for j in remaining:
+            div = cosine_similarity(embs[j:j+1], embs[selected]).max()
+            mmr = lambda_ * rel[j] - (1 - lambda_) * div
+            if mmr > max_score:
+                max_score, best = mmr, j
+        selected.append(best)
+        remaining.remove(best)
+    return selected
+
+
+def _unit(rng: np.random.Generator, n: int, dim: int) -> np.ndarray:
+    x = rng.standard_normal((n, dim)).astype(np.float32)
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 1000, 3000])
+    ap.add_argument("--topn", type=int, default=8)
+    ap.add_argument("--dim", type=int, default=1024)
+    ap.add_argument("--lambda_", type=float, default=0.7)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--legacy-max", type=int, default=3000, help="Bu boyuttan büyük havuzlarda eski döngü atlanır")
+    a = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'n':>6} | {'legacy ms':>10} | {'vector ms':>10} | {'speedup':>8} | same")
+    print("-" * 52)
+    for n in a.sizes:
+        embs = _unit(rng, n, a.dim)
+        q = _unit(rng, 1, a.dim)[0]
+
+        new_ms = _best_of(lambda: mmr_indices(q, embs, a.topn, a.lambda_), a.repeat) * 1000
+        if n <= a.legacy_max:
+            old_ms = _best_of(lambda: legacy_mmr_indices(q, embs, a.topn, a.lambda_), 1) * 1000
+            same = legacy_mmr_indices(q, embs, a.topn, a.lambda_) == mmr_indices(q, embs, a.topn, a.lambda_)
+            print(f"{n:>6} | {old_ms:>10.2f} | {new_ms:>10.2f} | {old_ms / max(new_ms, 1e-9):>7.1f}x | {same}")
+        else:
+            print(f"{n:>6} | {'-':>10} | {new_ms:>10.2f} | {'-':>8} | -")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+bench_qdrant_quant.py
+---------------------
+Qdrant quantization arama modlarının gecikme / isabet karşılaştırması.
+Referans "ignore" modudur (float32 vektörler); diğer modlar için recall@k,
+referansın ilk k sonucundan kaçının bulunduğudur.
+
+Çalışan bir Qdrant ve embedding modeli gerektirir.
+
+Kullanım:
+    python -m src.retrieval.bench_qdrant_quant
+    python -m src.retrieval.bench_qdrant_quant --k 50 --oversampling 1.5 2 3 --repeat 5 --queries sorgular.txt
+"""
+import argparse
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from src.rag.config import EMBED_MODEL_NAME, QDRANT_COLLECTION
+from src.retrieval.clients import get_qdrant, qdrant_search_params
+from src.retrieval.model_registry import get_embedding_model
+from src.retrieval.eval_queries import load_queries
+
+
+def _run(qvecs: np.ndarray, k: int, params, repeat: int):
+    client = get_qdrant()
+    ids: List[List] = []
+    lat: List[float] = []
+    for v in qvecs:
+        best, pts = float("inf"), []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            pts = client.query_points(
+                collection_name=QDRANT_COLLECTION, query=v.tolist(), limit=k,
+                with_payload=False, search_params=params,
+            ).points or []
+            best = min(best, time.perf_counter() - t0)
+        ids.append([p.id for p in pts])
+        lat.append(best * 1000)
+    return ids, lat
+
+
+def _recall(ref: List[List], got: List[List]) -> float:
+    vals = [len(set(r) & set(g)) / len(r) for r, g in zip(ref, got) if r]
+    return float(np.mean(vals)) if vals else 0.0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--k", type=int, default=50)
+    ap.add_argument("--oversampling", type=float, nargs="+", default=[1.0, 2.0, 3.0])
+    ap.add_argument("--hnsw-ef", type=int, default=None)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--queries", default=None, help="Satır başına bir sorgu (varsayılan: yerleşik küme)")
+    a = ap.parse_args()
+
+    queries = load_queries(a.queries)
+    model = get_embedding_model(EMBED_MODEL_NAME)
+    qvecs = np.asarray(model.encode(queries, normalize_embeddings=True), dtype=np.float32)
+
+    runs: Dict[str, object] = {"ignore": qdrant_search_params("ignore", hnsw_ef=a.hnsw_ef)}
+    for o in a.oversampling:
+        runs[f"rescore x{o:g}"] = qdrant_search_params("rescore", oversampling=o, hnsw_ef=a.hnsw_ef)
+    runs["quantized"] = qdrant_search_params("quantized", hnsw_ef=a.hnsw_ef)
+
+    _run(qvecs[:1], a.k, runs["ignore"], 1)  # bağlantı / önbellek ısınması
+    ref, _ = _run(qvecs, a.k, runs["ignore"], a.repeat)
+
+    print(f"{len(queries)} queries, k={a.k}, collection={QDRANT_COLLECTION}")
+    print(f"{'mode':<14} | {'p50 ms':>8} | {'p95 ms':>8} | {'recall@k':>8}")
+    print("-" * 48)
+    for name, params in runs.items():
+        ids, lat = _run(qvecs, a.k, params, a.repeat)
+        print(f"{name:<14} | {np.percentile(lat, 50):>8.2f} | {np.percentile(lat, 95):>8.2f} | {_recall(ref, ids):>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+chunking.py
+-----------
+Parça (chunk) düzeyinde Qdrant indeksleme yardımcıları.
+
+- chunk_spans: karar metnini CHUNK_CHARS uzunluğunda, CHUNK_OVERLAP kadar örtüşen
+  parçalara böler (kesimler mümkünse boşlukta yapılır)
+- collapse_chunks: sorgu anında parça sonuçlarını karar düzeyine indirir
+  (max veya sum havuzlama) ve eşleşen parçaları birleştirip pasaj olarak döner
+
+İndeksleyici (vector_embedding.py) QDRANT_CHUNKED açıkken her parçayı
+doc_id / chunk_idx / chunk_start / chunk_end payload'ı ile ayrı nokta olarak yazar.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from src.rag.config import CHUNK_CHARS, CHUNK_OVERLAP, CHUNK_MAX_PER_DOC, CHUNK_POOLING, MAX_PASSAGE_CHARS
+
+PASSAGE_SEP = " … "
+
+
+def chunk_spans(
+    text: str,
+    size: int = CHUNK_CHARS,
+    overlap: int = CHUNK_OVERLAP,
+    max_chunks: int = CHUNK_MAX_PER_DOC,
+) -> List[Tuple[int, int]]:
+    """Örtüşen (başlangıç, bitiş) karakter aralıkları. Son parça metnin sonuna dayanır."""
+    n = len(text or "")
+    if n == 0:
+        return []
+    size = max(1, int(size))
+    step = max(1, size - max(0, int(overlap)))
+    spans: List[Tuple[int, int]] = []
+    start = 0
+    while start < n and len(spans) < max_chunks:
+        end = min(n, start + size)
+        if end < n:
+            cut = text.rfind(" ", start + step, end)  # örtüşme bölgesinde boşlukta kes
+            if cut > start:
+                end = cut
+        spans.append((start, end))
+        if end >= n:
+            break
+        nxt = max(start + 1, end - overlap)
+        sp = text.find(" ", nxt, end)
+        start = sp + 1 if 0 <= sp < end else nxt
+    return spans
+
+
+@dataclass
+class ChunkHit:
+    doc_id: str
+    score: float
+    chunk_idx: int
+    start: int
+    end: int
+    text: str
+    payload: Dict[str, Any]
+    vector: Any = None
+
+
+@dataclass
+class DocHit:
+    doc_id: str
+    score: float
+    best: ChunkHit
+    chunks: List[ChunkHit] = field(default_factory=list)
+
+    def passage(self, max_chars: int = MAX_PASSAGE_CHARS) -> str:
+        """Eşleşen parçalar: skora göre max_chars'a kadar seçilir, metin sırasıyla birleştirilir."""
+        picked: List[ChunkHit] = []
+        used = 0
+        for c in sorted(self.chunks, key=lambda c: -c.score):
+            if picked and used + len(c.text) > max_chars:
+                continue
+            picked.append(c)
+            used += len(c.text)
+        picked.sort(key=lambda c: c.start)
+
+        out = ""
+        prev_end: Optional[int] = None
+        for c in picked:
+            if prev_end is not None and c.start < prev_end:
+                out += c.text[prev_end - c.start:]          # örtüşen kısmı tekrar etme
+            else:
+                out += (PASSAGE_SEP if out else "") + c.text
+            prev_end = max(prev_end or 0, c.end)
+        return out[:max_chars].strip()
+
+
+def collapse_chunks(chunks: Sequence[ChunkHit], pooling: str = CHUNK_POOLING) -> List[DocHit]:
+    """Parça sonuçlarını doc_id'ye göre birleştirir; skor max veya sum havuzlamayla hesaplanır."""
+    if pooling not in ("max", "sum"):
+        raise ValueError("CHUNK_POOLING 'max' | 'sum' olmalı")
+    by_doc: Dict[str, DocHit] = {}
+    for c in chunks:
+        d = by_doc.get(c.doc_id)
+        if d is None:
+            by_doc[c.doc_id] = DocHit(doc_id=c.doc_id, score=c.score, best=c, chunks=[c])
+            continue
+        d.chunks.append(c)
+        if c.score > d.best.score:
+            d.best = c
+        d.score = d.score + c.score if pooling == "sum" else max(d.score, c.score)
+    return sorted(by_doc.values(), key=lambda d: d.score, reverse=True)
@@ -0,0 +1,328 @@
+"""
+clients.py
+----------
+OpenSearch ve Qdrant için süreç boyunca yaşayan, havuzlu (pooled) istemciler.
+
+Her arama çağrısında yeni istemci kurmak; yeni bir HTTP bağlantı havuzu ve
+yeni bir gRPC kanalı (TCP + HTTP/2 el sıkışması) demektir. Bu modül istemcileri
+bir kez kurar, API açılışında (lifespan) sağlık kontrolünden geçirir ve
+bağlantı hatasında istemciyi yeniden kurup çağrıyı bir kez tekrarlar. Periyodik
+sağlık kontrolü istemcileri kapatmaz, yalnızca "bayat" işaretler; yeniden kurulum
+bir sonraki call_* çağrısında yapılır.
+
+Kullanım:
+    from src.retrieval.clients import get_opensearch, get_qdrant, call_opensearch, call_qdrant
+
+    res = call_opensearch(lambda c: c.search(index=OS_INDEX, body=body))
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+import httpx
+from opensearchpy import OpenSearch
+from opensearchpy.exceptions import ConnectionError as OSConnectionError, ConnectionTimeout as OSConnectionTimeout
+from qdrant_client import QdrantClient
+from qdrant_client.http import models as rest
+
+from src.rag.config import (
+    OS_HOST, OS_PORT, OS_USER, OS_PASS,
+    QDRANT_HOST, QDRANT_PORT, QDRANT_GRPC_PORT, QDRANT_PREFER_GRPC,
+    OS_POOL_MAXSIZE, OS_TIMEOUT, OS_MAX_RETRIES,
+    QDRANT_POOL_MAXSIZE, QDRANT_TIMEOUT, QDRANT_KEEPALIVE_SEC,
+    CLIENT_HEALTHCHECK_INTERVAL,
+    QDRANT_QUANT_MODE, QDRANT_QUANT_OVERSAMPLING,
+)
+
+logger = logging.getLogger("uvicorn.error")
+
+T = TypeVar("T")
+
+# Qdrant tarafında gRPC (grpc.RpcError) ve HTTP (httpx) hataları yakalanır; gRPC'de
+# yalnızca taşıma katmanı kodları bağlantı hatası sayılır (bkz. _is_qdrant_conn_error)
+try:
+    import grpc
+    _QDRANT_CONN_ERRORS: tuple = (grpc.RpcError, httpx.TransportError, ConnectionError)
+    _GRPC_RECONNECT_CODES = frozenset({grpc.StatusCode.UNAVAILABLE, grpc.StatusCode.CANCELLED})
+except ImportError:  # pragma: no cover
+    grpc = None
+    _QDRANT_CONN_ERRORS = (httpx.TransportError, ConnectionError)
+    _GRPC_RECONNECT_CODES = frozenset()
+
+_OS_CONN_ERRORS: tuple = (OSConnectionError, OSConnectionTimeout, ConnectionError)
+
+
+def _is_timeout(e: BaseException) -> bool:
+    """İstek süre sınırını aştı mı? Zaman aşımları yeniden denenmez (retrieval bacağının son tarihi geçmiştir)."""
+    if isinstance(e, (OSConnectionTimeout, httpx.TimeoutException)):
+        return True
+    code = getattr(e, "code", None)
+    return grpc is not None and isinstance(e, grpc.RpcError) and callable(code) and code() == grpc.StatusCode.DEADLINE_EXCEEDED
+
+
+def _is_qdrant_conn_error(e: BaseException) -> bool:
+    """
+    Kanal yeniden kurulunca düzelebilecek bir hata mı? gRPC'de yalnız UNAVAILABLE/CANCELLED;
+    NOT_FOUND, INVALID_ARGUMENT gibi uygulama hataları yeniden bağlanmayı tetiklemez.
+    """
+    if _is_timeout(e):
+        return False
+    if grpc is not None and isinstance(e, grpc.RpcError):
+        code = getattr(e, "code", None)
+        return callable(code) and code() in _GRPC_RECONNECT_CODES
+    return True
+
+
+class ClientPool:
+    """OpenSearch + Qdrant istemcilerini tembel kuran, sağlık kontrolü yapan ve yeniden bağlanan havuz."""
+
+    def __init__(self, **overrides: Any):
+        self.cfg: Dict[str, Any] = {
+            "os_pool_maxsize": OS_POOL_MAXSIZE,
+            "os_timeout": OS_TIMEOUT,
+            "os_max_retries": OS_MAX_RETRIES,
+            "qdrant_pool_maxsize": QDRANT_POOL_MAXSIZE,
+            "qdrant_timeout": QDRANT_TIMEOUT,
+            "qdrant_keepalive_sec": QDRANT_KEEPALIVE_SEC,
+            "qdrant_prefer_grpc": QDRANT_PREFER_GRPC,
+        }
+        self.cfg.update(overrides)
+        self._os: Optional[OpenSearch] = None
+        self._qd: Optional[QdrantClient] = None
+        self._lock = threading.Lock()
+        self._stale: set = set()   # health() başarısız → bir sonraki call_* yeniden kurar
+        self.stats: Dict[str, Any] = {"os_reconnects": 0, "qdrant_reconnects": 0, "last_health": {}}
+
+    # ---------------- build ----------------
+
+    def _build_opensearch(self) -> OpenSearch:
+        auth = (OS_USER, OS_PASS) if OS_USER and OS_PASS else None
+        return OpenSearch(
+            hosts=[{"host": OS_HOST, "port": OS_PORT}],
+            http_auth=auth,
+            scheme="http",
+            use_ssl=False,
+            verify_certs=False,
+            ssl_show_warn=False,
+            timeout=self.cfg["os_timeout"],
+            max_retries=self.cfg["os_max_retries"],
+            retry_on_timeout=False,   # zaman aşımında tekrar yok: istek başına süre sınırı aşılmasın
+            pool_maxsize=self.cfg["os_pool_maxsize"],
+            http_compress=True,
+        )
+
+    def _build_qdrant(self) -> QdrantClient:
+        keepalive_ms = int(self.cfg["qdrant_keepalive_sec"] * 1000)
+        return QdrantClient(
+            host=QDRANT_HOST,
+            port=QDRANT_PORT,
+            grpc_port=QDRANT_GRPC_PORT,
+            prefer_grpc=self.cfg["qdrant_prefer_grpc"],
+            timeout=self.cfg["qdrant_timeout"],
+            # HTTP yolu için kalıcı bağlantılar (qdrant-client localhost'ta keep-alive'ı varsayılan kapatır)
+            limits=httpx.Limits(
+                max_connections=self.cfg["qdrant_pool_maxsize"],
+                max_keepalive_connections=self.cfg["qdrant_pool_maxsize"],
+                keepalive_expiry=self.cfg["qdrant_keepalive_sec"],
+            ),
+            # gRPC kanalı boşta kalsa da canlı tutulur
+            grpc_options={
+                "grpc.keepalive_time_ms": keepalive_ms,
+                "grpc.keepalive_timeout_ms": 10_000,
+                "grpc.keepalive_permit_without_calls": 1,
+                "grpc.http2.max_pings_without_data": 0,
+            },
+        )
+
+    # ---------------- access ----------------
+
+    def opensearch(self) -> OpenSearch:
+        if self._os is None:
+            with self._lock:
+                if self._os is None:
+                    self._os = self._build_opensearch()
+        return self._os
+
+    def qdrant(self) -> QdrantClient:
+        if self._qd is None:
+            with self._lock:
+                if self._qd is None:
+                    self._qd = self._build_qdrant()
+        return self._qd
+
+    def reset_opensearch(self) -> None:
+        with self._lock:
+            old, self._os = self._os, None
+            self._stale.discard("opensearch")
+            self.stats["os_reconnects"] += 1
+        _safe_close(old)
+
+    def reset_qdrant(self) -> None:
+        with self._lock:
+            old, self._qd = self._qd, None
+            self._stale.discard("qdrant")
+            self.stats["qdrant_reconnects"] += 1
+        _safe_close(old)
+
+    def mark_stale(self, name: str) -> None:
+        """İstemciyi kapatmadan bayat işaretler (başka thread'ler onu kullanıyor olabilir)."""
+        with self._lock:
+            self._stale.add(name)
+
+    def is_stale(self, name: str) -> bool:
+        return name in self._stale
+
+    # ---------------- health ----------------
+
+    def health(self) -> Dict[str, Any]:
+        """İki servisi de yoklar; başarısız olanı bayat işaretler, bir sonraki call_* onu yeniden kurar."""
+        out: Dict[str, Any] = {}
+        t0 = time.perf_counter()
+        try:
+            out["opensearch"] = bool(self.opensearch().ping())
+        except Exception as e:
+            out["opensearch"] = False
+            out["opensearch_error"] = str(e)
+        if not out["opensearch"]:
+            self.mark_stale("opensearch")
+
+        try:
+            self.qdrant().get_collections()
+            out["qdrant"] = True
+        except Exception as e:
+            out["qdrant"] = False
+            out["qdrant_error"] = str(e)
+            self.mark_stale("qdrant")
+
+        out["check_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        out["checked_at"] = time.time()
+        self.stats["last_health"] = out
+        return out
+
+    def close(self) -> None:
+        with self._lock:
+            os_c, qd_c = self._os, self._qd
+            self._os, self._qd = None, None
+        _safe_close(os_c)
+        _safe_close(qd_c)
+
+
+def _safe_close(client: Any) -> None:
+    if client is None:
+        return
+    try:
+        client.close()
+    except Exception:
+        pass
+
+
+_pool = ClientPool()
+_monitor_stop = threading.Event()
+_monitor_thread: Optional[threading.Thread] = None
+
+
+def configure_clients(**overrides: Any) -> ClientPool:
+    """CLI betikleri için: havuzu farklı zaman aşımı / boyutla yeniden kurar (ilk kullanımdan önce çağrılmalı)."""
+    global _pool
+    _pool.close()
+    _pool = ClientPool(**overrides)
+    return _pool
+
+
+def get_pool() -> ClientPool:
+    return _pool
+
+
+def get_opensearch() -> OpenSearch:
+    return _pool.opensearch()
+
+
+def get_qdrant() -> QdrantClient:
+    return _pool.qdrant()
+
+
+def call_opensearch(fn: Callable[[OpenSearch], T]) -> T:
+    """fn(client) çalıştırır; bağlantı hatasında istemciyi yeniden kurup bir kez tekrar dener."""
+    if _pool.is_stale("opensearch"):
+        _pool.reset_opensearch()
+    try:
+        return fn(_pool.opensearch())
+    except _OS_CONN_ERRORS as e:
+        if _is_timeout(e):
+            raise
+        logger.warning("[clients] OpenSearch bağlantı hatası, yeniden bağlanılıyor: %s", e)
+        _pool.reset_opensearch()
+        return fn(_pool.opensearch())
+
+
+def call_qdrant(fn: Callable[[QdrantClient], T]) -> T:
+    """fn(client) çalıştırır; gRPC/HTTP bağlantı hatasında kanalı yeniden kurup bir kez tekrar dener."""
+    if _pool.is_stale("qdrant"):
+        _pool.reset_qdrant()
+    try:
+        return fn(_pool.qdrant())
+    except _QDRANT_CONN_ERRORS as e:
+        if not _is_qdrant_conn_error(e):
+            raise
+        logger.warning("[clients] Qdrant bağlantı hatası, yeniden bağlanılıyor: %s", e)
+        _pool.reset_qdrant()
+        return fn(_pool.qdrant())
+
+
+def qdrant_search_params(
+    mode: str = QDRANT_QUANT_MODE,
+    oversampling: float = QDRANT_QUANT_OVERSAMPLING,
+    hnsw_ef: Optional[int] = None,
+) -> rest.SearchParams:
+    """
+    Quantization arama ayarı:
+    - "ignore": int8 indeks kullanılmaz, float32 vektörler okunur
+    - "rescore": int8 ile limit × oversampling aday bulunur, float32 ile yeniden skorlanır
+    - "quantized": yalnız int8 skorlar (en hızlı, en düşük isabet)
+    """
+    if mode == "ignore":
+        q = rest.QuantizationSearchParams(ignore=True)
+    elif mode == "rescore":
+        q = rest.QuantizationSearchParams(ignore=False, rescore=True, oversampling=oversampling)
+    elif mode == "quantized":
+        q = rest.QuantizationSearchParams(ignore=False, rescore=False)
+    else:
+        raise ValueError("QDRANT_QUANT_MODE 'ignore' | 'rescore' | 'quantized' olmalı")
+    return rest.SearchParams(hnsw_ef=hnsw_ef, quantization=q)
+
+
+def _monitor_loop(interval: float) -> None:
+    while not _monitor_stop.wait(interval):
+        h = _pool.health()
+        if not (h.get("opensearch") and h.get("qdrant")):
+            logger.warning("[clients] health check failed: %s", h)
+
+
+def init_clients(start_monitor: bool = True) -> Dict[str, Any]:
+    """API açılışı: istemcileri kurar, bağlantıları ısıtır ve periyodik sağlık kontrolünü başlatır."""
+    global _monitor_thread
+    h = _pool.health()
+    logger.info("[clients] startup health: %s", h)
+    if start_monitor and CLIENT_HEALTHCHECK_INTERVAL > 0 and _monitor_thread is None:
+        _monitor_stop.clear()
+        _monitor_thread = threading.Thread(
+            target=_monitor_loop, args=(CLIENT_HEALTHCHECK_INTERVAL,), name="client-health", daemon=True
+        )
+        _monitor_thread.start()
+    return h
+
+
+def close_clients() -> None:
+    global _monitor_thread
+    _monitor_stop.set()
+    if _monitor_thread is not None:
+        _monitor_thread.join(timeout=2)
+        _monitor_thread = None
+    _pool.close()
+
+
+def client_stats() -> Dict[str, Any]:
+    return {**_pool.stats, "config": dict(_pool.cfg)}
@@ -0,0 +1,212 @@
+"""
+embedding_store.py
+------------------
+Toplu indeksleyici (vector_embedding.py) için kalıcı, içerik adresli embedding deposu.
+
+- EmbeddingStore: gömülen metnin sha1'i → satır. Vektörler bellek eşlemeli (memmap)
+  float16 matriste, indeks satır satır eklenen bir JSONL dosyasında tutulur.
+  Model / boyut değişirse depo sıfırlanır. Değişmeyen kayıtlar yeniden encode edilmez.
+- UploadLedger: doc_id → Qdrant'a yüklenmiş nokta id'leri ve payload özetleri.
+  Yalnızca yeni/değişen noktalar yüklenir; nokta id'si metinden türediği için
+  yalnız metadata'sı (dava_turu, sonuc, kanun_atiflari …) değişen noktalar payload
+  özetinden yakalanıp yeniden upsert edilir. İçeriği değişen kararların eski
+  noktaları silinir.
+
+Dosyalar (root altında):
+    meta.json       {"model": ..., "dim": ..., "capacity": ...}
+    vectors.f16     (capacity, dim) float16
+    index.jsonl     {"k": sha1, "r": satır}
+    uploaded.jsonl  {"doc_id": ..., "pids": [...], "ph": {pid: payload_sha1}}   (son satır geçerlidir)
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set
+
+import numpy as np
+
+_INITIAL_CAPACITY = 4096
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha1((text or "").encode("utf-8")).hexdigest()
+
+
+def payload_key(payload: Dict[str, Any]) -> str:
+    """Payload'ın anahtar sırasından bağımsız sha1 özeti."""
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _read_jsonl(path: Path) -> List[Dict[str, Any]]:
+    """
+    Satır satır eklenen JSONL'i okur. Çökmeden kalan yarım son satır atılır ve dosya
+    son geçerli satırda kesilir; aksi halde sonraki ekleme o satıra yapışıp kaybolurdu.
+    """
+    out: List[Dict[str, Any]] = []
+    if not path.exists():
+        return out
+    good = 0
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                if not line.endswith(b"\n"):
+                    raise ValueError("yarım satır")
+                out.append(json.loads(line))
+            except ValueError:
+                break
+            good += len(line)
+    if good < path.stat().st_size:
+        with open(path, "r+b") as f:
+            f.truncate(good)
+    return out
+
+
+class EmbeddingStore:
+    def __init__(self, root: Path, model_name: str, dim: int):
+        self.root = Path(root)
+        self.model_name = model_name
+        self.dim = int(dim)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._meta_path = self.root / "meta.json"
+        self._vec_path = self.root / "vectors.f16"
+        self._idx_path = self.root / "index.jsonl"
+        self.index: Dict[str, int] = {}
+        self.capacity = 0
+        self._mm: Optional[np.memmap] = None
+        self._load()
+
+    # ---------------- yükleme ----------------
+
+    def _load(self) -> None:
+        meta = {}
+        if self._meta_path.exists():
+            meta = json.loads(self._meta_path.read_text(encoding="utf-8"))
+        if meta.get("model") != self.model_name or int(meta.get("dim", -1)) != self.dim or not self._vec_path.exists():
+            if meta:
+                print(f"Embedding store reset (model/dim changed: {meta.get('model')}/{meta.get('dim')})")
+            self._reset()
+            return
+
+        self.capacity = int(meta["capacity"])
+        self._mm = np.memmap(self._vec_path, dtype=np.float16, mode="r+", shape=(self.capacity, self.dim))
+        for rec in _read_jsonl(self._idx_path):
+            if rec["r"] < self.capacity:
+                self.index[rec["k"]] = rec["r"]
+        print(f"Embedding store: {len(self.index)} cached vectors ({self.root})")
+
+    def _reset(self) -> None:
+        for p in (self._vec_path, self._idx_path):
+            if p.exists():
+                p.unlink()
+        self.index = {}
+        self.capacity = 0
+        self._mm = None
+        self._grow(_INITIAL_CAPACITY)
+
+    def _write_meta(self) -> None:
+        tmp = self._meta_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"model": self.model_name, "dim": self.dim, "capacity": self.capacity}), encoding="utf-8")
+        os.replace(tmp, self._meta_path)
+
+    def _grow(self, min_capacity: int) -> None:
+        new_cap = max(min_capacity, self.capacity * 2, _INITIAL_CAPACITY)
+        if self._mm is not None:
+            self._mm.flush()
+            self._mm = None
+        with open(self._vec_path, "ab") as f:
+            f.truncate(new_cap * self.dim * 2)
+        self.capacity = new_cap
+        self._mm = np.memmap(self._vec_path, dtype=np.float16, mode="r+", shape=(self.capacity, self.dim))
+        self._write_meta()
+
+    # ---------------- erişim ----------------
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def missing(self, keys: Sequence[str]) -> List[int]:
+        """Depoda olmayan anahtarların konumları (aynı anahtar bir kez)."""
+        seen: Set[str] = set()
+        out = []
+        for i, k in enumerate(keys):
+            if k not in self.index and k not in seen:
+                seen.add(k)
+                out.append(i)
+        return out
+
+    def put(self, keys: Sequence[str], vectors: np.ndarray) -> None:
+        """Vektörleri önce diske yazar, sonra indekse ekler (çökmede yarım kayıt kalmaz)."""
+        vectors = np.asarray(vectors)
+        new = [(k, v) for k, v in zip(keys, vectors) if k not in self.index]
+        if not new:
+            return
+        start = len(self.index)
+        if start + len(new) > self.capacity:
+            self._grow(start + len(new))
+        for j, (_, v) in enumerate(new):
+            self._mm[start + j] = v
+        self._mm.flush()
+        with open(self._idx_path, "a", encoding="utf-8") as f:
+            for j, (k, _) in enumerate(new):
+                f.write(json.dumps({"k": k, "r": start + j}) + "\n")
+                self.index[k] = start + j
+
+    def get(self, keys: Sequence[str]) -> np.ndarray:
+        rows = [self.index[k] for k in keys]
+        return np.asarray(self._mm[rows], dtype=np.float32)
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.flush()
+            self._mm = None
+
+
+class UploadLedger:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.by_doc: Dict[str, Set[int]] = {}
+        self._all: Set[int] = set()
+        self._hashes: Dict[int, str] = {}   # pid → payload_key; eski defter satırlarında yok
+        by_doc_hashes: Dict[str, Dict[int, str]] = {}
+        for rec in _read_jsonl(self.path):
+            self.by_doc[rec["doc_id"]] = set(rec["pids"])
+            by_doc_hashes[rec["doc_id"]] = {int(k): v for k, v in (rec.get("ph") or {}).items()}
+        for pids in self.by_doc.values():
+            self._all |= pids
+        for hashes in by_doc_hashes.values():
+            self._hashes.update(hashes)
+
+    def is_uploaded(self, pid: int, payload_hash: Optional[str] = None) -> bool:
+        """Nokta yüklü mü? payload_hash verilirse yüklenen payload'ın da aynı olması gerekir."""
+        if pid not in self._all:
+            return False
+        return payload_hash is None or self._hashes.get(pid) == payload_hash
+
+    def stale_points(self, doc_id: str, pids: Iterable[int]) -> Set[int]:
+        """doc_id için önceki yüklemede olup artık olmayan noktalar."""
+        return self.by_doc.get(doc_id, set()) - set(pids)
+
+    def record(self, doc_pids: Dict[str, Set[int]], payload_hashes: Optional[Dict[int, str]] = None) -> None:
+        payload_hashes = payload_hashes or {}
+        with open(self.path, "a", encoding="utf-8") as f:
+            for doc_id, pids in doc_pids.items():
+                old = self.by_doc.get(doc_id, set())
+                for pid in old - pids:
+                    self._hashes.pop(pid, None)
+                self._all -= old - pids
+                self._all |= pids
+                self.by_doc[doc_id] = set(pids)
+                for pid in pids:
+                    if pid in payload_hashes:
+                        self._hashes[pid] = payload_hashes[pid]
+                ph = {str(pid): self._hashes[pid] for pid in sorted(pids) if pid in self._hashes}
+                f.write(json.dumps({"doc_id": doc_id, "pids": sorted(pids), "ph": ph}) + "\n")
+
+    def reset(self) -> None:
+        self.by_doc, self._all, self._hashes = {}, set(), {}
+        if self.path.exists():
+            self.path.unlink()
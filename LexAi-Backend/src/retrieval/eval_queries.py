@@ -0,0 +1,35 @@
+"""
+eval_queries.py
+---------------
+Kalite / doğrulama kontrolleri için küçük, eğitimde kullanılmamış sorgu kümesi.
+onnx_embedder (PyTorch ↔ ONNX uyumu), bench_qdrant_quant (recall) ve blue/green
+yeniden indekslemede örnek sorgu doğrulaması (index_aliases) kullanır.
+"""
+from pathlib import Path
+from typing import List, Optional
+
+DEFAULT_EVAL_QUERIES = [
+    "kira bedelinin tespiti davası",
+    "işçilik alacakları kıdem tazminatı hesaplanması",
+    "boşanma davasında velayet ve nafaka",
+    "trafik kazası sonrası maddi ve manevi tazminat",
+    "tapu iptali ve tescil davası muris muvazaası",
+    "itirazın iptali icra inkar tazminatı",
+    "haksız fesih nedeniyle işe iade",
+    "ayıplı mal nedeniyle bedel iadesi tüketici hakem heyeti",
+    "ortaklığın giderilmesi izale-i şuyu",
+    "kat mülkiyeti ortak gider alacağı",
+    "sigorta tahkim komisyonu değer kaybı",
+    "miras payı tenkis davası",
+    "kiracının tahliyesi ihtiyaç nedeniyle",
+    "fazla mesai ücreti tanık beyanı",
+    "menfi tespit davası bono",
+    "hizmet tespiti sosyal güvenlik kurumu",
+]
+
+
+def load_queries(path: Optional[str] = None) -> List[str]:
+    """Satır başına bir sorgu içeren dosya; verilmezse yerleşik küme."""
+    if not path:
+        return list(DEFAULT_EVAL_QUERIES)
+    return [q.strip() for q in Path(path).read_text(encoding="utf-8").splitlines() if q.strip()]
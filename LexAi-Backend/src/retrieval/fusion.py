@@ -0,0 +1,107 @@
+"""
+fusion.py
+---------
+BM25 (OpenSearch) ve dense (Qdrant) sonuç listelerinin birleştirilmesi.
+
+Stratejiler (FUSION_METHOD veya istek başına):
+- "rrf"      : reciprocal rank fusion, Σ w / (RRF_K + sıra). Skor ölçeğinden bağımsızdır;
+               bir arka uç az sonuç döndüğünde de kararlıdır (varsayılan).
+- "zscore"   : her kaynağın skorları (s - ort) / std; listede olmayan belge o kaynağın
+               en düşük z değerini alır (kesim eşiğinin altında kaldığı varsayılır).
+- "weighted" : min-max normalize edilmiş skorların ağırlıklı toplamı (eski 0.75/0.25 davranışı).
+
+Girdi kaynak başına (id listesi, ham skor dizisi); hesap (belge × kaynak) numpy
+matrisi üzerinde yapılır.
+
+Kullanım:
+    ids, scores = fuse([os_ids, qd_ids], [os_scores, qd_scores], method="rrf", weights=[0.25, 0.75])
+"""
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.rag.config import FUSION_METHOD, RRF_K
+
+FUSION_METHODS = ("rrf", "zscore", "weighted")
+
+
+def _ranks(scores: np.ndarray) -> np.ndarray:
+    """Azalan skora göre 1'den başlayan sıra (eşitlikte girdi sırası)."""
+    order = np.argsort(-scores, kind="stable")
+    ranks = np.empty(len(scores), dtype=np.float64)
+    ranks[order] = np.arange(1, len(scores) + 1)
+    return ranks
+
+
+def _minmax(scores: np.ndarray) -> np.ndarray:
+    mn, mx = scores.min(), scores.max()
+    if mx <= mn:
+        return np.ones_like(scores)
+    return (scores - mn) / (mx - mn)
+
+
+def _zscore(scores: np.ndarray) -> np.ndarray:
+    std = scores.std()
+    if std <= 1e-12:
+        return np.zeros_like(scores)
+    return (scores - scores.mean()) / std
+
+
+def fuse(
+    ids: Sequence[Sequence[str]],
+    scores: Sequence[np.ndarray],
+    method: str = FUSION_METHOD,
+    weights: Optional[Sequence[float]] = None,
+    rrf_k: int = RRF_K,
+) -> Tuple[List[str], np.ndarray]:
+    """
+    Kaynak listelerini birleştirir. Dönüş: (birleşik skora göre azalan id listesi, skorlar).
+    Boş kaynaklar yok sayılır; ağırlık verilmezse kaynaklar eşit ağırlıklıdır.
+    """
+    if method not in FUSION_METHODS:
+        raise ValueError(f"FUSION_METHOD {FUSION_METHODS} içinden biri olmalı: {method!r}")
+    weights = [1.0] * len(ids) if weights is None else list(weights)
+
+    pos: Dict[str, int] = {}
+    for src_ids in ids:
+        for d in src_ids:
+            pos.setdefault(d, len(pos))
+    if not pos:
+        return [], np.zeros(0, dtype=np.float64)
+
+    m = np.zeros((len(pos), len(ids)), dtype=np.float64)
+    for j, (src_ids, src_scores) in enumerate(zip(ids, scores)):
+        if len(src_ids) == 0:
+            continue
+        s = np.asarray(src_scores, dtype=np.float64).reshape(-1)
+        rows = np.fromiter((pos[d] for d in src_ids), dtype=np.int64, count=len(src_ids))
+        if method == "rrf":
+            col = np.zeros(len(pos))               # listede yoksa katkı yok
+            col[rows] = 1.0 / (rrf_k + _ranks(s))
+        elif method == "zscore":
+            z = _zscore(s)
+            col = np.full(len(pos), z.min())
+            col[rows] = z
+        else:
+            col = np.zeros(len(pos))
+            col[rows] = _minmax(s)
+        m[:, j] = col
+
+    fused = m @ np.asarray(weights, dtype=np.float64)
+    order = np.argsort(-fused, kind="stable")
+    keys = list(pos)
+    return [keys[i] for i in order], fused[order]
+
+
+def to_unit(fused: np.ndarray, method: str, weights: Sequence[float], rrf_k: int = RRF_K) -> np.ndarray:
+    """Birleşik skorları [0, 1]'e taşır (gösterim / similarity_score için; sıralamayı değiştirmez)."""
+    if len(fused) == 0:
+        return fused
+    total = float(sum(weights)) or 1.0
+    if method == "rrf":
+        return fused / (total / (rrf_k + 1))   # 1.0 = her kaynakta ilk sırada
+    if method == "weighted":
+        return fused / total
+    return _minmax(fused)
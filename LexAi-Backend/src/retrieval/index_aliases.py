@@ -0,0 +1,201 @@
+"""
+index_aliases.py
+----------------
+OpenSearch indeksi ve Qdrant koleksiyonu için kesintisiz (blue/green) yeniden indeksleme.
+
+Canlı ad (OS_INDEX / QDRANT_COLLECTION, ör. "lexai_cases") bir alias'tır; veri
+sürümlü adlarda tutulur: lexai_cases_v1, lexai_cases_v2, ...
+
+    1. next_version()    → yeni sürüm canlı olanın yanında kurulur
+    2. validate_*()      → belge sayısı ve örnek sorgular kontrol edilir
+    3. swap_*_alias()    → alias tek istekte (atomik) yeni sürüme taşınır
+    4. gc_*_versions()   → canlı + (keep - 1) önceki sürüm dışındakiler silinir
+
+Eski kurulumlarda canlı ad alias değil, gerçek indeks/koleksiyondur (legacy).
+OpenSearch'te legacy indeks alias eklenirken aynı istekte (remove_index) silinir.
+Qdrant'ta bu iki adım tek istekte yapılamaz; ilk geçişte milisaniyeler süren bir
+boşluk olur.
+"""
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from qdrant_client import QdrantClient
+from qdrant_client.http import models as rest
+
+from src.rag.config import REINDEX_KEEP_VERSIONS, REINDEX_MIN_COUNT_RATIO, REINDEX_MIN_SAMPLE_HIT_RATE
+
+
+def _version_re(alias: str) -> "re.Pattern[str]":
+    return re.compile(rf"^{re.escape(alias)}_v(\d+)$")
+
+
+def _versions(names: Sequence[str], alias: str) -> List[Tuple[int, str]]:
+    pat = _version_re(alias)
+    return sorted((int(m.group(1)), n) for n in names if (m := pat.match(n)))
+
+
+def next_version(names: Sequence[str], alias: str) -> str:
+    vs = _versions(names, alias)
+    return f"{alias}_v{(vs[-1][0] if vs else 0) + 1}"
+
+
+def _gc_plan(names: Sequence[str], alias: str, live: Optional[str], keep: int) -> List[str]:
+    """Silinecek sürümler: canlı ve ondan önceki en yeni (keep - 1) sürüm kalır; yarım kalmış yeniler de silinir."""
+    vs = _versions(names, alias)
+    live_n = next((n for n, name in vs if name == live), None)
+    if live_n is None:
+        return []
+    older = [name for n, name in vs if n < live_n][::-1]
+    keep_set = {live, *older[:max(0, keep - 1)]}
+    return [name for _, name in vs if name not in keep_set]
+
+
+def check_count(new_count: int, live_count: Optional[int], min_ratio: float = REINDEX_MIN_COUNT_RATIO) -> Optional[str]:
+    if new_count <= 0:
+        return "new version is empty"
+    if live_count and new_count < live_count * min_ratio:
+        return f"count {new_count} < {min_ratio:.0%} of live ({live_count})"
+    return None
+
+
+# ==================== OpenSearch ====================
+
+def os_versions(client: Any, alias: str) -> List[str]:
+    return [n for _, n in _versions(list(client.indices.get(index=f"{alias}_v*")), alias)]
+
+
+def os_live(client: Any, alias: str) -> Tuple[Optional[str], bool]:
+    """(canlı gerçek indeks, legacy mi). Alias da indeks de yoksa (None, False)."""
+    if client.indices.exists_alias(name=alias):
+        return next(iter(client.indices.get_alias(name=alias))), False
+    if client.indices.exists(index=alias):
+        return alias, True
+    return None, False
+
+
+def validate_opensearch(
+    client: Any,
+    new_index: str,
+    live_index: Optional[str],
+    queries: Sequence[str],
+    min_hit_rate: float = REINDEX_MIN_SAMPLE_HIT_RATE,
+    min_ratio: float = REINDEX_MIN_COUNT_RATIO,
+) -> List[str]:
+    """Yeni indeks için sorunlar (boşsa geçerli): sayı, mapping ve örnek sorgular."""
+    from src.retrieval.index_schema import mapping_drift
+    from src.retrieval.search_opensearch import build_query_body
+
+    client.indices.refresh(index=new_index)
+    problems: List[str] = []
+    new_count = client.count(index=new_index)["count"]
+    live_count = client.count(index=live_index)["count"] if live_index else None
+    if err := check_count(new_count, live_count, min_ratio):
+        problems.append(err)
+
+    mappings = client.indices.get_mapping(index=new_index)[new_index]["mappings"]
+    problems += mapping_drift(mappings)
+
+    hits = sum(
+        1 for q in queries
+        if client.search(index=new_index, body=build_query_body(q, size=3))["hits"]["hits"]
+    )
+    if queries and hits / len(queries) < min_hit_rate:
+        problems.append(f"sample queries: {hits}/{len(queries)} returned hits")
+    print(f"[validate] {new_index}: {new_count} docs (live {live_count}), sample hits {hits}/{len(queries)}")
+    return problems
+
+
+def swap_os_alias(client: Any, alias: str, new_index: str) -> None:
+    """Alias'ı tek _aliases isteğiyle yeni indekse taşır; legacy indeks aynı istekte silinir."""
+    live, legacy = os_live(client, alias)
+    actions: List[Dict[str, Any]] = []
+    if legacy:
+        actions.append({"remove_index": {"index": alias}})
+    elif live:
+        actions.append({"remove": {"index": live, "alias": alias}})
+    actions.append({"add": {"index": new_index, "alias": alias}})
+    client.indices.update_aliases(body={"actions": actions})
+    print(f"✅ OpenSearch alias '{alias}': {live or '—'} → {new_index}")
+
+
+def gc_os_versions(client: Any, alias: str, keep: int = REINDEX_KEEP_VERSIONS) -> List[str]:
+    live, _ = os_live(client, alias)
+    doomed = _gc_plan(os_versions(client, alias), alias, live, keep)
+    for name in doomed:
+        client.indices.delete(index=name)
+        print(f"🗑️  Deleted old index {name}")
+    return doomed
+
+
+# ==================== Qdrant ====================
+
+def qdrant_versions(client: QdrantClient, alias: str) -> List[str]:
+    return [n for _, n in _versions([c.name for c in client.get_collections().collections], alias)]
+
+
+def qdrant_live(client: QdrantClient, alias: str) -> Tuple[Optional[str], bool]:
+    for a in client.get_aliases().aliases:
+        if a.alias_name == alias:
+            return a.collection_name, False
+    if alias in [c.name for c in client.get_collections().collections]:
+        return alias, True
+    return None, False
+
+
+def validate_qdrant(
+    client: QdrantClient,
+    new_collection: str,
+    live_collection: Optional[str],
+    samples: int = 20,
+    min_hit_rate: float = REINDEX_MIN_SAMPLE_HIT_RATE,
+    min_ratio: float = REINDEX_MIN_COUNT_RATIO,
+) -> List[str]:
+    """
+    Sayı kontrolü + örnek sorgular: koleksiyondan alınan noktaların kendi vektörüyle
+    aramada ilk sırada kendilerini bulması (model gerektirmez; indeks bütünlüğünü sınar).
+    """
+    from src.retrieval.clients import qdrant_search_params
+
+    problems: List[str] = []
+    new_count = client.count(new_collection, exact=True).count
+    live_count = client.count(live_collection, exact=True).count if live_collection else None
+    if err := check_count(new_count, live_count, min_ratio):
+        problems.append(err)
+
+    pts, _ = client.scroll(new_collection, limit=samples, with_vectors=True, with_payload=False)
+    hits = 0
+    for p in pts:
+        res = client.query_points(
+            collection_name=new_collection, query=p.vector, limit=1, search_params=qdrant_search_params(),
+        ).points
+        hits += bool(res) and res[0].id == p.id
+    if pts and hits / len(pts) < min_hit_rate:
+        problems.append(f"sample queries: {hits}/{len(pts)} points found themselves")
+    print(f"[validate] {new_collection}: {new_count} points (live {live_count}), self-hits {hits}/{len(pts)}")
+    return problems
+
+
+def swap_qdrant_alias(client: QdrantClient, alias: str, new_collection: str) -> None:
+    live, legacy = qdrant_live(client, alias)
+    if legacy:
+        # Alias gerçek koleksiyonla aynı adı taşıyamaz; tek seferlik geçişte kısa bir boşluk olur
+        print(f"Replacing legacy collection '{alias}' with an alias...")
+        client.delete_collection(alias)
+        live = None
+    ops: List[Any] = []
+    if live:
+        ops.append(rest.DeleteAliasOperation(delete_alias=rest.DeleteAlias(alias_name=alias)))
+    ops.append(rest.CreateAliasOperation(create_alias=rest.CreateAlias(collection_name=new_collection, alias_name=alias)))
+    client.update_collection_aliases(change_aliases_operations=ops)
+    print(f"✅ Qdrant alias '{alias}': {live or '—'} → {new_collection}")
+
+
+def gc_qdrant_versions(client: QdrantClient, alias: str, keep: int = REINDEX_KEEP_VERSIONS) -> List[str]:
+    live, _ = qdrant_live(client, alias)
+    doomed = _gc_plan(qdrant_versions(client, alias), alias, live, keep)
+    for name in doomed:
+        client.delete_collection(name)
+        print(f"🗑️  Deleted old collection {name}")
+    return doomed
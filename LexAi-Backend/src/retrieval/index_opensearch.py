@@ -1,28 +1,25 @@
+import argparse
 import json
+import sys
 from pathlib import Path
 from typing import Any, Dict, List
-from opensearchpy import OpenSearch, helpers
+from opensearchpy import helpers
+
+from src.retrieval.clients import configure_clients, get_opensearch
+from src.retrieval.index_schema import (
+    index_body, INDEX_NAME, PREVIEW_CHARS, FULL_TEXT_FIELD, PREVIEW_FIELD, COMBINED_FIELD,
+)
+from src.rag.config import REINDEX_KEEP_VERSIONS
+from src.retrieval.index_aliases import gc_os_versions, next_version, os_live, os_versions, swap_os_alias, validate_opensearch
+from src.retrieval.index_version import bump_opensearch_generation, read_opensearch_generation
+from src.retrieval.eval_queries import DEFAULT_EVAL_QUERIES
 
 # ==================== CONFIG ====================
 
 INPUT_FILE = "data/interim/balanced_total30k.jsonl"
-INDEX_NAME = "lexai_cases"
-
-OPENSEARCH_HOST = "localhost"
-OPENSEARCH_PORT = 9200
-
 BATCH_SIZE = 1000
-VERIFY_CERTS = False
-
-client = OpenSearch(
-    hosts=[{"host": OPENSEARCH_HOST, "port": OPENSEARCH_PORT}],
-    scheme="http",
-    use_ssl=False,
-    verify_certs=VERIFY_CERTS,
-    ssl_assert_hostname=False,
-    ssl_show_warn=False,
-    timeout=120,
-)
+OS_REQUEST_TIMEOUT = 120     # indeks oluşturma / refresh / doğrulama istekleri (API havuzunun varsayılanı yerine)
+BULK_REQUEST_TIMEOUT = 180   # tek bulk isteği
 
 
 # ==================== HELPERS ====================
@@ -108,73 +105,28 @@ def build_full_text(rec: Dict[str, Any]) -> str:
 
 # ==================== INDEX SETTINGS ====================
 
-def ensure_index():
-    """Index mevcutsa sıfırla, yeni ayarlarla oluştur."""
-    if client.indices.exists(index=INDEX_NAME):
-        client.indices.delete(index=INDEX_NAME)
-
-    settings = {
-        "settings": {
-            "number_of_shards": 1,
-            "number_of_replicas": 0,
-            "analysis": {
-                "analyzer": {
-                    "tr_analyzer": {
-                        "type": "custom",
-                        "tokenizer": "standard",
-                        "filter": ["lowercase", "asciifolding"]
-                    }
-                },
-                "normalizer": {
-                    "lower_norm": {
-                        "type": "custom",
-                        "filter": ["lowercase", "asciifolding"]
-                    }
-                }
-            }
-        },
-        "mappings": {
-            "properties": {
-                "doc_id": {"type": "keyword", "normalizer": "lower_norm"},
-                "dava_turu": {
-                    "type": "text", "analyzer": "tr_analyzer",
-                    "fields": {"kw": {"type": "keyword", "normalizer": "lower_norm"}},
-                    "copy_to": ["full_text"]
-                },
-                "sonuc": {"type": "keyword", "normalizer": "lower_norm"},
-                "metin_esas_no": {"type": "keyword", "normalizer": "lower_norm"},
-                "metin_karar_no": {"type": "keyword", "normalizer": "lower_norm"},
-
-                "laws_norm": {
-                    "type": "text", "analyzer": "tr_analyzer",
-                    "fields": {"kw": {"type": "keyword", "normalizer": "lower_norm"}},
-                    "copy_to": ["full_text"]
-                },
-
-                "gerekce": {"type": "text", "analyzer": "tr_analyzer", "copy_to": ["full_text"]},
-                "karar":   {"type": "text", "analyzer": "tr_analyzer", "copy_to": ["full_text"]},
-                "hikaye":  {"type": "text", "analyzer": "tr_analyzer", "copy_to": ["full_text"]},
-
-                # 🔹 Tam karar metni burada tutulur (LLM ve UI buradan çeker)
-                "karar_metni_raw": {"type": "text", "analyzer": "tr_analyzer"},
-                # 🔹 Karma alan (boost edilmiş arama için)
-                "full_text": {"type": "text", "analyzer": "tr_analyzer"}
-            }
-        }
-    }
+def ensure_index(index: str):
+    """Sürümlü indeksi oluşturur (canlı indekse dokunulmaz); toplu yazım boyunca refresh kapalı."""
+    client = get_opensearch()
+    if client.indices.exists(index=index):
+        client.indices.delete(index=index)  # yarım kalmış, canlı olmayan sürüm
 
-    client.indices.create(index=INDEX_NAME, body=settings)
-    print(f"✅ Index '{INDEX_NAME}' created.")
+    # Ayarlar ve mapping index_schema.py'de; sorgu kuranlar aynı alan adlarını kullanır
+    body = index_body()
+    body["settings"]["refresh_interval"] = "-1"
+    client.indices.create(index=index, body=body)
+    print(f"✅ Index '{index}' created.")
 
 
 # ==================== BULK INDEX ====================
 
-def gen_actions(docs_iter):
+def gen_actions(docs_iter, index: str = INDEX_NAME):
     """Her karar kaydı için index dokümanı üret."""
     for i, rec in enumerate(docs_iter):
         _id = str(rec.get("doc_id") or f"auto_{i}")
         laws = _norm_laws(rec.get("kanun_atiflari"))
         full_text = build_full_text(rec)
+        karar_metni = rec.get("karar_metni") or rec.get("karar") or ""
 
         src = {
             "doc_id": rec.get("doc_id"),
@@ -188,31 +140,61 @@ def gen_actions(docs_iter):
             "hikaye": rec.get("hikaye"),
 
             # 🔹 Embedding ile birebir uyumlu tam karar metni
-            "karar_metni_raw": rec.get("karar_metni") or rec.get("karar") or "",
-            "full_text": full_text,
+            FULL_TEXT_FIELD: karar_metni,
+            PREVIEW_FIELD: karar_metni.strip()[:PREVIEW_CHARS],
+            COMBINED_FIELD: full_text,
         }
 
-        yield {"_index": INDEX_NAME, "_id": _id, "_source": src}
+        yield {"_index": index, "_id": _id, "_source": src}
 
 
 def main():
-    """JSONL'deki tüm kayıtları OpenSearch'e indexle."""
+    """
+    JSONL'deki tüm kayıtları yeni sürüm indekse (lexai_cases_v{N}) yazar; doğrulama
+    geçerse alias'ı taşır. Canlı indeks bu süre boyunca aramaya hizmet etmeye devam eder.
+    """
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--no-swap", action="store_true", help="Yalnızca yeni sürümü kur ve doğrula; alias'ı taşıma")
+    ap.add_argument("--force", action="store_true", help="Doğrulama sorunlarına rağmen alias'ı taşı")
+    ap.add_argument("--keep", type=int, default=REINDEX_KEEP_VERSIONS, help="Saklanacak sürüm sayısı (canlı dahil)")
+    args = ap.parse_args()
+
     docs_path = Path(INPUT_FILE)
     if not docs_path.exists():
         raise FileNotFoundError(f"Girdi dosyası bulunamadı: {INPUT_FILE}")
 
-    ensure_index()
+    # Ortak istemci havuzu; toplu yükleme için daha uzun zaman aşımı
+    client = configure_clients(os_timeout=OS_REQUEST_TIMEOUT).opensearch()
+    live, legacy = os_live(client, INDEX_NAME)
+    new_index = next_version(os_versions(client, INDEX_NAME), INDEX_NAME)
+    print(f"Live: {live or '—'}{' (legacy index)' if legacy else ''} → building {new_index}")
+    ensure_index(new_index)
 
     with open(docs_path, "r", encoding="utf-8") as f:
         helpers.bulk(
             client,
-            gen_actions(json.loads(line) for line in f),
+            gen_actions((json.loads(line) for line in f), new_index),
             chunk_size=BATCH_SIZE,
-            request_timeout=180
+            request_timeout=BULK_REQUEST_TIMEOUT,
         )
-
-    count = client.count(index=INDEX_NAME)["count"]
-    print(f"✅ Indexed documents: {count}")
+    client.indices.put_settings(index=new_index, body={"index": {"refresh_interval": "1s"}})
+
+    problems = validate_opensearch(client, new_index, live, DEFAULT_EVAL_QUERIES)
+    if problems:
+        print("⚠️  Validation failed:\n  - " + "\n  - ".join(problems))
+        if not args.force:
+            print(f"Alias not moved; '{new_index}' left for inspection.")
+            sys.exit(1)
+    if args.no_swap:
+        print(f"--no-swap: '{new_index}' built, alias unchanged.")
+        return
+
+    # Sayaç canlının değerinden devam eder; alias taşındığı anda sonuç önbelleği geçersizleşir
+    floor = read_opensearch_generation(live) if live else 0
+    gen = bump_opensearch_generation(new_index, floor=floor)
+    print(f"✅ OpenSearch '{new_index}' generation → {gen}")
+    swap_os_alias(client, INDEX_NAME, new_index)
+    gc_os_versions(client, INDEX_NAME, keep=args.keep)
 
 
 if __name__ == "__main__":
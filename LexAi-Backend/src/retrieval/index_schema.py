@@ -0,0 +1,278 @@
+"""
+index_schema.py
+---------------
+OpenSearch karar indeksinin tek şema kaynağı.
+
+İndeksleyici (index_opensearch.py) ayarları ve mapping'i buradan alır; sorgu
+kuranlar (retrieve_combined.search_opensearch, search_opensearch.build_query_body)
+alan adlarını ve boost'ları buradan kullanır. Böylece sorgular mapping'de olmayan
+alanlara gitmez.
+
+- index_body()        → indices.create gövdesi (settings + mappings); eş anlamlılar
+  yalnızca burada, indeks kurulurken okunur
+- tr_analyzer / tr_search → Türkçe küçük harf + kök bulma; arama tarafında ayrıca
+  configs/synonyms.yml ve 04_link_laws.ABBR_TO_NO'dan kurulan synonym_graph
+  (ör. "TBK" ↔ "6098", "kiracı" ↔ "müstecir")
+- SEARCH_FIELDS       → BM25 multi_match alanları (boost'lu)
+- HOT_SOURCE_FIELDS   → aday aşamasında çekilen yalın _source alanları
+- FULL_TEXT_FIELD     → tam karar metni (seçilen top-N için mget); hit payload'ında
+  ve prompt pasajlarında da tam metin bu anahtarla taşınır
+- QDRANT_FULL_TEXT_FIELD → Qdrant payload'ındaki (kırpılmış) tam metin
+- DETAIL_SOURCE_FIELDS → top-N mget'inde tam metinle birlikte çekilen özet alanları
+- mapping_drift()     → canlı mapping ile şema farkları
+- verify_index_schema → API açılışında kontrol; OS_SCHEMA_CHECK="fail" ise uyuşmazlıkta başlatmaz
+"""
+from __future__ import annotations
+
+import copy
+import importlib.util
+import logging
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import yaml
+
+from src.rag.config import OS_INDEX, OS_SCHEMA_CHECK, OS_SYNONYMS_FILE
+
+_BACKEND_ROOT = Path(__file__).resolve().parents[2]
+_LINK_LAWS_PATH = _BACKEND_ROOT / "src" / "etl" / "04_link_laws.py"
+
+logger = logging.getLogger("uvicorn.error")
+
+INDEX_NAME = OS_INDEX
+
+# ==================== ALANLAR ====================
+
+DOC_ID_FIELD = "doc_id"
+FULL_TEXT_FIELD = "karar_metni_raw"     # tam karar metni (LLM ve UI)
+PREVIEW_FIELD = "karar_preview"         # kısa önizleme (aday aşaması; Qdrant payload'ında da aynı ad)
+QDRANT_FULL_TEXT_FIELD = "karar_metni_meta"   # Qdrant payload'ındaki tam metin (MAX_DECISION_META_CHARS ile kırpılmış)
+COMBINED_FIELD = "full_text"            # copy_to ile beslenen karma alan
+LAWS_FIELD = "laws_norm"
+LAWS_KW_FIELD = "laws_norm.kw"
+
+PREVIEW_CHARS = 1000   # Qdrant payload'ındaki karar_preview ile aynı uzunluk
+
+SEARCH_FIELDS: List[str] = [
+    "dava_turu^4",
+    f"{LAWS_FIELD}^3",
+    f"{FULL_TEXT_FIELD}^3",
+    f"{PREVIEW_FIELD}^2",
+    "gerekce^2",
+    "karar^1.5",
+    "hikaye^1",
+]
+
+HOT_SOURCE_FIELDS: List[str] = [
+    DOC_ID_FIELD, "dava_turu", "sonuc", "metin_esas_no", "metin_karar_no", LAWS_FIELD, PREVIEW_FIELD,
+]
+
+# Prompt'taki alan bölümleri ve /similar özetleri (include_summaries) bunları kullanır
+SUMMARY_FIELDS: List[str] = ["gerekce", "karar", "hikaye"]
+DETAIL_SOURCE_FIELDS: List[str] = [FULL_TEXT_FIELD, *SUMMARY_FIELDS]
+
+# ==================== EŞ ANLAMLILAR ====================
+
+def _resolve(path: str) -> Path:
+    p = Path(path)
+    return p if p.is_absolute() else _BACKEND_ROOT / p
+
+
+def _synonym_groups(path: str = OS_SYNONYMS_FILE) -> List[str]:
+    """synonyms.yml eşdeğer grupları: "kiracı, müstecir" (çift yönlü)."""
+    p = _resolve(path)
+    if not p.exists():
+        logger.warning("[index_schema] %s not found; synonym groups disabled", p)
+        return []
+    data = yaml.safe_load(p.read_text(encoding="utf-8")) or {}
+    rules = []
+    for group in data.get("groups") or []:
+        terms = [str(t).strip() for t in group or [] if str(t).strip()]
+        if len(terms) > 1:
+            rules.append(", ".join(dict.fromkeys(terms)))
+    return rules
+
+
+def _law_abbreviation_rules() -> List[str]:
+    """04_link_laws.ABBR_TO_NO → eşdeğer kümeler: "HMK, 6100", "HUMK, HMUK, 1086"."""
+    # Modül adı rakamla başladığı için normal import ile alınamaz
+    spec = importlib.util.spec_from_file_location("lexai_link_laws", _LINK_LAWS_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    by_no: Dict[int, List[str]] = defaultdict(list)
+    for abbr, no in module.ABBR_TO_NO.items():
+        if no > 0:
+            by_no[no].append(abbr)
+    return [", ".join(dict.fromkeys(abbrs + [str(no)])) for no, abbrs in sorted(by_no.items())]
+
+
+def build_synonyms() -> List[str]:
+    """İndeks kurulurken çağrılır (modül içe aktarılırken değil)."""
+    rules = _synonym_groups()
+    try:
+        rules += _law_abbreviation_rules()
+    except Exception as e:  # ETL dosyası yoksa yalnız synonyms.yml
+        logger.warning("[index_schema] law abbreviation synonyms disabled: %s", e)
+    return rules
+
+
+# ==================== AYARLAR / MAPPING ====================
+
+# Kesme işaretinden sonrası atılır (TBK'nın → tbk), Türkçe küçük harf (I → ı),
+# kök bulma (kiracının / kiracıya → kiracı), en sonda asciifolding (ı/ş/ç yazmadan
+# girilen sorgular da eşleşsin). Eş anlamlılar yalnızca arama tarafında, kökten önce;
+# listesi index_settings() içinde doldurulur.
+INDEX_SETTINGS: Dict[str, Any] = {
+    "number_of_shards": 1,
+    "number_of_replicas": 0,
+    "analysis": {
+        "filter": {
+            "tr_lowercase": {"type": "lowercase", "language": "turkish"},
+            "tr_stemmer": {"type": "stemmer", "language": "turkish"},
+            "lexai_synonyms": {"type": "synonym_graph", "lenient": True, "synonyms": []},
+        },
+        "analyzer": {
+            "tr_analyzer": {
+                "type": "custom",
+                "tokenizer": "standard",
+                "filter": ["apostrophe", "tr_lowercase", "tr_stemmer", "asciifolding"]
+            },
+            "tr_search": {
+                "type": "custom",
+                "tokenizer": "standard",
+                "filter": ["apostrophe", "tr_lowercase", "lexai_synonyms", "tr_stemmer", "asciifolding"]
+            }
+        },
+        "normalizer": {
+            "lower_norm": {
+                "type": "custom",
+                "filter": ["lowercase", "asciifolding"]
+            }
+        }
+    }
+}
+
+_TEXT = {"type": "text", "analyzer": "tr_analyzer", "search_analyzer": "tr_search"}
+_KW = {"type": "keyword", "normalizer": "lower_norm"}
+
+INDEX_MAPPINGS: Dict[str, Any] = {
+    "properties": {
+        DOC_ID_FIELD: dict(_KW),
+        "dava_turu": {**_TEXT, "fields": {"kw": dict(_KW)}, "copy_to": [COMBINED_FIELD]},
+        "sonuc": dict(_KW),
+        "metin_esas_no": dict(_KW),
+        "metin_karar_no": dict(_KW),
+        LAWS_FIELD: {**_TEXT, "fields": {"kw": dict(_KW)}, "copy_to": [COMBINED_FIELD]},
+
+        "gerekce": {**_TEXT, "copy_to": [COMBINED_FIELD]},
+        "karar": {**_TEXT, "copy_to": [COMBINED_FIELD]},
+        "hikaye": {**_TEXT, "copy_to": [COMBINED_FIELD]},
+
+        # 🔹 Tam karar metni burada tutulur (LLM ve UI buradan çeker)
+        FULL_TEXT_FIELD: dict(_TEXT),
+        # 🔹 Kısa önizleme: retrieval aday aşamasında yalnızca bu çekilir
+        PREVIEW_FIELD: dict(_TEXT),
+        # 🔹 Karma alan (boost edilmiş arama için)
+        COMBINED_FIELD: dict(_TEXT),
+    }
+}
+
+def index_settings() -> Dict[str, Any]:
+    """INDEX_SETTINGS + güncel eş anlamlı listesi."""
+    settings = copy.deepcopy(INDEX_SETTINGS)
+    settings["analysis"]["filter"]["lexai_synonyms"]["synonyms"] = build_synonyms()
+    return settings
+
+
+def index_body() -> Dict[str, Any]:
+    return {"settings": index_settings(), "mappings": copy.deepcopy(INDEX_MAPPINGS)}
+
+
+# ==================== DRIFT KONTROLÜ ====================
+
+class IndexSchemaError(RuntimeError):
+    """Canlı OpenSearch mapping'i şemayla uyuşmuyor."""
+
+
+def _flatten(props: Dict[str, Any], prefix: str = "") -> Dict[str, Dict[str, Any]]:
+    """{"a": {..., "fields": {"kw": ...}}} → {"a": {...}, "a.kw": {...}}"""
+    out: Dict[str, Dict[str, Any]] = {}
+    for name, spec in (props or {}).items():
+        path = f"{prefix}{name}"
+        out[path] = spec
+        if spec.get("properties"):
+            out.update(_flatten(spec["properties"], path + "."))
+        if spec.get("fields"):
+            out.update(_flatten(spec["fields"], path + "."))
+    return out
+
+
+def _field_name(spec: str) -> str:
+    return spec.split("^", 1)[0]
+
+
+def query_fields() -> List[str]:
+    """Sorgu kuranların kullandığı tüm alanlar."""
+    return sorted(
+        {_field_name(f) for f in SEARCH_FIELDS} | set(HOT_SOURCE_FIELDS) | set(DETAIL_SOURCE_FIELDS) | {LAWS_KW_FIELD}
+    )
+
+
+def mapping_drift(actual_mappings: Dict[str, Any]) -> List[str]:
+    """Şemadaki her alanın canlı mapping'de aynı tip / analyzer ile bulunup bulunmadığı."""
+    expected = _flatten(INDEX_MAPPINGS["properties"])
+    actual = _flatten((actual_mappings or {}).get("properties") or {})
+    problems: List[str] = []
+    for path, spec in expected.items():
+        got = actual.get(path)
+        if got is None:
+            problems.append(f"missing field '{path}'")
+            continue
+        for key in ("type", "analyzer", "search_analyzer", "normalizer"):
+            want = spec.get(key)
+            have = got.get(key)
+            if key == "type":
+                have = have or ("object" if got.get("properties") else None)
+            if want is not None and have != want:
+                problems.append(f"'{path}' {key}: expected {want!r}, got {have!r}")
+    return problems
+
+
+def _live_mappings(index: str) -> Tuple[str, Dict[str, Any]]:
+    from src.retrieval.clients import call_opensearch
+
+    res = call_opensearch(lambda c: c.indices.get_mapping(index=index))
+    # alias ile sorgulandığında anahtar gerçek indeks adıdır
+    for concrete, body in (res or {}).items():
+        return concrete, body.get("mappings") or {}
+    return index, {}
+
+
+def verify_index_schema(index: str = INDEX_NAME, mode: str = OS_SCHEMA_CHECK) -> List[str]:
+    """
+    Sorgu alanlarının şemada, şemanın canlı indekste olduğunu kontrol eder.
+    mode: "fail" → uyuşmazlıkta IndexSchemaError, "warn" → yalnız log, "off" → atla.
+    OpenSearch'e ulaşılamıyorsa yalnızca uyarı verilir (bağlantı sağlığı ayrı izlenir).
+    """
+    if mode == "off":
+        return []
+    known = _flatten(INDEX_MAPPINGS["properties"])
+    problems = [f"query field '{f}' not in schema" for f in query_fields() if f not in known]
+
+    try:
+        concrete, mappings = _live_mappings(index)
+    except Exception as e:
+        logger.warning("[index_schema] mapping check skipped, OpenSearch unavailable: %s", e)
+        return problems
+    problems += mapping_drift(mappings)
+
+    if not problems:
+        logger.info("[index_schema] '%s' mapping matches schema", concrete)
+        return []
+    msg = f"OpenSearch mapping drift on '{concrete}': " + "; ".join(problems)
+    if mode == "fail":
+        raise IndexSchemaError(msg + " (re-run src.retrieval.index_opensearch or set OS_SCHEMA_CHECK='warn')")
+    logger.warning("[index_schema] %s", msg)
+    return problems
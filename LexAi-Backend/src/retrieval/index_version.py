@@ -0,0 +1,138 @@
+"""
+index_version.py
+----------------
+OpenSearch indeksi ve Qdrant koleksiyonu için "nesil" (generation) sayacı.
+
+İndeksleyiciler (index_opensearch.py, vector_embedding.py) yeni veri yayınladıktan
+sonra sayacı artırır; retrieval sonuç önbelleği sayacı anahtarına kattığı için
+eski sonuçlar kendiliğinden geçersiz olur.
+
+- OpenSearch: sayaç indeks mapping'inin `_meta.lexai_generation` alanında tutulur.
+- Qdrant: koleksiyon metadatası olmadığından sayaç küçük bir yan koleksiyonda
+  (QDRANT_META_COLLECTION) koleksiyon adına karşılık gelen noktada tutulur.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+from typing import Optional
+
+from qdrant_client.http import models as rest
+from qdrant_client.http.exceptions import UnexpectedResponse
+
+from src.rag.config import OS_INDEX, QDRANT_COLLECTION, QDRANT_META_COLLECTION, INDEX_VERSION_CHECK_INTERVAL
+from src.retrieval.clients import call_opensearch, call_qdrant
+
+logger = logging.getLogger("uvicorn.error")
+
+_META_KEY = "lexai_generation"
+
+
+# ==================== OpenSearch ====================
+
+def read_opensearch_generation(index: str = OS_INDEX) -> int:
+    res = call_opensearch(lambda c: c.indices.get_mapping(index=index))
+    # alias ile sorgulandığında anahtar gerçek indeks adıdır
+    for body in (res or {}).values():
+        meta = (body.get("mappings") or {}).get("_meta") or {}
+        return int(meta.get(_META_KEY, 0))
+    return 0
+
+
+def bump_opensearch_generation(index: str = OS_INDEX, floor: int = 0) -> int:
+    """floor: blue/green'de yeni indeks canlının sayacından devam eder (önbellek anahtarı geri dönmez)."""
+    gen = max(read_opensearch_generation(index), floor) + 1
+    call_opensearch(lambda c: c.indices.put_mapping(
+        index=index, body={"_meta": {_META_KEY: gen, "updated_at": time.time()}}
+    ))
+    logger.info("[index_version] OpenSearch '%s' generation → %d", index, gen)
+    return gen
+
+
+# ==================== Qdrant ====================
+
+def _meta_point_id(collection: str) -> int:
+    return int(hashlib.sha1(collection.encode("utf-8")).hexdigest()[:15], 16)
+
+
+def _ensure_meta_collection() -> None:
+    existing = [c.name for c in call_qdrant(lambda c: c.get_collections()).collections]
+    if QDRANT_META_COLLECTION not in existing:
+        call_qdrant(lambda c: c.create_collection(
+            collection_name=QDRANT_META_COLLECTION,
+            vectors_config=rest.VectorParams(size=1, distance=rest.Distance.DOT),
+        ))
+
+
+def _is_missing_collection(e: BaseException) -> bool:
+    """Meta koleksiyonu henüz yok mu? (HTTP 404 / gRPC NOT_FOUND)"""
+    if isinstance(e, UnexpectedResponse):
+        return e.status_code == 404
+    code = getattr(e, "code", None)
+    return callable(code) and getattr(code(), "name", None) == "NOT_FOUND"
+
+
+def read_qdrant_generation(collection: str = QDRANT_COLLECTION) -> int:
+    """
+    Meta koleksiyonu yoksa 0. Diğer hatalar (Qdrant erişilemez vb.) yükseltilir;
+    current_index_version son bilinen sürüme / "unknown"a düşer ve önbellek atlanır.
+    """
+    try:
+        pts = call_qdrant(lambda c: c.retrieve(
+            collection_name=QDRANT_META_COLLECTION, ids=[_meta_point_id(collection)], with_payload=True
+        ))
+    except Exception as e:
+        if _is_missing_collection(e):
+            return 0  # meta koleksiyonu henüz yok
+        raise
+    if not pts:
+        return 0
+    return int((pts[0].payload or {}).get("generation", 0))
+
+
+def bump_qdrant_generation(collection: str = QDRANT_COLLECTION) -> int:
+    _ensure_meta_collection()
+    gen = read_qdrant_generation(collection) + 1
+    call_qdrant(lambda c: c.upsert(
+        collection_name=QDRANT_META_COLLECTION,
+        points=[rest.PointStruct(
+            id=_meta_point_id(collection),
+            vector=[1.0],
+            payload={"collection": collection, "generation": gen, "updated_at": time.time()},
+        )],
+        wait=True,
+    ))
+    logger.info("[index_version] Qdrant '%s' generation → %d", collection, gen)
+    return gen
+
+
+# ==================== Birleşik sürüm ====================
+
+_lock = threading.Lock()
+_cached_version: Optional[str] = None
+_checked_at = 0.0
+
+
+def current_index_version(max_age: float = INDEX_VERSION_CHECK_INTERVAL) -> str:
+    """
+    "os{n}-qd{m}" biçiminde birleşik sürüm. En fazla max_age saniyede bir
+    sunuculara sorulur; okuma başarısız olursa son bilinen değer kullanılır.
+    """
+    global _cached_version, _checked_at
+    now = time.monotonic()
+    if _cached_version is not None and now - _checked_at < max_age:
+        return _cached_version
+    with _lock:
+        if _cached_version is not None and now - _checked_at < max_age:
+            return _cached_version
+        try:
+            version = f"os{read_opensearch_generation()}-qd{read_qdrant_generation()}"
+        except Exception as e:
+            logger.warning("[index_version] version check failed: %s", e)
+            version = _cached_version or "unknown"
+        if version != _cached_version and _cached_version is not None:
+            logger.info("[index_version] index version changed %s → %s", _cached_version, version)
+        _cached_version, _checked_at = version, now
+        return version
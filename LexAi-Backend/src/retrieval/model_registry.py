@@ -0,0 +1,189 @@
+"""
+model_registry.py
+-----------------
+Embedding modellerini süreç başına yalnızca bir kez yükleyen ortak kayıt defteri.
+
+- get_embedding_model(name) → modeli ilk çağrıda yükler, sonrakilerde aynı nesneyi döner
+- warmup_models()           → FastAPI açılışında modelleri yükleyip kısa bir encode ile ısıtır
+- model_stats()             → yükleme süresi ve bellek kullanımı (health/dashboard için)
+
+EMBED_BACKEND "onnx" / "onnx-int8" ise CPU'da model ONNX Runtime ile çalıştırılır
+(bkz. onnx_embedder.py); onnxruntime yoksa veya export başarısızsa PyTorch'a düşülür.
+
+SentenceTransformer tokenizer'ı (HF fast tokenizer) aynı anda birden fazla
+thread'den çağrılınca "Already borrowed" hatası verebildiği için encode
+çağrıları model başına bir kilit ile sıraya alınır.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import torch
+from sentence_transformers import SentenceTransformer
+
+from src.rag.config import EMBED_MODEL_NAME, EMBED_BACKEND
+
+try:  # yalnızca Unix; Windows'ta (start_app.bat) yok
+    import resource
+except ImportError:
+    resource = None
+
+logger = logging.getLogger("uvicorn.error")
+
+
+def pick_device() -> str:
+    if torch.cuda.is_available():
+        return "cuda"
+    elif torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
+
+
+def _rss_mb() -> Optional[float]:
+    """
+    Sürecin anlık RSS belleği (MB). /proc yoksa psutil'e, o da yoksa tepe
+    değere (ru_maxrss) düşer; hiçbiri yoksa (ör. psutil'siz Windows) None.
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except Exception:
+        pass
+    if resource is None:
+        return None
+    # ru_maxrss: Linux'ta KB, macOS'ta byte
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _cuda_mb() -> float:
+    if not torch.cuda.is_available():
+        return 0.0
+    return torch.cuda.memory_allocated() / (1024 * 1024)
+
+
+@dataclass
+class ModelStats:
+    name: str
+    device: str
+    dim: int
+    load_seconds: float
+    rss_delta_mb: Optional[float]
+    rss_after_mb: Optional[float]
+    cuda_mb: float
+    loaded_at: float
+    encode_calls: int = 0
+    encode_seconds: float = 0.0
+    backend: str = "torch"
+
+
+class EmbeddingModel:
+    """
+    SentenceTransformer etrafında ince, thread-safe sarmalayıcı.
+    encode() imzası SentenceTransformer ile aynıdır; mevcut çağıranlar
+    değişmeden bu nesneyi kullanabilir.
+    """
+
+    def __init__(self, name: str, model: Any, stats: ModelStats):
+        # Sorgu önbelleği anahtarı adı kullanır; farklı arka ucun vektörleri karışmasın
+        self.name = name if stats.backend == "torch" else f"{name}@{stats.backend}"
+        self.model = model
+        self.stats = stats
+        self._lock = threading.Lock()
+
+    def encode(self, sentences, **kwargs):
+        t0 = time.perf_counter()
+        with self._lock:
+            out = self.model.encode(sentences, **kwargs)
+            self.stats.encode_calls += 1
+            self.stats.encode_seconds += time.perf_counter() - t0
+        return out
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.stats.dim
+
+
+_models: Dict[str, EmbeddingModel] = {}
+_registry_lock = threading.Lock()
+
+
+def _load_backend(name: str, device: str, backend: str) -> Tuple[Any, str]:
+    """(model, gerçekte kullanılan arka uç). ONNX yalnızca CPU'da denenir."""
+    if backend in ("onnx", "onnx-int8"):
+        if device != "cpu":
+            logger.info("[model_registry] EMBED_BACKEND=%s ignored on %s; using torch", backend, device)
+        else:
+            try:
+                from src.retrieval.onnx_embedder import load_onnx_embedder
+                return load_onnx_embedder(name, quantize=backend == "onnx-int8"), backend
+            except Exception as e:  # onnxruntime kurulu değil / export hatası
+                logger.warning("[model_registry] ONNX backend unavailable (%s); falling back to torch", e)
+    elif backend != "torch":
+        raise ValueError("EMBED_BACKEND 'torch' | 'onnx' | 'onnx-int8' olmalı")
+    return SentenceTransformer(name, device=device), "torch"
+
+
+def _load(name: str, device: str, backend: str = EMBED_BACKEND) -> EmbeddingModel:
+    rss_before = _rss_mb()
+    t0 = time.perf_counter()
+    st, backend = _load_backend(name, device, backend)
+    load_seconds = time.perf_counter() - t0
+    rss_after = _rss_mb()
+
+    stats = ModelStats(
+        name=name,
+        device=device,
+        dim=int(st.get_sentence_embedding_dimension() or 0),
+        load_seconds=round(load_seconds, 3),
+        rss_delta_mb=round(rss_after - rss_before, 1) if None not in (rss_before, rss_after) else None,
+        rss_after_mb=round(rss_after, 1) if rss_after is not None else None,
+        cuda_mb=round(_cuda_mb(), 1),
+        loaded_at=time.time(),
+        backend=backend,
+    )
+    logger.info(
+        "[model_registry] loaded %s (%s) on %s in %.2fs (rss +%s MB → %s MB, cuda %.0f MB)",
+        name, backend, device, stats.load_seconds, stats.rss_delta_mb, stats.rss_after_mb, stats.cuda_mb,
+    )
+    return EmbeddingModel(name, st, stats)
+
+
+def get_embedding_model(name: str = EMBED_MODEL_NAME, device: Optional[str] = None) -> EmbeddingModel:
+    """Modeli süreç içinde bir kez yükler; eşzamanlı ilk çağrılar aynı yüklemeyi bekler."""
+    m = _models.get(name)
+    if m is not None:
+        return m
+    with _registry_lock:
+        m = _models.get(name)
+        if m is None:
+            m = _load(name, device or pick_device())
+            _models[name] = m
+    return m
+
+
+def warmup_models(names: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+    """Modelleri yükler ve ilk encode maliyetini (lazy init, kernel seçimi) isteğe yansıtmaz."""
+    out = []
+    for name in names or [EMBED_MODEL_NAME]:
+        m = get_embedding_model(name)
+        t0 = time.perf_counter()
+        m.encode(["ısınma sorgusu"], normalize_embeddings=True)
+        logger.info("[model_registry] warmup encode %s: %.3fs", name, time.perf_counter() - t0)
+        out.append(asdict(m.stats))
+    return out
+
+
+def model_stats() -> List[Dict[str, Any]]:
+    return [asdict(m.stats) for m in _models.values()]
@@ -0,0 +1,246 @@
+"""
+onnx_embedder.py
+----------------
+Opsiyonel ONNX Runtime embedding arka ucu (EMBED_BACKEND = "onnx" | "onnx-int8").
+
+- export_onnx: SentenceTransformer modelinin transformer gövdesini ONNX'e aktarır,
+  istenirse dinamik int8 quantization uygular; çıktı ONNX_CACHE_DIR altında saklanır
+  ve sonraki açılışlarda yeniden kullanılır.
+- OnnxEmbedder: SentenceTransformer.encode ile aynı imzayı sunar (pooling + normalize
+  numpy'da yapılır); model_registry ve toplu indeksleyici doğrudan kullanabilir.
+- compare_backends: PyTorch vektörleriyle kosinüs uyumu ve top-k örtüşmesi ölçer.
+  Arka ucu açmadan önce kalite kontrolü:
+
+    python -m src.retrieval.onnx_embedder --backend onnx-int8 --docs data/interim/balanced_total30k.jsonl
+
+onnxruntime kurulu değilse model_registry PyTorch'a geri düşer.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.rag.config import EMBED_MODEL_NAME, ONNX_CACHE_DIR
+from src.retrieval.eval_queries import load_queries
+
+logger = logging.getLogger("uvicorn.error")
+
+# Kalite kontrolünde geçme eşikleri
+MIN_MEAN_COSINE = 0.99
+MIN_TOPK_OVERLAP = 0.90
+
+
+
+def _cache_dir(model_name: str, quantize: bool) -> Path:
+    safe = model_name.replace("/", "__")
+    return Path(ONNX_CACHE_DIR) / (safe + ("-int8" if quantize else ""))
+
+
+def _pooling_mode(st: Any) -> str:
+    for module in st:
+        cfg = getattr(module, "get_config_dict", lambda: {})()
+        if cfg.get("pooling_mode_cls_token"):
+            return "cls"
+        if cfg.get("pooling_mode_mean_tokens"):
+            return "mean"
+    return "mean"
+
+
+def export_onnx(model_name: str = EMBED_MODEL_NAME, quantize: bool = False, opset: int = 17) -> Path:
+    """Modeli ONNX'e aktarır (önbellekte varsa yeniden kullanır); model dizinini döner."""
+    out_dir = _cache_dir(model_name, quantize)
+    if (out_dir / "model.onnx").exists() and (out_dir / "lexai_onnx.json").exists():
+        return out_dir
+
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    fp32_dir = _cache_dir(model_name, False)
+    fp32_dir.mkdir(parents=True, exist_ok=True)
+    if not (fp32_dir / "model.onnx").exists():
+        print(f"Exporting {model_name} to ONNX → {fp32_dir}")
+        st = SentenceTransformer(model_name, device="cpu")
+        hf = st[0].auto_model.eval()
+        tok = st.tokenizer
+        dummy = tok(["örnek karar metni"], return_tensors="pt")
+        with torch.no_grad():
+            torch.onnx.export(
+                hf,
+                (dummy["input_ids"], dummy["attention_mask"]),
+                str(fp32_dir / "model.onnx"),
+                input_names=["input_ids", "attention_mask"],
+                output_names=["last_hidden_state"],
+                dynamic_axes={
+                    "input_ids": {0: "batch", 1: "seq"},
+                    "attention_mask": {0: "batch", 1: "seq"},
+                    "last_hidden_state": {0: "batch", 1: "seq"},
+                },
+                opset_version=opset,
+            )
+        tok.save_pretrained(str(fp32_dir))
+        meta = {
+            "model": model_name,
+            "pooling": _pooling_mode(st),
+            "max_seq_length": int(st.max_seq_length),
+            "dim": int(st.get_sentence_embedding_dimension()),
+        }
+        (fp32_dir / "lexai_onnx.json").write_text(json.dumps(meta), encoding="utf-8")
+
+    if not quantize:
+        return fp32_dir
+
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    print(f"Quantizing (dynamic int8) → {out_dir}")
+    quantize_dynamic(
+        str(fp32_dir / "model.onnx"),
+        str(out_dir / "model.onnx"),
+        weight_type=QuantType.QInt8,
+        use_external_data_format=True,
+    )
+    for f in fp32_dir.iterdir():
+        if f.name != "model.onnx" and not f.name.endswith(".data") and f.is_file():
+            (out_dir / f.name).write_bytes(f.read_bytes())
+    return out_dir
+
+
+class OnnxEmbedder:
+    """SentenceTransformer.encode ile uyumlu, ONNX Runtime üzerinde çalışan embedder."""
+
+    def __init__(self, model_dir: Path, threads: Optional[int] = None):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.model_dir = Path(model_dir)
+        meta = json.loads((self.model_dir / "lexai_onnx.json").read_text(encoding="utf-8"))
+        self.pooling = meta["pooling"]
+        self.max_seq_length = int(meta["max_seq_length"])
+        self._dim = int(meta["dim"])
+        self.tokenizer = AutoTokenizer.from_pretrained(str(self.model_dir))
+
+        so = ort.SessionOptions()
+        so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            so.intra_op_num_threads = int(threads)
+        self.session = ort.InferenceSession(str(self.model_dir / "model.onnx"), so, providers=["CPUExecutionProvider"])
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self._dim
+
+    def encode(
+        self,
+        sentences,
+        batch_size: int = 32,
+        normalize_embeddings: bool = False,
+        show_progress_bar: bool = False,
+        convert_to_numpy: bool = True,
+        **_: Any,
+    ) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        out = np.empty((len(texts), self._dim), dtype=np.float32)
+        for s in range(0, len(texts), max(1, batch_size)):
+            batch = texts[s:s + batch_size]
+            enc = self.tokenizer(batch, padding=True, truncation=True, max_length=self.max_seq_length, return_tensors="np")
+            mask = enc["attention_mask"].astype(np.int64)
+            hidden = self.session.run(None, {"input_ids": enc["input_ids"].astype(np.int64), "attention_mask": mask})[0]
+            if self.pooling == "cls":
+                emb = hidden[:, 0]
+            else:
+                m = mask[..., None].astype(np.float32)
+                emb = (hidden * m).sum(axis=1) / np.maximum(m.sum(axis=1), 1e-9)
+            out[s:s + len(batch)] = emb
+        if normalize_embeddings:
+            out /= np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+        return out[0] if single else out
+
+
+def load_onnx_embedder(model_name: str = EMBED_MODEL_NAME, quantize: bool = False, threads: Optional[int] = None) -> OnnxEmbedder:
+    return OnnxEmbedder(export_onnx(model_name, quantize=quantize), threads=threads)
+
+
+# ==================== Kalite kontrolü ====================
+
+def compare_backends(reference: Any, candidate: Any, queries: Sequence[str], docs: Sequence[str], k: int = 10) -> Dict[str, Any]:
+    """
+    reference (PyTorch) ve candidate (ONNX) vektörlerini karşılaştırır:
+    - cosine: aynı sorgu/doküman için iki vektör arasındaki kosinüs (ortalama / en düşük)
+    - overlap@k: her sorguda doküman kümesindeki ilk k sonucun örtüşme oranı
+    - speedup: sorgu encode süre oranı
+    """
+    def _enc(m: Any, texts: Sequence[str]) -> "tuple[np.ndarray, float]":
+        t0 = time.perf_counter()
+        v = np.asarray(m.encode(list(texts), normalize_embeddings=True, batch_size=16), dtype=np.float32)
+        return v, time.perf_counter() - t0
+
+    rq, t_ref = _enc(reference, queries)
+    cq, t_cand = _enc(candidate, queries)
+    rd, _ = _enc(reference, docs)
+    cd, _ = _enc(candidate, docs)
+
+    cos = np.concatenate([(rq * cq).sum(axis=1), (rd * cd).sum(axis=1)])
+    k = min(k, len(docs))
+    ref_top = np.argsort(-(rq @ rd.T), axis=1)[:, :k]
+    cand_top = np.argsort(-(cq @ cd.T), axis=1)[:, :k]
+    overlaps = [len(set(a) & set(b)) / k for a, b in zip(ref_top, cand_top)]
+
+    report = {
+        "queries": len(queries),
+        "docs": len(docs),
+        "k": k,
+        "mean_cosine": float(cos.mean()),
+        "min_cosine": float(cos.min()),
+        "mean_overlap": float(np.mean(overlaps)),
+        "min_overlap": float(np.min(overlaps)),
+        "query_encode_speedup": round(t_ref / t_cand, 2) if t_cand > 0 else None,
+    }
+    report["pass"] = report["mean_cosine"] >= MIN_MEAN_COSINE and report["mean_overlap"] >= MIN_TOPK_OVERLAP
+    return report
+
+
+def _read_docs(path: str, n: int) -> List[str]:
+    out = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            rec = json.loads(line)
+            txt = (rec.get("karar_metni") or "").strip()
+            if txt:
+                out.append(txt[:2000])
+            if len(out) >= n:
+                break
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="ONNX embedding arka ucu için kalite kontrolü")
+    ap.add_argument("--model", default=EMBED_MODEL_NAME)
+    ap.add_argument("--backend", choices=["onnx", "onnx-int8"], default="onnx-int8")
+    ap.add_argument("--queries", default=None, help="Satır başına bir sorgu (varsayılan: yerleşik küme)")
+    ap.add_argument("--docs", required=True, help="Karar JSONL dosyası (karar_metni alanı)")
+    ap.add_argument("--n-docs", type=int, default=500)
+    ap.add_argument("--k", type=int, default=10)
+    a = ap.parse_args()
+
+    from sentence_transformers import SentenceTransformer
+
+    queries = load_queries(a.queries)
+    docs = _read_docs(a.docs, a.n_docs)
+
+    ref = SentenceTransformer(a.model, device="cpu")
+    cand = load_onnx_embedder(a.model, quantize=a.backend == "onnx-int8")
+    report = compare_backends(ref, cand, queries, docs, k=a.k)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    print("PASS" if report["pass"] else f"FAIL (eşikler: cosine ≥ {MIN_MEAN_COSINE}, overlap ≥ {MIN_TOPK_OVERLAP})")
+    sys.exit(0 if report["pass"] else 1)
+
+
+if __name__ == "__main__":
+    main()
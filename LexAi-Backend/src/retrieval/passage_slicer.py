@@ -0,0 +1,210 @@
+"""
+passage_slicer.py
+-----------------
+Sorguya duyarlı karar metni dilimleme.
+
+Uzun karar metinleri baştan kesilmek yerine cümle/paragraf birimlerine bölünür.
+Birimler önce sorguyla sözcük (kök öneki) örtüşmesine göre ucuzca sıralanır; her
+karardan en iyi SLICE_ENCODE_PER_HIT birim, istek başına SLICE_ENCODE_BUDGET birim /
+SLICE_ENCODE_BUDGET_CHARS karakter sınırı içinde tek toplu (batched) encode ile sorgu
+vektörüne göre skorlanır. En yüksek skorlu birimler MAX_PASSAGE_CHARS sınırına kadar,
+metindeki sıralarıyla birleştirilir; encode edilmeyen birimler sözcük skoruyla onların
+arkasına dizilir. Gerekçe çoğu zaman metnin ortasında ya da sonunda olduğundan baştan
+kesmeye göre daha yoğun ve kısa pasajlar çıkar.
+
+Kullanım:
+    slice_hits(query, query_vec, hits, model)   # hits[i].text_full yerinde güncellenir
+"""
+from __future__ import annotations
+
+import re
+from typing import Any, List, Sequence, Set, Tuple
+
+import numpy as np
+
+from src.rag.config import (
+    MAX_PASSAGE_CHARS, SLICE_UNIT_CHARS, SLICE_MAX_UNITS,
+    SLICE_ENCODE_PER_HIT, SLICE_ENCODE_BUDGET, SLICE_ENCODE_BUDGET_CHARS,
+)
+
+SLICE_SEP = " … "
+
+_BOUNDARY_RE = re.compile(r"\n\s*\n+|(?<=[\.\!\?;:])\s+(?=[A-ZÇĞİÖŞÜ0-9\"'(])")
+_WORD_RE = re.compile(r"\w+")
+_PREFIX = 5   # Türkçe ekler için kaba kök: sözcüğün ilk 5 harfi (kiracının / kiracıya → kirac)
+
+Span = Tuple[int, int]
+
+
+def _sentence_spans(text: str) -> List[Span]:
+    """Paragraf boşlukları ve cümle sonlarından bölünmüş karakter aralıkları."""
+    spans: List[Span] = []
+    s = 0
+    for m in _BOUNDARY_RE.finditer(text):
+        spans.append((s, m.start()))
+        s = m.end()
+    spans.append((s, len(text)))
+    return [(a, b) for a, b in spans if b > a and text[a:b].strip()]
+
+
+def split_units(text: str, unit_chars: int = SLICE_UNIT_CHARS, max_units: int = SLICE_MAX_UNITS) -> List[Span]:
+    """
+    Metni ardışık cümlelerden oluşan, yaklaşık unit_chars uzunluğunda birimlere böler
+    (karakter aralıkları). Birim sayısı max_units'i aşmasın diye birim boyu büyütülür.
+    """
+    if not text:
+        return []
+    size = max(int(unit_chars), -(-len(text) // max(1, int(max_units))))
+    units: List[Span] = []
+    cur_a = cur_b = None
+    for a, b in _sentence_spans(text):
+        # tek başına çok uzun cümle: boşluktan bölerek parçala
+        while b - a > size:
+            cut = text.rfind(" ", a + size // 2, a + size)
+            cut = cut if cut > a else a + size
+            if cur_a is not None:
+                units.append((cur_a, cur_b))
+                cur_a = None
+            units.append((a, cut))
+            a = cut
+        if cur_a is None:
+            cur_a, cur_b = a, b
+        elif b - cur_a <= size:
+            cur_b = b
+        else:
+            units.append((cur_a, cur_b))
+            cur_a, cur_b = a, b
+    if cur_a is not None:
+        units.append((cur_a, cur_b))
+    return units
+
+
+def _terms(text: str) -> Set[str]:
+    text = text.replace("İ", "i").replace("I", "ı").lower()
+    return {w[:_PREFIX] for w in _WORD_RE.findall(text) if len(w) >= 3 or w.isdigit()}
+
+
+def lexical_scores(query_terms: Set[str], text: str, units: Sequence[Span]) -> np.ndarray:
+    """Birim başına sorgudaki farklı terimlerden kaçını içerdiği (0..1); encode gerektirmez."""
+    if not query_terms:
+        return np.zeros(len(units), dtype=np.float32)
+    return np.array(
+        [len(query_terms & _terms(text[a:b])) / len(query_terms) for a, b in units], dtype=np.float32
+    )
+
+
+def select_windows(text: str, units: Sequence[Span], scores: np.ndarray, max_chars: int = MAX_PASSAGE_CHARS) -> str:
+    """En yüksek skorlu birimleri max_chars'a kadar seçip metin sırasıyla birleştirir."""
+    picked: List[int] = []
+    used = 0
+    for i in np.argsort(-scores, kind="stable"):
+        a, b = units[int(i)]
+        cost = (b - a) + (len(SLICE_SEP) if picked else 0)
+        if used + cost > max_chars:
+            continue
+        picked.append(int(i))
+        used += cost
+    if not picked:  # en iyi birim bile sığmıyor: onu kes
+        a, b = units[int(np.argmax(scores))]
+        return text[a:a + max_chars].strip()
+
+    picked.sort()
+    parts: List[str] = []
+    prev_end = None
+    for i in picked:
+        a, b = units[i]
+        chunk = text[a:b].strip()
+        if prev_end is not None and text[prev_end:a].strip():
+            parts.append(SLICE_SEP)
+        elif parts:
+            parts.append(" ")
+        parts.append(chunk)
+        prev_end = b
+    return "".join(parts)
+
+
+def _encode_plan(
+    lex: Sequence[np.ndarray],
+    units: Sequence[Sequence[Span]],
+    per_hit: int,
+    budget: int,
+    budget_chars: int,
+) -> List[List[int]]:
+    """
+    Encode edilecek birimler (iş başına indeksler). Her işin sözcük skoru en yüksek
+    per_hit birimi sırayla (tur tur, önce her işin en iyisi) istek bütçesine yerleştirilir.
+    """
+    ranked = [list(np.argsort(-s, kind="stable")[:per_hit]) for s in lex]
+    plan: List[List[int]] = [[] for _ in ranked]
+    n = chars = 0
+    for r in range(per_hit):
+        for j, order in enumerate(ranked):
+            if r >= len(order):
+                continue
+            a, b = units[j][int(order[r])]
+            if n + 1 > budget or chars + (b - a) > budget_chars:
+                continue
+            plan[j].append(int(order[r]))
+            n += 1
+            chars += b - a
+    return plan
+
+
+def slice_texts(
+    query: str,
+    query_vec: np.ndarray,
+    texts: Sequence[str],
+    model: Any,
+    max_chars: int = MAX_PASSAGE_CHARS,
+    per_hit: int = SLICE_ENCODE_PER_HIT,
+    budget: int = SLICE_ENCODE_BUDGET,
+    budget_chars: int = SLICE_ENCODE_BUDGET_CHARS,
+) -> List[str]:
+    """
+    Her metin için sorguya en yakın birimlerden oluşan özü döner. max_chars'tan kısa
+    metinler olduğu gibi kalır. Uzun olanların birimleri sözcük örtüşmesiyle ön elenir;
+    yalnızca bütçeye giren birimler tek encode çağrısında skorlanır.
+    """
+    out = list(texts)
+    q_terms = _terms(query)
+    jobs: List[Tuple[int, List[Span]]] = []
+    lex: List[np.ndarray] = []
+    for i, t in enumerate(texts):
+        if not t or len(t) <= max_chars:
+            continue
+        units = split_units(t)
+        if not units:
+            continue
+        jobs.append((i, units))
+        lex.append(lexical_scores(q_terms, t, units))
+
+    if not jobs:
+        return out
+
+    plan = _encode_plan(lex, [u for _, u in jobs], per_hit, budget, budget_chars)
+    unit_texts = [texts[i][units[u][0]:units[u][1]] for (i, units), sel in zip(jobs, plan) for u in sel]
+    sims = np.zeros(0, dtype=np.float32)
+    if unit_texts:
+        embs = np.asarray(model.encode(unit_texts, normalize_embeddings=True), dtype=np.float32)
+        sims = embs @ np.asarray(query_vec, dtype=np.float32).reshape(-1)
+
+    k = 0
+    for (i, units), lex_s, sel in zip(jobs, lex, plan):
+        # Encode edilen birimler kosinüsle öne, kalanlar sözcük skoruyla arkaya dizilir
+        scores = lex_s - 2.0
+        scores[sel] = sims[k:k + len(sel)]
+        k += len(sel)
+        out[i] = select_windows(texts[i], units, scores, max_chars)
+    return out
+
+
+def slice_hits(query: str, query_vec: np.ndarray, hits: Sequence[Any], model: Any, max_chars: int = MAX_PASSAGE_CHARS) -> int:
+    """hits[i].text_full alanını sorguya duyarlı özle değiştirir; dilimlenen hit sayısını döner."""
+    texts = [h.text_full or "" for h in hits]
+    sliced = slice_texts(query, query_vec, texts, model, max_chars)
+    n = 0
+    for h, old, new in zip(hits, texts, sliced):
+        if new is not old:
+            h.text_full = new
+            n += 1
+    return n
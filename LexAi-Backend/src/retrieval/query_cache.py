@@ -0,0 +1,170 @@
+"""
+query_cache.py
+--------------
+Sorgu vektörleri için sınırlı (LRU) önbellek.
+
+- Anahtar: (model adı, text_cleaner ile normalize edilmiş sorgu); encode edilen ise
+  özgün sorgudur (büyük/küçük harf, kanun ve madde numaraları modele olduğu gibi gider).
+  Yalnızca normalizasyonda farklılaşan sorgular ilk görülen biçimin vektörünü paylaşır.
+- İsteğe bağlı TTL (saniye) ve hit/miss sayaçları
+- İsteğe bağlı küçük disk rafı (shelve): kapanışta yazılır, açılışta okunur;
+  yeniden başlayan worker sık sorulan sorularla ısınmış olarak başlar.
+
+Kullanım:
+    from src.retrieval.query_cache import encode_query
+    qvec = encode_query(model, "kira tespiti")   # np.ndarray (d,), normalize edilmiş
+"""
+from __future__ import annotations
+
+import logging
+import shelve
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from src.rag.config import (
+    EMBED_MODEL_NAME,
+    QUERY_CACHE_SIZE, QUERY_CACHE_TTL, QUERY_CACHE_SHELF, QUERY_CACHE_SHELF_MAX,
+)
+from src.user_input.text_cleaner import clean_text
+
+logger = logging.getLogger("uvicorn.error")
+
+Key = Tuple[str, str]
+
+
+def normalize_query(query: str) -> str:
+    """Önbellek anahtarı: temizlenmiş sorgu (temizlik boş dönerse ham sorgu). Encode için kullanılmaz."""
+    return clean_text(query or "") or (query or "").strip()
+
+
+class QueryVectorCache:
+    def __init__(
+        self,
+        maxsize: int = QUERY_CACHE_SIZE,
+        ttl: Optional[float] = QUERY_CACHE_TTL,
+        shelf_path: Optional[str] = QUERY_CACHE_SHELF,
+        shelf_max: int = QUERY_CACHE_SHELF_MAX,
+    ):
+        self.maxsize = max(1, int(maxsize))
+        self.ttl = ttl
+        self.shelf_path = shelf_path
+        self.shelf_max = shelf_max
+        self._data: "OrderedDict[Key, Tuple[np.ndarray, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._loaded = False
+
+    @staticmethod
+    def _shelf_key(key: Key) -> str:
+        return f"{key[0]}\x1f{key[1]}"
+
+    def _expired(self, ts: float) -> bool:
+        return self.ttl is not None and (time.time() - ts) > self.ttl
+
+    def get(self, key: Key) -> Optional[np.ndarray]:
+        self._ensure_loaded()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or self._expired(item[1]):
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key: Key, vec: np.ndarray) -> np.ndarray:
+        vec = np.array(vec, dtype=np.float32)
+        vec.setflags(write=False)  # paylaşılan nesne: çağıranlar yerinde değiştiremesin
+        with self._lock:
+            self._data[key] = (vec, time.time())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        return vec
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "ttl": self.ttl,
+            "shelf": self.shelf_path,
+        }
+
+    # ---------------- disk rafı ----------------
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            if not self.shelf_path:
+                return
+            try:
+                with shelve.open(self.shelf_path, flag="r") as db:
+                    items = []
+                    for k in db.keys():
+                        model_name, _, text = k.partition("\x1f")
+                        v, ts = db[k]
+                        if not self._expired(ts):
+                            items.append(((model_name, text), np.frombuffer(v, dtype=np.float32), ts))
+            except Exception as e:  # raf yok / bozuk: soğuk başla
+                logger.info("[query_cache] shelf not loaded (%s): %s", self.shelf_path, e)
+                return
+            items.sort(key=lambda t: t[2])
+            for key, vec, ts in items[-self.maxsize:]:
+                self._data[key] = (vec, ts)
+            logger.info("[query_cache] warmed %d query vectors from %s", len(self._data), self.shelf_path)
+
+    def persist(self) -> int:
+        """En son kullanılan shelf_max girdiyi diske yazar (uygulama kapanışında çağrılır)."""
+        if not self.shelf_path:
+            return 0
+        with self._lock:
+            items = list(self._data.items())[-self.shelf_max:]
+        try:
+            Path(self.shelf_path).parent.mkdir(parents=True, exist_ok=True)
+            with shelve.open(self.shelf_path, flag="n") as db:
+                for key, (vec, ts) in items:
+                    db[self._shelf_key(key)] = (vec.tobytes(), ts)
+        except Exception as e:
+            logger.warning("[query_cache] shelf write failed (%s): %s", self.shelf_path, e)
+            return 0
+        return len(items)
+
+
+_cache = QueryVectorCache()
+
+
+def get_query_cache() -> QueryVectorCache:
+    return _cache
+
+
+def encode_query(model: Any, query: str, model_name: Optional[str] = None) -> np.ndarray:
+    """Sorgu vektörünü normalize anahtarla önbellekten döner; yoksa özgün sorguyu encode edip saklar."""
+    key = (model_name or getattr(model, "name", None) or EMBED_MODEL_NAME, normalize_query(query))
+    vec = _cache.get(key)
+    if vec is None:
+        vec = model.encode((query or "").strip(), normalize_embeddings=True)
+        vec = _cache.put(key, np.asarray(vec, dtype=np.float32).reshape(-1))
+    return vec
@@ -0,0 +1,232 @@
+"""
+result_cache.py
+---------------
+hybrid_search önünde duran retrieval sonuç önbelleği.
+
+- Anahtar: normalize edilmiş sorgu + topn + retrieval parametreleri + indeks sürümü
+  (index_version.current_index_version). İndeksleyiciler yeni nesil yayınladığında
+  anahtar değişir, eski girdiler kendiliğinden kullanılmaz ve TTL ile düşer.
+- Backend'ler:
+    InProcessBackend  → süreç içi LRU (varsayılan)
+    SharedBackend     → get/set(ex=) arayüzlü herhangi bir paylaşımlı depo (ör. redis-py istemcisi)
+    InMemoryKV        → SharedBackend için bellek içi yedek (testler / tek süreçli geliştirme)
+"""
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import json
+import logging
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Protocol, Tuple
+
+from src.rag.config import (
+    RESULT_CACHE_BACKEND, RESULT_CACHE_SIZE, RESULT_CACHE_TTL, RESULT_CACHE_URL,
+)
+from src.retrieval.index_version import current_index_version
+from src.retrieval.query_cache import normalize_query
+
+logger = logging.getLogger("uvicorn.error")
+
+_KEY_PREFIX = "lexai:retrieval:"
+
+
+class CacheBackend(Protocol):
+    def get(self, key: str) -> Optional[Any]: ...
+    def set(self, key: str, value: Any, ttl: Optional[float]) -> None: ...
+    def clear(self) -> None: ...
+
+
+class InProcessBackend:
+    """Süreç içi, thread-safe LRU; değerler nesne olarak (kopyalanmadan) saklanır."""
+
+    def __init__(self, maxsize: int = RESULT_CACHE_SIZE):
+        self.maxsize = max(1, int(maxsize))
+        self._data: "OrderedDict[str, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires is not None and time.time() > expires:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float]) -> None:
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl if ttl else None)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class InMemoryKV:
+    """redis-py'nin get/set(ex=)/delete alt kümesini taklit eden bellek içi depo."""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[bytes, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            if item[1] is not None and time.time() > item[1]:
+                del self._data[key]
+                return None
+            return item[0]
+
+    def set(self, key: str, value: bytes, ex: Optional[int] = None) -> None:
+        with self._lock:
+            self._data[key] = (value, time.time() + ex if ex else None)
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for k in keys:
+                self._data.pop(k, None)
+
+    def scan_iter(self, match: str = "*"):
+        prefix = match.rstrip("*")
+        with self._lock:
+            return [k for k in list(self._data) if k.startswith(prefix)]
+
+
+class SharedBackend:
+    """Süreçler arası paylaşılan depo; değerler pickle ile serileştirilir."""
+
+    def __init__(self, client: Any):
+        self.client = client
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self.client.get(key)
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float]) -> None:
+        self.client.set(key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), ex=int(ttl) if ttl else None)
+
+    def clear(self) -> None:
+        keys = list(self.client.scan_iter(match=f"{_KEY_PREFIX}*"))
+        if keys:
+            self.client.delete(*keys)
+
+
+def build_backend(kind: str = RESULT_CACHE_BACKEND, url: Optional[str] = RESULT_CACHE_URL) -> CacheBackend:
+    if kind == "shared":
+        if url:
+            try:
+                import redis  # opsiyonel bağımlılık
+                return SharedBackend(redis.Redis.from_url(url))
+            except ImportError:
+                logger.warning("[result_cache] redis paketi yok; süreç içi önbelleğe düşülüyor")
+                return InProcessBackend()
+        return SharedBackend(InMemoryKV())
+    return InProcessBackend()
+
+
+class ResultCache:
+    def __init__(self, backend: Optional[CacheBackend] = None, ttl: Optional[float] = RESULT_CACHE_TTL):
+        self.backend = backend or build_backend()
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.bypass = 0
+        self.errors = 0
+
+    @staticmethod
+    def make_key(query: str, topn: int, params: Dict[str, Any], version: str) -> str:
+        raw = json.dumps(
+            {"q": normalize_query(query), "topn": int(topn), "params": params, "v": version},
+            sort_keys=True, ensure_ascii=False, default=str,
+        )
+        return _KEY_PREFIX + hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def get_or_compute(
+        self,
+        query: str,
+        topn: int,
+        params: Dict[str, Any],
+        compute: Callable[[], Tuple[List[Any], Dict[str, Any]]],
+        cacheable: Callable[[Tuple[List[Any], Dict[str, Any]]], bool] = lambda r: True,
+    ) -> Tuple[List[Any], Dict[str, Any]]:
+        version = current_index_version()
+        if version == "unknown":
+            self.bypass += 1
+            hits, meta = compute()
+            return hits, {**meta, "cache": "bypass"}
+
+        key = self.make_key(query, topn, params, version)
+        try:
+            cached = self.backend.get(key)
+        except Exception as e:
+            self.errors += 1
+            logger.warning("[result_cache] get failed: %s", e)
+            cached = None
+
+        if cached is not None:
+            self.hits += 1
+            hits, meta = cached
+            return list(hits), {**meta, "cache": "hit", "index_version": version}
+
+        self.misses += 1
+        hits, meta = compute()
+        if cacheable((hits, meta)):
+            try:
+                self.backend.set(key, (_strip_vectors(hits), meta), self.ttl)
+            except Exception as e:
+                self.errors += 1
+                logger.warning("[result_cache] set failed: %s", e)
+        return hits, {**meta, "cache": "miss", "index_version": version}
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypass": self.bypass,
+            "errors": self.errors,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "ttl": self.ttl,
+        }
+
+
+def _strip_vectors(hits: List[Any]) -> List[Any]:
+    """MMR sonrası vektörlere ihtiyaç yok; önbellekte yer kaplamasınlar."""
+    out = []
+    for h in hits:
+        if dataclasses.is_dataclass(h) and getattr(h, "vector", None) is not None:
+            h = dataclasses.replace(h, vector=None)
+        out.append(h)
+    return out
+
+
+_result_cache: Optional[ResultCache] = None
+_init_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultCache:
+    global _result_cache
+    if _result_cache is None:
+        with _init_lock:
+            if _result_cache is None:
+                _result_cache = ResultCache()
+    return _result_cache
+
+
+def set_result_cache(cache: ResultCache) -> None:
+    """Testler / özel kurulumlar için önbelleği değiştirir."""
+    global _result_cache
+    _result_cache = cache
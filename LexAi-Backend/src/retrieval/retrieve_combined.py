@@ -1,25 +1,47 @@
 from __future__ import annotations
 import argparse
+import logging
+import math
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
 from dataclasses import dataclass
-from typing import List, Dict, Any, Tuple
+from typing import Callable, List, Dict, Any, Optional, Tuple
 
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 
-from opensearchpy import OpenSearch
-from qdrant_client import QdrantClient
 from qdrant_client.http import models as rest
 from sentence_transformers import SentenceTransformer
-import torch
 
+from src.retrieval.model_registry import get_embedding_model
+from src.retrieval.clients import call_opensearch, call_qdrant, qdrant_search_params
+from src.retrieval.chunking import ChunkHit, collapse_chunks
+from src.retrieval.fusion import FUSION_METHODS, fuse, to_unit
+from src.retrieval.index_schema import (
+    DETAIL_SOURCE_FIELDS, FULL_TEXT_FIELD, HOT_SOURCE_FIELDS, PREVIEW_FIELD, QDRANT_FULL_TEXT_FIELD,
+    SEARCH_FIELDS, SUMMARY_FIELDS,
+)
+from src.retrieval.mmr import mmr_indices
+from src.retrieval.passage_slicer import slice_hits
+from src.retrieval.query_cache import encode_query
+from src.retrieval.result_cache import get_result_cache
 from src.rag.config import (
-    OS_HOST, OS_PORT, OS_INDEX,
-    QDRANT_HOST, QDRANT_PORT, QDRANT_COLLECTION,
-    EMBED_MODEL_NAME,
-    TOP_K_OS, TOP_K_QDRANT, MMR_LAMBDA, DEFAULT_TOPN,
-    MAX_PASSAGE_CHARS
+    OS_INDEX, OS_MIN_SHOULD_MATCH,
+    QDRANT_COLLECTION,
+    EMBED_MODEL_NAME, EMBED_BACKEND,
+    TOP_K_OS, TOP_K_QDRANT, MMR_LAMBDA, MMR_MAX_CANDIDATES, DEFAULT_TOPN,
+    MAX_PASSAGE_CHARS, SLICE_ENABLED, SLICE_UNIT_CHARS, SLICE_ENCODE_PER_HIT, SLICE_ENCODE_BUDGET,
+    OS_LEG_TIMEOUT, QDRANT_LEG_TIMEOUT, RETRIEVAL_LEG_WORKERS,
+    RESULT_CACHE_ENABLED,
+    QDRANT_CHUNKED, CHUNK_POOLING, CHUNK_OVERFETCH,
+    QDRANT_QUANT_MODE, QDRANT_QUANT_OVERSAMPLING,
+    FUSION_METHOD, FUSION_WEIGHTS, RRF_K,
 )
 
+logger = logging.getLogger("uvicorn.error")
+
+# BM25 ve dense bacakları için paylaşılan thread havuzu (istek başına kurulmaz)
+_LEG_EXECUTOR = ThreadPoolExecutor(max_workers=RETRIEVAL_LEG_WORKERS, thread_name_prefix="retrieval-leg")
+
 
 @dataclass
 class Hit:
@@ -30,34 +52,8 @@ class Hit:
     payload: Dict[str, Any]
     text_repr: str
     text_full: str
-
-
-def _device():
-    if torch.cuda.is_available():
-        return "cuda"
-    elif torch.backends.mps.is_available():
-        return "mps"
-    return "cpu"
-
-
-def _build_opensearch() -> OpenSearch:
-    return OpenSearch(
-        hosts=[{"host": OS_HOST, "port": OS_PORT}],
-        scheme="http",
-        use_ssl=False,
-        verify_certs=False,
-        ssl_show_warn=False,
-        timeout=60,
-    )
-
-
-def _build_qdrant() -> QdrantClient:
-    return QdrantClient(
-        host=QDRANT_HOST,
-        port=QDRANT_PORT,
-        timeout=60.0,
-        prefer_grpc=True,
-    )
+    vector: Optional[np.ndarray] = None   # Qdrant'ta saklı bge-m3 vektörü (MMR için)
+    passage: Optional[str] = None         # Parça modunda sorguyla eşleşen parça(lar)ın metni
 
 
 def _minmax_norm(vals: List[float]) -> List[float]:
@@ -71,40 +67,41 @@ def _minmax_norm(vals: List[float]) -> List[float]:
 
 def _text_fields(payload: Dict[str, Any]) -> Tuple[str, str]:
     """
-    JSONL ve Qdrant/OpenSearch kayıtlarında karar metnini çıkarır.
-    - karar_metni → tam karar metni
-    - karar_preview → özet
+    Qdrant/OpenSearch kayıtlarında karar metnini çıkarır.
+    - QDRANT_FULL_TEXT_FIELD / FULL_TEXT_FIELD → tam karar metni (aday aşamasında
+      OpenSearch tam metni göndermez; seçilen hit'ler hydrate_full_text ile dolar)
+    - PREVIEW_FIELD → özet
+    Kırpma burada yapılmaz; seçilen hit'ler passage_slicer ile sorguya göre dilimlenir.
     """
-    text_full = (payload.get("karar_metni_meta") or "").strip()
-    text_repr = (payload.get("karar_preview") or text_full[:400]).strip()
-
-    if len(text_full) > MAX_PASSAGE_CHARS:
-        text_full = text_full[:MAX_PASSAGE_CHARS]
-
+    text_full = (payload.get(QDRANT_FULL_TEXT_FIELD) or payload.get(FULL_TEXT_FIELD) or "").strip()
+    text_repr = (payload.get(PREVIEW_FIELD) or text_full[:400]).strip()
     return text_repr, text_full
 
 
-def search_opensearch(query: str, top_k: int = TOP_K_OS) -> List[Hit]:
-    client = _build_opensearch()
+def search_opensearch(query: str, top_k: int = TOP_K_OS, timeout: Optional[float] = None) -> List[Hit]:
+    """
+    timeout (saniye): hem istemci isteğine hem sunucu aramasına uygulanır; bacak son
+    tarihi geçtiğinde arka plandaki thread de serbest kalır.
+    """
+    # Aday aşamasında yalnızca önizleme + metadata; tam metin seçilen top-N için hydrate_full_text ile gelir
     body = {
         "size": top_k,
+        "_source": {"includes": HOT_SOURCE_FIELDS},
         "query": {
             "multi_match": {
                 "query": query,
                 "type": "best_fields",
-                "fields": [
-                    "dava_turu^4",
-                    "laws_norm^3",
-                    "karar_metni^3",
-                    "karar_preview^2",
-                    "sonuc^1.5"
-                ],
-                "operator": "and",
+                "fields": SEARCH_FIELDS,
+                "minimum_should_match": OS_MIN_SHOULD_MATCH,
             }
         },
     }
 
-    res = client.search(index=OS_INDEX, body=body)
+    kw: Dict[str, Any] = {}
+    if timeout:
+        body["timeout"] = f"{int(timeout * 1000)}ms"
+        kw["request_timeout"] = timeout
+    res = call_opensearch(lambda c: c.search(index=OS_INDEX, body=body, **kw))
     hits = res.get("hits", {}).get("hits", [])
     scores = [float(h.get("_score", 0.0)) for h in hits]
     scores_norm = _minmax_norm(scores)
@@ -128,16 +125,28 @@ def search_opensearch(query: str, top_k: int = TOP_K_OS) -> List[Hit]:
     return out
 
 
-def search_qdrant(query: str, model: SentenceTransformer, top_k: int = TOP_K_QDRANT) -> List[Hit]:
-    client = _build_qdrant()
-    qvec = model.encode(query.strip(), normalize_embeddings=True).tolist()
-    pts = client.query_points(
+def search_qdrant(
+    query: str,
+    model: SentenceTransformer,
+    top_k: int = TOP_K_QDRANT,
+    timeout: Optional[float] = None,
+) -> List[Hit]:
+    """timeout (saniye) encode dahil bacak süresidir; Qdrant çağrısı kalan süreyle sınırlanır."""
+    t_end = time.perf_counter() + timeout if timeout else None
+    qvec = encode_query(model, query).tolist()
+    # Qdrant tam saniye alır (gRPC'de istemci son tarihi de olur); en az 1 sn
+    qd_timeout = max(1, math.ceil(t_end - time.perf_counter())) if t_end else None
+    pts = call_qdrant(lambda c: c.query_points(
         collection_name=QDRANT_COLLECTION,
         query=qvec,
-        limit=top_k,
+        limit=top_k * CHUNK_OVERFETCH if QDRANT_CHUNKED else top_k,
         with_payload=True,
-        search_params=rest.SearchParams(quantization=rest.QuantizationSearchParams(ignore=True)),
-    ).points or []
+        with_vectors=True,
+        search_params=qdrant_search_params(),
+        timeout=qd_timeout,
+    )).points or []
+    if QDRANT_CHUNKED:
+        return _collapse_chunk_points(pts, top_k)
 
     scores = [float(p.score or 0.0) for p in pts]
     scores_norm = _minmax_norm(scores)
@@ -157,73 +166,321 @@ def search_qdrant(query: str, model: SentenceTransformer, top_k: int = TOP_K_QDR
             payload=payload,
             text_repr=repr_text,
             text_full=full_text,
+            vector=_as_vector(p.vector),
         ))
     return out
 
 
-def fuse_hits(os_hits: List[Hit], qd_hits: List[Hit]) -> List[Hit]:
-    by_id: Dict[str, Dict[str, float]] = {}
-    payload_by_id: Dict[str, Dict[str, Any]] = {}
-    text_by_id: Dict[str, Tuple[str, str]] = {}
+def _collapse_chunk_points(pts: List[Any], top_k: int) -> List[Hit]:
+    """Parça sonuçlarını CHUNK_POOLING ile karar düzeyine indirir; eşleşen parçalar pasaj olur."""
+    chunks: List[ChunkHit] = []
+    for p in pts:
+        payload = p.payload or {}
+        doc_id = str(payload.get("doc_id") or "")
+        if not doc_id:
+            continue
+        chunks.append(ChunkHit(
+            doc_id=doc_id,
+            score=float(p.score or 0.0),
+            chunk_idx=int(payload.get("chunk_idx") or 0),
+            start=int(payload.get("chunk_start") or 0),
+            end=int(payload.get("chunk_end") or 0),
+            text=payload.get("chunk_text") or "",
+            payload=payload,
+            vector=p.vector,
+        ))
+
+    docs = collapse_chunks(chunks, CHUNK_POOLING)[:top_k]
+    scores_norm = _minmax_norm([d.score for d in docs])
+    out: List[Hit] = []
+    for d, s_norm in zip(docs, scores_norm):
+        payload = {k: v for k, v in d.best.payload.items() if k != "chunk_text"}
+        repr_text, full_text = _text_fields(payload)
+        passage = d.passage()
+        out.append(Hit(
+            doc_id=d.doc_id,
+            score_raw=d.score,
+            score_norm=s_norm,
+            source="qdrant",
+            payload=payload,
+            text_repr=repr_text,
+            text_full=full_text or passage,
+            vector=_as_vector(d.best.vector),
+            passage=passage,
+        ))
+    return out
+
+
+def _as_vector(v: Any) -> Optional[np.ndarray]:
+    if v is None:
+        return None
+    if isinstance(v, dict):  # isimli vektörler: varsayılan (ilk) vektörü al
+        v = next(iter(v.values()), None)
+        if v is None:
+            return None
+    return np.asarray(v, dtype=np.float32)
+
+
+def fetch_stored_vectors(doc_ids: List[str]) -> Dict[str, np.ndarray]:
+    """
+    Yalnızca BM25'ten gelen adaylar için Qdrant'ta saklı vektörleri doc_id ile toplu çeker.
+    Bulunamayan id'ler sonuçta yer almaz (çağıran yeniden encode eder).
+    """
+    if not doc_ids:
+        return {}
+    must = [rest.FieldCondition(key="doc_id", match=rest.MatchAny(any=list(doc_ids)))]
+    if QDRANT_CHUNKED:  # karar başına tek temsilci: ilk parça
+        must.append(rest.FieldCondition(key="chunk_idx", match=rest.MatchValue(value=0)))
+    flt = rest.Filter(must=must)
+    try:
+        pts, _ = call_qdrant(lambda c: c.scroll(
+            collection_name=QDRANT_COLLECTION,
+            scroll_filter=flt,
+            limit=len(doc_ids) * 2,
+            with_payload=["doc_id"],
+            with_vectors=True,
+        ))
+    except Exception as e:
+        logger.warning("[mmr] stored vector fetch failed: %s", e)
+        return {}
+
+    out: Dict[str, np.ndarray] = {}
+    for p in pts or []:
+        did = str((p.payload or {}).get("doc_id") or "")
+        vec = _as_vector(p.vector)
+        if did and vec is not None and did not in out:
+            out[did] = vec
+    return out
 
+
+def fuse_hits(
+    os_hits: List[Hit],
+    qd_hits: List[Hit],
+    method: str = FUSION_METHOD,
+    weights: Optional[Dict[str, float]] = None,
+) -> List[Hit]:
+    """
+    İki bacağın sonuçlarını fusion.fuse ile birleştirir; skorlar ham (score_raw) değerlerden hesaplanır.
+    İki bacakta da bulunan belgenin payload'ları birleştirilir: OpenSearch'ün yalın _source'u
+    Qdrant payload'ındaki alanlarla (QDRANT_FULL_TEXT_FIELD, ...) tamamlanır.
+    """
+    weights = weights or FUSION_WEIGHTS
+    first: Dict[str, Hit] = {}
+    payload_by_id: Dict[str, Dict[str, Any]] = {}
+    full_by_id: Dict[str, str] = {}
+    vector_by_id: Dict[str, np.ndarray] = {}
+    passage_by_id: Dict[str, str] = {}
     for h in os_hits + qd_hits:
-        by_id.setdefault(h.doc_id, {})[h.source] = h.score_norm
-        if h.doc_id not in payload_by_id:
-            payload_by_id[h.doc_id] = h.payload
-            text_by_id[h.doc_id] = (h.text_repr, h.text_full)
-
-    fused: List[Hit] = []
-    for doc_id, comps in by_id.items():
-        dense = comps.get("qdrant", 0.0)
-        bm25 = comps.get("opensearch", 0.0)
-        combined = 0.75 * dense + 0.25 * bm25
-        repr_text, full_text = text_by_id.get(doc_id, ("", ""))
-        fused.append(Hit(
+        first.setdefault(h.doc_id, h)
+        payload_by_id[h.doc_id] = {**(h.payload or {}), **payload_by_id.get(h.doc_id, {})}
+        if h.text_full:
+            full_by_id.setdefault(h.doc_id, h.text_full)
+        if h.vector is not None:
+            vector_by_id.setdefault(h.doc_id, h.vector)
+        if h.passage:
+            passage_by_id.setdefault(h.doc_id, h.passage)
+
+    w = [weights.get("opensearch", 1.0), weights.get("qdrant", 1.0)]
+    ids, fused = fuse(
+        [[h.doc_id for h in os_hits], [h.doc_id for h in qd_hits]],
+        [np.array([h.score_raw for h in os_hits]), np.array([h.score_raw for h in qd_hits])],
+        method=method, weights=w, rrf_k=RRF_K,
+    )
+    unit = to_unit(fused, method, w, RRF_K)
+
+    out: List[Hit] = []
+    for doc_id, raw, s_norm in zip(ids[:max(100, MMR_MAX_CANDIDATES)], fused, unit):
+        h = first[doc_id]
+        passage = passage_by_id.get(doc_id)
+        out.append(Hit(
             doc_id=doc_id,
-            score_raw=0.0,
-            score_norm=combined,
+            score_raw=float(raw),
+            score_norm=float(s_norm),
             source="hybrid",
-            payload=payload_by_id.get(doc_id, {}),
-            text_repr=repr_text,
-            text_full=full_text
+            payload=payload_by_id[doc_id],
+            text_repr=h.text_repr,
+            text_full=passage or full_by_id.get(doc_id, ""),   # eşleşen parça varsa prompt'a o gider
+            vector=vector_by_id.get(doc_id),
+            passage=passage,
         ))
-    return sorted(fused, key=lambda x: x.score_norm, reverse=True)[:100]
+    return out
+
+
+def hydrate_full_text(hits: List[Hit]) -> int:
+    """
+    Tam metni veya özet alanları (gerekce / karar / hikaye) eksik olan hit'leri tek bir
+    OpenSearch mget ile doldurur; payload'da zaten olan alanlar ezilmez. Doldurulan hit
+    sayısını döner; hata durumunda hit'ler önizlemeyle kalır.
+    """
+    need = [h for h in hits if not h.text_full or any(f not in (h.payload or {}) for f in SUMMARY_FIELDS)]
+    if not need:
+        return 0
+    ids = list(dict.fromkeys(h.doc_id for h in need))
+    try:
+        res = call_opensearch(lambda c: c.mget(index=OS_INDEX, body={"ids": ids}, _source_includes=DETAIL_SOURCE_FIELDS))
+    except Exception as e:
+        logger.warning("[hybrid_search] full-text mget failed: %s", e)
+        return 0
+
+    src_by_id = {str(d.get("_id")): d.get("_source") or {} for d in res.get("docs", []) if d.get("found")}
+    filled = 0
+    for h in need:
+        src = src_by_id.get(h.doc_id)
+        if src is None:
+            continue
+        extra = {f: src[f] for f in SUMMARY_FIELDS if f in src}
+        full = (src.get(FULL_TEXT_FIELD) or "").strip()
+        if full and not h.text_full:
+            h.text_full = full
+            extra[FULL_TEXT_FIELD] = full
+        h.payload = {**extra, **(h.payload or {})}
+        filled += 1
+    return filled
+
+
+def candidate_vectors(candidates: List[Hit], model: SentenceTransformer) -> np.ndarray:
+    """
+    Adayların vektörlerini döner: önce Qdrant'tan gelen vektör, sonra doc_id ile
+    Qdrant'tan toplu çekim; yalnızca hâlâ eksik kalanlar yeniden encode edilir.
+    """
+    missing = [c.doc_id for c in candidates if c.vector is None]
+    if missing:
+        stored = fetch_stored_vectors(missing)
+        for c in candidates:
+            if c.vector is None and c.doc_id in stored:
+                c.vector = stored[c.doc_id]
+
+    to_encode = [i for i, c in enumerate(candidates) if c.vector is None]
+    if to_encode:
+        logger.info("[mmr] re-encoding %d/%d candidates without stored vectors", len(to_encode), len(candidates))
+        encoded = model.encode(
+            [candidates[i].text_full or candidates[i].text_repr for i in to_encode],
+            normalize_embeddings=True,
+        )
+        for i, v in zip(to_encode, encoded):
+            candidates[i].vector = np.asarray(v, dtype=np.float32)
+
+    embs = np.vstack([c.vector for c in candidates]).astype(np.float32, copy=False)
+    norms = np.linalg.norm(embs, axis=1, keepdims=True)
+    return embs / np.maximum(norms, 1e-12)
 
 
 def mmr_select(query: str, candidates: List[Hit], model: SentenceTransformer, top_n: int, lambda_: float) -> List[Hit]:
     if not candidates:
         return []
-    candidates = candidates[:50]
-    q = model.encode([query], normalize_embeddings=True)
-    embs = model.encode([c.text_full or c.text_repr for c in candidates], normalize_embeddings=True)
-    rel = cosine_similarity(embs, q).reshape(-1)
-
-    selected = []
-    remaining = list(range(len(candidates)))
-    first = int(np.argmax(rel))
-    selected.append(first)
-    remaining.remove(first)
-
-    while len(selected) < min(top_n, len(candidates)) and remaining:
-        max_score, best = -1e9, None
-        for j in remaining:
-            div = cosine_similarity(embs[j:j+1], embs[selected]).max()
-            mmr = lambda_ * rel[j] - (1 - lambda_) * div
-            if mmr > max_score:
-                max_score, best = mmr, j
-        selected.append(best)
-        remaining.remove(best)
-    return [candidates[i] for i in selected]
-
-
-
-def hybrid_search(query: str, topn: int = DEFAULT_TOPN) -> List[Hit]:
-    model = SentenceTransformer(EMBED_MODEL_NAME, device=_device())
-    os_hits = search_opensearch(query, TOP_K_OS)
-    qd_hits = search_qdrant(query, model, TOP_K_QDRANT)
-    fused = fuse_hits(os_hits, qd_hits)
+    candidates = candidates[:MMR_MAX_CANDIDATES]
+    q = encode_query(model, query)
+    embs = candidate_vectors(candidates, model)
+    return [candidates[i] for i in mmr_indices(q, embs, top_n, lambda_)]
+
+
+def _timed_leg(fn: Callable[[], List[Hit]]) -> Tuple[List[Hit], Dict[str, Any]]:
+    t0 = time.perf_counter()
+    hits = fn()
+    return hits, {"status": "ok", "ms": round((time.perf_counter() - t0) * 1000, 1), "hits": len(hits)}
+
+
+def _collect_leg(name: str, fut: Future, deadline: float) -> Tuple[List[Hit], Dict[str, Any], Optional[BaseException]]:
+    """Bacağı son tarihe kadar bekler; zaman aşımı / hata durumunda boş sonuçla devam eder."""
+    try:
+        hits, meta = fut.result(timeout=max(0.0, deadline - time.perf_counter()))
+        return hits, meta, None
+    except FutureTimeout:
+        logger.warning("[hybrid_search] %s leg timed out", name)
+        return [], {"status": "timeout", "ms": None, "hits": 0}, None
+    except Exception as e:
+        logger.warning("[hybrid_search] %s leg failed: %s", name, e)
+        return [], {"status": "error", "ms": None, "hits": 0, "error": str(e)}, e
+
+
+def _retrieval_params(fusion: str = FUSION_METHOD) -> Dict[str, Any]:
+    """Sonuç önbelleği anahtarına giren retrieval ayarları; biri değişirse önbellek ayrışır."""
+    return {
+        "model": EMBED_MODEL_NAME,
+        "embed_backend": EMBED_BACKEND,
+        "top_k_os": TOP_K_OS,
+        "os_msm": OS_MIN_SHOULD_MATCH,
+        "top_k_qdrant": TOP_K_QDRANT,
+        "mmr_lambda": MMR_LAMBDA,
+        "mmr_max": MMR_MAX_CANDIDATES,
+        "slice": [SLICE_ENABLED, MAX_PASSAGE_CHARS, SLICE_UNIT_CHARS, SLICE_ENCODE_PER_HIT, SLICE_ENCODE_BUDGET],
+        "chunks": [QDRANT_CHUNKED, CHUNK_POOLING, CHUNK_OVERFETCH],
+        "quant": [QDRANT_QUANT_MODE, QDRANT_QUANT_OVERSAMPLING],
+        "fusion": [fusion, FUSION_WEIGHTS, RRF_K],
+    }
+
+
+def hybrid_search_with_meta(
+    query: str,
+    topn: int = DEFAULT_TOPN,
+    fusion: Optional[str] = None,
+) -> Tuple[List[Hit], Dict[str, Any]]:
+    """
+    Sonuç önbelleği üzerinden hibrit arama. Bir bacağı düşmüş (degraded) sonuçlar önbelleğe yazılmaz.
+    fusion verilmezse FUSION_METHOD kullanılır.
+    Dönüş: (hits, meta) — meta bacak bazında süre/durum ve önbellek bilgisini içerir.
+    """
+    fusion = fusion or FUSION_METHOD
+    if fusion not in FUSION_METHODS:
+        raise ValueError(f"fusion {FUSION_METHODS} içinden biri olmalı: {fusion!r}")
+    if not RESULT_CACHE_ENABLED:
+        return _hybrid_search_uncached(query, topn, fusion)
+    return get_result_cache().get_or_compute(
+        query, topn, _retrieval_params(fusion),
+        compute=lambda: _hybrid_search_uncached(query, topn, fusion),
+        cacheable=lambda r: bool(r[0]) and not r[1].get("degraded"),
+    )
+
+
+def _hybrid_search_uncached(
+    query: str,
+    topn: int = DEFAULT_TOPN,
+    fusion: str = FUSION_METHOD,
+) -> Tuple[List[Hit], Dict[str, Any]]:
+    """
+    BM25 (OpenSearch) ve dense (encode + Qdrant) bacaklarını eşzamanlı çalıştırır.
+    Bir bacak yavaşsa veya çalışmıyorsa diğerinin sonuçlarıyla devam edilir.
+    """
+    model = get_embedding_model(EMBED_MODEL_NAME)
+    t0 = time.perf_counter()
+
+    # İstemci çağrıları da bacak süresiyle sınırlı: son tarihi kaçan bacağın thread'i havuzda birikmez
+    os_fut = _LEG_EXECUTOR.submit(_timed_leg, lambda: search_opensearch(query, TOP_K_OS, timeout=OS_LEG_TIMEOUT))
+    qd_fut = _LEG_EXECUTOR.submit(_timed_leg, lambda: search_qdrant(query, model, TOP_K_QDRANT, timeout=QDRANT_LEG_TIMEOUT))
+
+    os_hits, os_meta, os_err = _collect_leg("opensearch", os_fut, t0 + OS_LEG_TIMEOUT)
+    qd_hits, qd_meta, qd_err = _collect_leg("qdrant", qd_fut, t0 + QDRANT_LEG_TIMEOUT)
+
+    # İki arka uç da hata verdiyse sessizce boş dönmek yerine hatayı yükselt
+    if os_err is not None and qd_err is not None:
+        raise qd_err
+
+    meta: Dict[str, Any] = {
+        "legs": {"opensearch": os_meta, "qdrant": qd_meta},
+        "retrieve_ms": round((time.perf_counter() - t0) * 1000, 1),
+        "degraded": os_meta["status"] != "ok" or qd_meta["status"] != "ok",
+        "fusion": fusion,
+    }
+
+    t1 = time.perf_counter()
+    fused = fuse_hits(os_hits, qd_hits, method=fusion)
     picked = mmr_select(query, fused, model, top_n=topn, lambda_=MMR_LAMBDA)
-    return picked
+    meta["rerank_ms"] = round((time.perf_counter() - t1) * 1000, 1)
+
+    t_h = time.perf_counter()
+    meta["hydrated"] = hydrate_full_text(picked)
+    meta["hydrate_ms"] = round((time.perf_counter() - t_h) * 1000, 1)
+
+    if SLICE_ENABLED and picked:
+        t2 = time.perf_counter()
+        meta["sliced"] = slice_hits(query, encode_query(model, query), picked, model)
+        meta["slice_ms"] = round((time.perf_counter() - t2) * 1000, 1)
+    return picked, meta
+
+
+def hybrid_search(query: str, topn: int = DEFAULT_TOPN, fusion: Optional[str] = None) -> List[Hit]:
+    hits, _ = hybrid_search_with_meta(query, topn=topn, fusion=fusion)
+    return hits
 
 
 def _print(hits: List[Hit]):
@@ -238,9 +495,11 @@ if __name__ == "__main__":
     ap = argparse.ArgumentParser()
     ap.add_argument("query", type=str)
     ap.add_argument("--topn", type=int, default=DEFAULT_TOPN)
+    ap.add_argument("--fusion", choices=FUSION_METHODS, default=None)
     a = ap.parse_args()
 
     print(f"Query: {a.query}")
-    res = hybrid_search(a.query, topn=a.topn)
+    res, meta = hybrid_search_with_meta(a.query, topn=a.topn, fusion=a.fusion)
+    print(f"Bacak süreleri: {meta['legs']}")
     print("\nHibrit sonuçlar (MMR):")
     _print(res)
@@ -1,20 +1,11 @@
 import re
 import sys
 from typing import List, Dict, Any
-from opensearchpy import OpenSearch
 
-# ====================== CONFIG ======================
-
-INDEX_NAME = "lexai_cases"
-OPENSEARCH_HOST = "localhost"
-OPENSEARCH_PORT = 9200
-
-client = OpenSearch(
-    hosts=[{"host": OPENSEARCH_HOST, "port": OPENSEARCH_PORT}],
-    scheme="http",
-    use_ssl=False,
-    verify_certs=False,
-    ssl_show_warn=False,
+from src.rag.config import OS_MIN_SHOULD_MATCH
+from src.retrieval.clients import call_opensearch
+from src.retrieval.index_schema import (
+    INDEX_NAME, SEARCH_FIELDS, HOT_SOURCE_FIELDS, PREVIEW_FIELD, LAWS_KW_FIELD,
 )
 
 # ====================== LAW DETECTION ======================
@@ -55,10 +46,11 @@ def build_query_body(user_query: str, size: int = 10) -> Dict[str, Any]:
     laws = _detect_laws(user_query)
     should_terms = []
     if laws:
-        should_terms.append({"terms": {"laws_norm.kw": laws, "boost": 3}})
+        should_terms.append({"terms": {LAWS_KW_FIELD: laws, "boost": 3}})
 
     body: Dict[str, Any] = {
         "size": size,
+        "_source": {"includes": HOT_SOURCE_FIELDS},
         "query": {
             "bool": {
                 "must": [
@@ -66,18 +58,8 @@ def build_query_body(user_query: str, size: int = 10) -> Dict[str, Any]:
                         "multi_match": {
                             "query": user_query,
                             "type": "best_fields",
-                            "fields": [
-                                "dava_turu^4",
-                                "laws_norm^3",
-                                "karar_metni^3",          # 🔥 tam karar metni
-                                "karar_metni_meta^3",     # olası yeni alan
-                                "karar_metni_raw^3",
-                                "full_text^2",
-                                "gerekce^2",
-                                "karar^1.5",
-                                "hikaye^1",
-                            ],
-                            "operator": "and",
+                            "fields": SEARCH_FIELDS,   # alanlar index_schema.py ile eşleşir
+                            "minimum_should_match": OS_MIN_SHOULD_MATCH,
                         }
                     }
                 ],
@@ -91,7 +73,7 @@ def build_query_body(user_query: str, size: int = 10) -> Dict[str, Any]:
 
 def search(query: str, size: int = 10) -> Dict[str, Any]:
     body = build_query_body(query, size=size)
-    return client.search(index=INDEX_NAME, body=body)
+    return call_opensearch(lambda c: c.search(index=INDEX_NAME, body=body))
 
 # ====================== CLI ENTRY ======================
 
@@ -115,17 +97,8 @@ if __name__ == "__main__":
         sonuc = src.get("sonuc")
         laws = src.get("laws_norm") or src.get("kanunlar")
 
-        # 🔹 Öncelikli olarak karar_metni alanından oku
-        preview = (
-            src.get("karar_metni")
-            or src.get("karar_metni_meta")
-            or src.get("karar_metni_raw")
-            or src.get("text_preview")
-            or src.get("full_text")
-            or src.get("gerekce")
-            or src.get("hikaye")
-            or ""
-        )
+        # 🔹 Yalın _source: önizleme alanı
+        preview = src.get(PREVIEW_FIELD) or ""
 
         if isinstance(preview, list):
             preview = " ".join(preview)
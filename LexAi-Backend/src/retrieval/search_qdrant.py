@@ -6,13 +6,11 @@ from qdrant_client.http import models as rest
 from sentence_transformers import SentenceTransformer
 import torch
 
+from src.retrieval.clients import ClientPool, get_qdrant, qdrant_search_params
+
 COLLECTION_NAME = "lexai_cases"
 MODEL_NAME = "BAAI/bge-m3"
 
-QDRANT_HOST = "localhost"
-HTTP_PORT = 6333
-GRPC_PORT = 6334
-
 TOP_K_DECISION = 16
 TOP_K_SIGNAL = 8
 
@@ -41,15 +39,8 @@ def build_query_text(user_query: str) -> str:
 device = pick_device()
 model = SentenceTransformer(MODEL_NAME, device=device)
 
-client = QdrantClient(
-    host=QDRANT_HOST,
-    port=HTTP_PORT,
-    grpc_port=GRPC_PORT,
-    prefer_grpc=True,
-    timeout=60.0,
-)
-
 def sanity_checks():
+    client = get_qdrant()
     info = client.get_collection(COLLECTION_NAME)
     try:
         dim = info.config.params.vectors.size
@@ -65,7 +56,7 @@ def sanity_checks():
 
 def _query_generic(c: QdrantClient, qvec, top_k: int, section_value: str):
     flt = rest.Filter(must=[rest.FieldCondition(key="section", match=rest.MatchValue(value=section_value))])
-    params = rest.SearchParams(quantization=rest.QuantizationSearchParams(ignore=True))
+    params = qdrant_search_params()
     try:
         r = c.query_points(
             collection_name=COLLECTION_NAME,
@@ -108,12 +99,12 @@ def search(user_query: str, top_k_total: int = 12):
     qvec = model.encode(qtext, normalize_embeddings=True).tolist()
     print(f"\nQuery:\n{qtext}\n")
 
-    c = client
+    c = get_qdrant()
     try:
         pts = _query_generic(c, qvec, TOP_K_DECISION, "decision_full")
     except Exception as e:
         print(f"gRPC failed, switching to HTTP. Reason: {e}")
-        c = QdrantClient(host=QDRANT_HOST, port=HTTP_PORT, prefer_grpc=False, timeout=60.0)
+        c = ClientPool(qdrant_prefer_grpc=False).qdrant()
         pts = _query_generic(c, qvec, TOP_K_DECISION, "decision_full")
 
     try:
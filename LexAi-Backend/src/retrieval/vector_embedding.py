@@ -1,6 +1,8 @@
-import json, time, hashlib
+import argparse, gc, json, multiprocessing, os, queue, sys, threading, time, hashlib
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 
 import numpy as np
@@ -10,20 +12,33 @@ from sentence_transformers import SentenceTransformer, models
 from qdrant_client import QdrantClient
 from qdrant_client.http import models as rest
 
+from src.retrieval.chunking import chunk_spans
+from src.retrieval.batching import BatchStats, encode_bucketed
+from src.retrieval.clients import configure_clients
+from src.retrieval.index_schema import PREVIEW_FIELD, QDRANT_FULL_TEXT_FIELD
+from src.retrieval.embedding_store import EmbeddingStore, UploadLedger, payload_key, text_key
+from src.rag.config import QDRANT_CHUNKED, EMBED_BACKEND, QDRANT_QUANT_ALWAYS_RAM, REINDEX_KEEP_VERSIONS
+from src.retrieval.index_aliases import (
+    gc_qdrant_versions, next_version, qdrant_live, qdrant_versions, swap_qdrant_alias, validate_qdrant,
+)
+from src.retrieval.index_version import bump_qdrant_generation
 
 
 INPUT_FILE = "data/interim/balanced_total30k.jsonl"
 
 OUT_DIR = Path("data/processed/embeddings")
 STATE_FILE = OUT_DIR / "state.json"
+STORE_DIR = OUT_DIR / "store"
+LEDGER_FILE = OUT_DIR / "uploaded.jsonl"
 
-COLLECTION_NAME = "lexai_cases"
-QDRANT_HOST = "localhost"
-QDRANT_PORT = 6333
-QDRANT_GRPC_PORT = 6334
+COLLECTION_NAME = "lexai_cases"   # canlı ad (alias); veri lexai_cases_v{N} koleksiyonlarında
 
-EMB_BATCH_SIZE = 8
+EMB_TOKEN_BUDGET = 8192    # batch başına dolgulu token (batch_boyu × en_uzun) üst sınırı
+EMB_MAX_BATCH_SIZE = 64    # kısa metinlerde batch boyu üst sınırı
 QDRANT_UPSERT_BATCH = 128
+UPSERT_PARALLEL = 4        # eşzamanlı upsert isteği (her biri wait=True)
+CHUNK_RECORDS = 3000       # okuma aşamasının ürettiği parça boyu (kayıt)
+PIPELINE_QUEUE_SIZE = 2    # aşamalar arası kuyrukta bekleyebilecek en fazla parça (backpressure)
 
 USE_MODEL = "bge_m3"  # "legal", "bilkent" veya "bge_m3"
 ENABLE_INT8_QUANTIZATION = True
@@ -41,6 +56,8 @@ def sha1(s: str) -> str:
 
 def make_point_id(m: Dict[str, Any]) -> int:
     base = f"{m.get('doc_id','')}|{m.get('text_sha1','')}"
+    if "chunk_idx" in m:
+        base += f"|{m['chunk_idx']}"
     return int(hashlib.sha1(base.encode("utf-8")).hexdigest()[:16], 16)
 
 def _norm_laws(kanun_atiflari: List[Dict[str, Any]] | None) -> List[str]:
@@ -66,7 +83,23 @@ def optimize_torch_for_env():
         print("Running on CPU.")
 
 
-def load_embedding_model(device: str) -> SentenceTransformer:
+_ONNX_MODELS = {"legal": "msbayindir/legal-text-embedding-turkish-v1", "bge_m3": "BAAI/bge-m3"}
+
+
+def load_embedding_model(device: str, backend: str = "torch") -> SentenceTransformer:
+    if backend != "torch" and device == "cpu" and USE_MODEL in _ONNX_MODELS:
+        try:
+            from src.retrieval.onnx_embedder import load_onnx_embedder
+            print(f"Using model: {_ONNX_MODELS[USE_MODEL]} ({backend})")
+            model = load_onnx_embedder(_ONNX_MODELS[USE_MODEL], quantize=backend == "onnx-int8")
+            if USE_MODEL == "bge_m3":
+                model.max_seq_length = 512
+            return model
+        except Exception as e:
+            print(f"ONNX backend unavailable ({e}); falling back to torch.")
+    elif backend != "torch":
+        print(f"{backend} yalnızca CPU'da ve 'legal' / 'bge_m3' için; torch ile devam ediliyor.")
+
     if USE_MODEL == "legal":
         print("Using model: msbayindir/legal-text-embedding-turkish-v1")
         return SentenceTransformer("msbayindir/legal-text-embedding-turkish-v1", device=device)
@@ -104,13 +137,29 @@ def add_record(records: List[str], metas: List[Dict[str, Any]], rec: Dict[str, A
         "metin_karar_no": rec.get("metin_karar_no"),
         "kanun_atiflari": rec.get("kanun_atiflari"),
         "laws_norm": _norm_laws(rec.get("kanun_atiflari")),
-        "karar_metni_meta": karar_full_trim,   # tam metin (frontend için)
-        "karar_preview": karar_preview,         # kısa özet
+        QDRANT_FULL_TEXT_FIELD: karar_full_trim,   # tam metin (frontend için)
+        PREVIEW_FIELD: karar_preview,              # kısa özet
         "text_sha1": sha1(karar_full),
     }
 
-    records.append(karar_for_embedding)
-    metas.append(payload)
+    if not QDRANT_CHUNKED:
+        records.append(karar_for_embedding)
+        metas.append(payload)
+        return
+
+    # Parça modu: metnin tamamı örtüşen parçalar halinde gömülür; ağır alanlar yalnızca ilk parçada
+    spans = chunk_spans(karar_full)
+    for i, (a, b) in enumerate(spans):
+        chunk_payload = dict(payload) if i == 0 else {k: v for k, v in payload.items() if k != QDRANT_FULL_TEXT_FIELD}
+        chunk_payload.update({
+            "chunk_idx": i,
+            "chunk_start": a,
+            "chunk_end": b,
+            "n_chunks": len(spans),
+            "chunk_text": karar_full[a:b],
+        })
+        records.append(karar_full[a:b])
+        metas.append(chunk_payload)
 
 
 @dataclass
@@ -121,11 +170,49 @@ class ChunkPack:
     metas: List[Dict[str, Any]]
 
 
-def upsert_with_retry(client: QdrantClient, points: List[rest.PointStruct]) -> None:
+ENCODE_STATS = BatchStats()   # çalıştırma boyunca toplam encode istatistiği
+
+
+def load_state() -> Dict[str, Any]:
+    """Yarım kalan çalıştırmanın durumu: son tamamlanan parçadan sonraki satır."""
+    if not STATE_FILE.exists():
+        return {}
+    try:
+        st = json.loads(STATE_FILE.read_text(encoding="utf-8"))
+    except ValueError:
+        return {}
+    return st if st.get("input") == INPUT_FILE else {}
+
+
+def save_state(pack: ChunkPack, collection: str = COLLECTION_NAME) -> None:
+    tmp = STATE_FILE.with_suffix(".tmp")
+    tmp.write_text(json.dumps({
+        "input": INPUT_FILE, "collection": collection,
+        "chunk_idx": pack.idx, "next_line_after": pack.next_line_after, "ts": time.time(),
+    }), encoding="utf-8")
+    tmp.replace(STATE_FILE)
+
+
+def clear_state() -> None:
+    if STATE_FILE.exists():
+        STATE_FILE.unlink()
+
+
+def ledger_file(collection: str) -> Path:
+    """Her koleksiyonun kendi yükleme defteri; eski (alias öncesi) koleksiyon eski dosyayı kullanır."""
+    return LEDGER_FILE if collection == COLLECTION_NAME else OUT_DIR / f"uploaded.{collection}.jsonl"
+
+
+def upsert_with_retry(
+    client: QdrantClient,
+    points: List[rest.PointStruct],
+    wait: bool = True,
+    collection: str = COLLECTION_NAME,
+) -> None:
     delay = 1.0
     for attempt in range(UPSERT_MAX_RETRIES):
         try:
-            client.upsert(collection_name=COLLECTION_NAME, points=points, wait=True)
+            client.upsert(collection_name=collection, points=points, wait=wait)
             return
         except Exception:
             if attempt == UPSERT_MAX_RETRIES - 1:
@@ -134,69 +221,393 @@ def upsert_with_retry(client: QdrantClient, points: List[rest.PointStruct]) -> N
             delay *= UPSERT_BACKOFF_BASE
 
 
-def process_and_upload_chunk(model: SentenceTransformer, client: QdrantClient, pack: ChunkPack) -> None:
-    recs, metas = pack.records, pack.metas
-    if not recs:
-        return
-
-    print(f"\nEncoding chunk {pack.idx} ({len(recs)} records)...")
-    all_embeddings = []
-    pbar = tqdm(total=len(recs), desc=f"Chunk {pack.idx} encoding", ncols=80)
-
-    for i in range(0, len(recs), EMB_BATCH_SIZE):
-        batch = recs[i:i+EMB_BATCH_SIZE]
+def encode_records(model: SentenceTransformer, recs: List[str], idx: int) -> np.ndarray:
+    """Uzunluğa göre kovalanmış, token bütçeli batch'lerle encode; satırlar recs sırasındadır."""
+    pbar = tqdm(total=len(recs), desc=f"Chunk {idx} encoding", ncols=80)
 
-        if torch.cuda.is_available():
-            with torch.autocast(device_type="cuda", dtype=torch.float16):
-                e = model.encode(batch, normalize_embeddings=True, show_progress_bar=False)
-        else:
-            e = model.encode(batch, normalize_embeddings=True, show_progress_bar=False)
-
-        all_embeddings.append(e)
+    def _after_batch(n: int) -> None:
         if torch.cuda.is_available():
             torch.cuda.empty_cache()
-        pbar.update(len(batch))
+        pbar.update(n)
+
+    if torch.cuda.is_available():
+        with torch.autocast(device_type="cuda", dtype=torch.float16):
+            emb, stats = encode_bucketed(model, recs, EMB_TOKEN_BUDGET, EMB_MAX_BATCH_SIZE, on_batch=_after_batch)
+    else:
+        emb, stats = encode_bucketed(model, recs, EMB_TOKEN_BUDGET, EMB_MAX_BATCH_SIZE, on_batch=_after_batch)
 
     pbar.close()
-    emb = np.vstack(all_embeddings)
+    ENCODE_STATS.merge(stats)
+    print(f"Chunk {idx} encode: {stats.summary()}")
+    return emb
+
+
+# ==================== Boru hattı: okuma → encode → upsert ====================
+
+@dataclass
+class EncodedPack:
+    pack: ChunkPack
+    emb: np.ndarray
+    pids: List[int]
+
+
+@dataclass
+class StageCounter:
+    name: str
+    packs: int = 0
+    records: int = 0
+    busy: float = 0.0      # iş yapılan süre (s)
+    blocked: float = 0.0   # kuyrukta bekleme: giriş boş / çıkış dolu (s)
+
+    def summary(self) -> str:
+        rate = self.records / self.busy if self.busy > 0 else 0.0
+        return (f"{self.name:<7} packs={self.packs} records={self.records} "
+                f"busy={self.busy:.1f}s blocked={self.blocked:.1f}s rate={rate:,.1f} rec/s")
+
+
+_DONE = object()
+
+
+def _put(q: "queue.Queue", item: Any, stop: threading.Event, counter: StageCounter) -> None:
+    """Kuyruk doluysa bekler (backpressure); başka aşama hata verdiyse vazgeçer."""
+    t0 = time.perf_counter()
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.5)
+            break
+        except queue.Full:
+            continue
+    counter.blocked += time.perf_counter() - t0
+
+
+def _get(q: "queue.Queue", stop: threading.Event, counter: StageCounter) -> Any:
+    t0 = time.perf_counter()
+    try:
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.5)
+            except queue.Empty:
+                continue
+        return _DONE
+    finally:
+        counter.blocked += time.perf_counter() - t0
 
-    # Qdrant upload aşaması için ayrı çubuk
-    for s in tqdm(range(0, len(emb), QDRANT_UPSERT_BATCH), desc=f"Chunk {pack.idx} upload", ncols=80):
-        vecs = emb[s:s+QDRANT_UPSERT_BATCH]
-        meta_slice = metas[s:s+QDRANT_UPSERT_BATCH]
-        points = []
-        for m_payload, v in zip(meta_slice, vecs):
-            pid = make_point_id(m_payload)
-            points.append(rest.PointStruct(id=pid, vector=v.tolist(), payload=m_payload))
-        upsert_with_retry(client, points)
 
+def read_stage(start_line: int, chunk_idx: int, out_q: "queue.Queue", stop: threading.Event, counter: StageCounter) -> None:
+    records: List[str] = []
+    metas: List[Dict[str, Any]] = []
+    line_idx = start_line - 1
+
+    def _emit() -> None:
+        nonlocal chunk_idx, records, metas
+        counter.packs += 1
+        counter.records += len(records)
+        _put(out_q, ChunkPack(idx=chunk_idx, next_line_after=line_idx+1, records=records, metas=metas), stop, counter)
+        chunk_idx += 1
+        records, metas = [], []
 
-def ensure_collection(client: QdrantClient, vector_size: int):
+    with open(INPUT_FILE, "r", encoding="utf-8") as f:
+        for line_idx, line in enumerate(f):
+            if stop.is_set():
+                return
+            if line_idx < start_line:
+                continue
+            t0 = time.perf_counter()
+            add_record(records, metas, json.loads(line))
+            counter.busy += time.perf_counter() - t0
+            if len(records) >= CHUNK_RECORDS:
+                _emit()
+        if records:
+            _emit()
+    _put(out_q, _DONE, stop, counter)
+
+
+def encode_stage(
+    model: Optional[SentenceTransformer],
+    store: EmbeddingStore,
+    in_q: "queue.Queue",
+    out_q: "queue.Queue",
+    stop: threading.Event,
+    counter: StageCounter,
+    pool: Optional[ProcessPoolExecutor] = None,
+    workers: int = 1,
+) -> None:
+    """
+    pool verilirse her parça bir worker sürecine gönderilir ve en fazla `workers` parça
+    aynı anda encode edilir; sonuçlar parça sırasıyla toplanıp upsert aşamasına geçer.
+    """
+    inflight: "deque[Tuple[ChunkPack, List[str], List[int], Optional[Future]]]" = deque()
+
+    def _finish() -> None:
+        pack, keys, todo, fut = inflight.popleft()
+        t0 = time.perf_counter()
+        if fut is not None:
+            emb, stats = fut.result()
+            ENCODE_STATS.merge(stats)
+            print(f"Chunk {pack.idx} encode: {stats.summary()}")
+            store.put([keys[i] for i in todo], emb)
+        enc = EncodedPack(pack=pack, emb=store.get(keys), pids=[make_point_id(m) for m in pack.metas])
+        counter.busy += time.perf_counter() - t0
+        counter.packs += 1
+        counter.records += len(keys)
+        _put(out_q, enc, stop, counter)
+
+    while True:
+        pack = _get(in_q, stop, counter)
+        if pack is _DONE:
+            break
+        t0 = time.perf_counter()
+        # Yalnızca depoda olmayan (yeni / değişmiş) metinler encode edilir
+        keys = [text_key(r) for r in pack.records]
+        todo = store.missing(keys)
+        print(f"\nChunk {pack.idx}: {len(keys)} records, {len(todo)} to encode, {len(keys) - len(todo)} cached")
+        fut = None
+        if todo and pool is not None:
+            fut = pool.submit(_worker_encode, [pack.records[i] for i in todo])
+        elif todo:
+            store.put([keys[i] for i in todo], encode_records(model, [pack.records[i] for i in todo], pack.idx))
+        counter.busy += time.perf_counter() - t0
+        inflight.append((pack, keys, todo, fut))
+        while len(inflight) >= max(1, workers):
+            _finish()
+    while inflight and not stop.is_set():
+        _finish()
+    _put(out_q, _DONE, stop, counter)
+
+
+# ==================== Çok süreçli CPU encode ====================
+
+_WORKER_MODEL: Optional[SentenceTransformer] = None
+
+
+def _init_worker(threads: int, backend: str = "torch") -> None:
+    """Her worker kendi modelini yükler; intra-op thread sayısı çekirdekleri paylaştırır."""
+    global _WORKER_MODEL
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+    torch.set_num_threads(threads)
     try:
-        info = client.get_collection(COLLECTION_NAME)
-        dim = info.config.params.vectors.size
-        if dim != vector_size:
-            print("Vector dimension mismatch. Deleting old collection...")
-            client.delete_collection(COLLECTION_NAME)
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # paralel iş başladıktan sonra ayarlanamaz
+    _WORKER_MODEL = load_embedding_model("cpu", backend)
+
+
+def _worker_encode(texts: List[str]) -> Tuple[np.ndarray, BatchStats]:
+    emb, stats = encode_bucketed(_WORKER_MODEL, texts, EMB_TOKEN_BUDGET, EMB_MAX_BATCH_SIZE)
+    return emb.astype(np.float16), stats   # depo zaten float16; süreçler arası aktarım yarıya iner
+
+
+def start_encode_pool(workers: int, threads_per_worker: Optional[int] = None, backend: str = "torch") -> ProcessPoolExecutor:
+    threads = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+    print(f"Starting {workers} embedding workers × {threads} torch threads")
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(threads, backend),
+    )
+
+
+def upload_stage(
+    client: QdrantClient,
+    ledger: UploadLedger,
+    in_q: "queue.Queue",
+    stop: threading.Event,
+    counter: StageCounter,
+    collection: str = COLLECTION_NAME,
+) -> None:
+    """
+    Parçanın upsert batch'lerini UPSERT_PARALLEL eşzamanlı wait=True istekle gönderir.
+    Parçalar sırayla tamamlanır; defter ve devam durumu parçanın tüm istekleri Qdrant'ta
+    uygulandıktan sonra yazılır. Böylece aşama bittiğinde koleksiyon tamdır; doğrulama,
+    alias taşıma ve nesil artırma yarım dolmuş bir koleksiyonu görmez.
+    """
+    with ThreadPoolExecutor(max_workers=UPSERT_PARALLEL, thread_name_prefix="upsert") as ex:
+        while True:
+            enc = _get(in_q, stop, counter)
+            if enc is _DONE:
+                break
+            t0 = time.perf_counter()
+            pack, emb, pids = enc.pack, enc.emb, enc.pids
+
+            # Yalnızca yüklenmemiş ya da payload'ı (metadata) değişmiş noktalar gönderilir
+            doc_pids: Dict[str, set] = {}
+            for m, pid in zip(pack.metas, pids):
+                doc_pids.setdefault(str(m.get("doc_id")), set()).add(pid)
+            hashes = {pid: payload_key(m) for m, pid in zip(pack.metas, pids)}
+            pending = [i for i, pid in enumerate(pids) if not ledger.is_uploaded(pid, hashes[pid])]
+
+            futures = []
+            for s in range(0, len(pending), QDRANT_UPSERT_BATCH):
+                sel = pending[s:s+QDRANT_UPSERT_BATCH]
+                points = [rest.PointStruct(id=pids[i], vector=emb[i].tolist(), payload=pack.metas[i]) for i in sel]
+                futures.append(ex.submit(upsert_with_retry, client, points, True, collection))
+            for fut in futures:
+                fut.result()
+
+            # İçeriği değişen kararların eski noktalarını sil
+            stale = set()
+            for doc_id, ps in doc_pids.items():
+                stale |= ledger.stale_points(doc_id, ps)
+            if stale:
+                client.delete(collection_name=collection, points_selector=rest.PointIdsList(points=sorted(stale)), wait=True)
+
+            ledger.record(doc_pids, hashes)
+            save_state(pack, collection)
+            counter.busy += time.perf_counter() - t0
+            counter.packs += 1
+            counter.records += len(pending)
+            print(f"Chunk {pack.idx}: uploaded {len(pending)}, skipped {len(pids) - len(pending)}, deleted {len(stale)} stale")
+
+
+def run_pipeline(
+    model: Optional[SentenceTransformer],
+    client: QdrantClient,
+    store: EmbeddingStore,
+    ledger: UploadLedger,
+    start_line: int = 0,
+    chunk_idx: int = 0,
+    pool: Optional[ProcessPoolExecutor] = None,
+    workers: int = 1,
+    collection: str = COLLECTION_NAME,
+) -> List[StageCounter]:
+    """Okuma ve upsert ayrı thread'lerde, encode ana thread'de; aşamalar sınırlı kuyruklarla bağlı."""
+    read_q: "queue.Queue" = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    upload_q: "queue.Queue" = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    stop = threading.Event()
+    errors: List[BaseException] = []
+    counters = [StageCounter("read"), StageCounter("encode"), StageCounter("upload")]
+
+    def _guard(fn, *args) -> None:
+        try:
+            fn(*args)
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+
+    reader = threading.Thread(target=_guard, args=(read_stage, start_line, chunk_idx, read_q, stop, counters[0]), name="read-stage", daemon=True)
+    uploader = threading.Thread(target=_guard, args=(upload_stage, client, ledger, upload_q, stop, counters[2], collection), name="upload-stage", daemon=True)
+    reader.start()
+    uploader.start()
+    _guard(encode_stage, model, store, read_q, upload_q, stop, counters[1], pool, workers)
+    reader.join()
+    uploader.join()
+    if errors:
+        raise errors[0]
+    return counters
+
+
+def _quantization_config() -> rest.ScalarQuantization:
+    return rest.ScalarQuantization(
+        scalar=rest.ScalarQuantizationConfig(type=rest.ScalarType.INT8, quantile=1.0, always_ram=QDRANT_QUANT_ALWAYS_RAM)
+    )
+
+
+def _sync_quantization(client: QdrantClient, info: Any, collection: str) -> None:
+    """Mevcut koleksiyonun int8 ayarı (always_ram) config'ten farklıysa günceller."""
+    # Koleksiyon vektör düzeyinde (VectorParams) oluşturulur; o ayar koleksiyon düzeyindekini ezer
+    vec_level = getattr(info.config.params.vectors, "quantization_config", None)
+    current = vec_level or getattr(info.config, "quantization_config", None)
+    scalar = getattr(current, "scalar", None)
+    if scalar is not None and bool(scalar.always_ram) == QDRANT_QUANT_ALWAYS_RAM:
+        return
+    print(f"Updating quantization config (always_ram={QDRANT_QUANT_ALWAYS_RAM})...")
+    if vec_level is not None:
+        client.update_collection(
+            collection,
+            vectors_config={"": rest.VectorParamsDiff(quantization_config=_quantization_config())},
+        )
+    else:
+        client.update_collection(collection, quantization_config=_quantization_config())
+
+
+def _ensure_payload_indexes(client: QdrantClient, collection: str) -> None:
+    # MMR, BM25'ten gelen adayların saklı vektörlerini doc_id ile çeker
+    try:
+        client.create_payload_index(collection, field_name="doc_id", field_schema=rest.PayloadSchemaType.KEYWORD)
     except Exception:
         pass
+    if QDRANT_CHUNKED:
+        try:
+            client.create_payload_index(collection, field_name="chunk_idx", field_schema=rest.PayloadSchemaType.INTEGER)
+        except Exception:
+            pass
 
-    if COLLECTION_NAME not in [c.name for c in client.get_collections().collections]:
-        print(f"Creating Qdrant collection '{COLLECTION_NAME}'...")
-        vectors_cfg = rest.VectorParams(size=vector_size, distance=rest.Distance.COSINE)
-        if ENABLE_INT8_QUANTIZATION:
-            vectors_cfg.quantization_config = rest.ScalarQuantization(
-                scalar=rest.ScalarQuantizationConfig(type=rest.ScalarType.INT8, quantile=1.0, always_ram=False)
-            )
-        client.create_collection(
-            collection_name=COLLECTION_NAME,
-            vectors_config=vectors_cfg,
-            hnsw_config=rest.HnswConfigDiff(m=32, ef_construct=256),
-        )
-        print("Collection created.")
+
+def ensure_collection(
+    client: QdrantClient,
+    vector_size: int,
+    rebuild: bool = False,
+    resume: Optional[str] = None,
+) -> Tuple[str, bool]:
+    """
+    Yazılacak koleksiyonu seçer; dönüş (koleksiyon, yeni oluşturuldu mu).
+    - canlı koleksiyon uyumluysa: artımlı olarak ona yazılır (kesinti yok)
+    - canlı yoksa, vektör boyutu değiştiyse veya rebuild: lexai_cases_v{N} canlının
+      yanında kurulur, alias main() sonunda doğrulamadan sonra taşınır
+    - resume: yarım kalmış yeni sürüm kaldığı yerden sürdürülür
+    Canlı koleksiyon hiçbir durumda silinmez.
+    """
+    live, _ = qdrant_live(client, COLLECTION_NAME)
+    existing = [c.name for c in client.get_collections().collections]
+    if resume and resume != live and resume in existing:
+        print(f"Resuming build of '{resume}'")
+        return resume, False
+
+    if live and not rebuild:
+        info = client.get_collection(live)
+        if info.config.params.vectors.size == vector_size:
+            if ENABLE_INT8_QUANTIZATION:
+                _sync_quantization(client, info, live)
+            _ensure_payload_indexes(client, live)
+            return live, False
+        print("Vector dimension mismatch. Building a new version alongside the live collection...")
+
+    name = next_version(qdrant_versions(client, COLLECTION_NAME), COLLECTION_NAME)
+    print(f"Creating Qdrant collection '{name}'...")
+    vectors_cfg = rest.VectorParams(size=vector_size, distance=rest.Distance.COSINE)
+    if ENABLE_INT8_QUANTIZATION:
+        vectors_cfg.quantization_config = _quantization_config()
+    client.create_collection(
+        collection_name=name,
+        vectors_config=vectors_cfg,
+        hnsw_config=rest.HnswConfigDiff(m=32, ef_construct=256),
+    )
+    _ensure_payload_indexes(client, name)
+    print("Collection created.")
+    return name, True
+
+
+def publish_version(client: QdrantClient, target: str, force: bool = False, keep: int = REINDEX_KEEP_VERSIONS) -> bool:
+    """Yeni sürümü doğrular, alias'ı taşır ve eski sürümleri (ve defterlerini) siler."""
+    live, legacy = qdrant_live(client, COLLECTION_NAME)
+    problems = validate_qdrant(client, target, live)
+    if problems:
+        print("⚠️  Validation failed:\n  - " + "\n  - ".join(problems))
+        if not force:
+            print(f"Alias not moved; '{target}' left for inspection.")
+            return False
+    swap_qdrant_alias(client, COLLECTION_NAME, target)
+    if legacy and LEDGER_FILE.exists():
+        LEDGER_FILE.unlink()
+    for name in gc_qdrant_versions(client, COLLECTION_NAME, keep=keep):
+        ledger_file(name).unlink(missing_ok=True)
+    return True
 
 
 def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--no-resume", action="store_true", help="Yarım kalan çalıştırmayı yok say, baştan oku")
+    ap.add_argument("--workers", type=int, default=1, help="CPU'da paralel embedding süreci sayısı (her biri kendi modeliyle)")
+    ap.add_argument("--backend", choices=["torch", "onnx", "onnx-int8"], default=EMBED_BACKEND,
+                    help="CPU encode arka ucu (ONNX Runtime / int8); önce onnx_embedder kalite kontrolü")
+    ap.add_argument("--threads-per-worker", type=int, default=None, help="Worker başına torch thread (varsayılan: çekirdek / workers)")
+    ap.add_argument("--rebuild", action="store_true", help="Canlı koleksiyonun yanında yeni sürüm kur (blue/green)")
+    ap.add_argument("--no-swap", action="store_true", help="Yeni sürümü kur ama alias'ı taşıma")
+    ap.add_argument("--force", action="store_true", help="Doğrulama sorunlarına rağmen alias'ı taşı")
+    ap.add_argument("--keep", type=int, default=REINDEX_KEEP_VERSIONS, help="Saklanacak sürüm sayısı (canlı dahil)")
+    args = ap.parse_args()
+
     p = Path(INPUT_FILE)
     if not p.exists():
         raise FileNotFoundError(f"INPUT_FILE not found: {p.resolve()}")
@@ -204,40 +615,65 @@ def main():
     device = pick_device()
     print(f"Using device: {device}")
     optimize_torch_for_env()
-    model = load_embedding_model(device)
+    model = load_embedding_model(device, args.backend)
+    backend = args.backend if not isinstance(model, SentenceTransformer) else "torch"
     vector_size = model.get_sentence_embedding_dimension()
+    max_seq_length = model.max_seq_length
 
-    client = QdrantClient(
-        host=QDRANT_HOST,
-        port=QDRANT_PORT,
-        grpc_port=QDRANT_GRPC_PORT,
-        prefer_grpc=True,
-        timeout=QDRANT_REQUEST_TIMEOUT,
-    )
+    workers = max(1, args.workers)
+    if workers > 1 and device != "cpu":
+        print("--workers yalnızca CPU'da kullanılır; tek süreçle devam ediliyor.")
+        workers = 1
 
-    ensure_collection(client, vector_size)
-    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    # Ortak istemci havuzu; toplu yükleme için daha uzun zaman aşımı
+    client = configure_clients(qdrant_timeout=QDRANT_REQUEST_TIMEOUT).qdrant()
 
-    records: List[str] = []
-    metas: List[Dict[str, Any]] = []
-    chunk_idx = 0
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    store = EmbeddingStore(STORE_DIR, f"{USE_MODEL}@{max_seq_length}" + ("" if backend == "torch" else f"@{backend}"), vector_size)
+    state = {} if args.no_resume else load_state()
+    live, _ = qdrant_live(client, COLLECTION_NAME)
+    target, created = ensure_collection(client, vector_size, rebuild=args.rebuild, resume=state.get("collection"))
+    if state.get("collection", COLLECTION_NAME) != target:
+        state = {}  # durum başka bir koleksiyonun yüklemesine ait
+    ledger = UploadLedger(ledger_file(target))
+    if created:
+        ledger.reset()  # koleksiyon yeni: her şey yeniden yüklenmeli
+    start_line = int(state.get("next_line_after", 0))
+    chunk_idx = int(state.get("chunk_idx", -1)) + 1
+    if start_line:
+        print(f"Resuming after line {start_line} (chunk {chunk_idx})")
 
     print("\n Embedding süreci başladı...\n")
+    pool = None
+    if workers > 1:
+        del model  # encode worker'larda; ana süreçte ikinci kopya tutulmaz
+        gc.collect()
+        model = None
+        pool = start_encode_pool(workers, args.threads_per_worker, backend)
+    try:
+        counters = run_pipeline(model, client, store, ledger, start_line, chunk_idx, pool=pool, workers=workers, collection=target)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    store.close()
+    clear_state()  # tamamlandı; sonraki çalıştırma baştan (değişmeyenler atlanarak) ilerler
+    print(f"\nEncode total: {ENCODE_STATS.summary()}")
+    for c in counters:
+        print(c.summary())
+    print(f"\nAll embeddings uploaded to '{target}'.\n")
+
+    if target != live:
+        if args.no_swap:
+            print(f"--no-swap: '{target}' built, alias unchanged.")
+            return
+        if not publish_version(client, target, force=args.force, keep=args.keep):
+            sys.exit(1)
 
-    with open(INPUT_FILE, "r", encoding="utf-8") as f:
-        for line_idx, line in enumerate(tqdm(f, desc="📖 JSONL okuma", ncols=80)):
-            rec = json.loads(line)
-            add_record(records, metas, rec)
-
-            if len(records) >= 3000:
-                process_and_upload_chunk(model, client, ChunkPack(idx=chunk_idx, next_line_after=line_idx+1, records=records, metas=metas))
-                chunk_idx += 1
-                records, metas = [], []
-
-        if records:
-            process_and_upload_chunk(model, client, ChunkPack(idx=chunk_idx, next_line_after=line_idx+1, records=records, metas=metas))
-
-    print("\nAll embeddings uploaded successfully.\n")
+    # Yeni nesli yayınla → API'deki retrieval sonuç önbelleği geçersizleşir
+    # (sayaç alias adına tutulur; sürüm değişse de artmaya devam eder)
+    gen = bump_qdrant_generation(COLLECTION_NAME)
+    print(f"✅ Qdrant '{COLLECTION_NAME}' generation → {gen}")
 
 
 if __name__ == "__main__":
@@ -1,17 +1,130 @@
 # src/services/query_service.py
+"""
+/ask için tek geçişli sorgu hattı:
+
+    clean → route → retrieve → prompt → generate
+
+- process_user_query: yalnızca temizleme + kural tabanlı yönlendirme (model çalışmaz)
+- prepare_answer:     tek retrieval, tek prompt (üretim yok; /ask ve /ask/stream
+                      üretimi llm_client üzerinden kendisi yapar)
+
+Her aşamanın süresi StageTimer ile milisaniye cinsinden tutulur.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
 from src.user_input.text_cleaner import clean_text
-from src.rag.query_llm import query_llm
-from src.retrieval.retrieve_combined import hybrid_search
-from src.rag.prompt_builder import SYSTEM_PROMPT, build_user_prompt
-
-def process_user_query(raw_query: str):
-    cleaned_query = clean_text(raw_query)
-    try:
-        hits = hybrid_search(cleaned_query)
-        passages = [{"doc_id": h.doc_id, "text": h.text_repr} for h in hits]
-        user_prompt = build_user_prompt(cleaned_query, passages)
-    except Exception:
-        user_prompt = f"SORU:\n{cleaned_query}\n\nBu hukuki soruya açıklama yap."
-    
-    answer = query_llm(SYSTEM_PROMPT, user_prompt)
-    return cleaned_query, answer
\ No newline at end of file
+from src.retrieval.retrieve_combined import Hit, hybrid_search_with_meta
+from src.rag.prompt_builder import build_user_prompt, route_query
+from src.rag.config import MAX_TOTAL_PASSAGES
+from src.retrieval.index_schema import FULL_TEXT_FIELD, PREVIEW_FIELD, QDRANT_FULL_TEXT_FIELD
+
+logger = logging.getLogger("uvicorn.error")
+
+
+@dataclass
+class StageTimer:
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = round((time.perf_counter() - t0) * 1000, 1)
+
+
+@dataclass
+class RagAnswer:
+    answer: Optional[str]
+    route: str
+    passages: List[Dict[str, Any]]
+    hits: List[Hit]
+    retrieval: Dict[str, Any] = field(default_factory=dict)
+    user_prompt: Optional[str] = None
+
+
+def process_user_query(raw_query: str, timer: Optional[StageTimer] = None) -> Tuple[str, Optional[str], str]:
+    """
+    Sorguyu temizler ve yönlendirir → (temiz_sorgu, hazır_cevap, rota)
+    Selamlama / anlamsız / hukuk dışı sorgular burada kısa devre yapar.
+    """
+    timer = timer or StageTimer()
+    with timer.stage("clean"):
+        cleaned_query = clean_text(raw_query)
+    with timer.stage("route"):
+        route, early_answer = route_query(cleaned_query)
+    return cleaned_query, early_answer, route
+
+
+def hits_to_passages(hits: List[Hit], limit: int = MAX_TOTAL_PASSAGES) -> List[Dict[str, Any]]:
+    """Retrieval sonuçlarını prompt_builder'ın beklediği pasaj sözlüklerine çevirir."""
+    seen, passages = set(), []
+    for h in hits:
+        if h.doc_id in seen:
+            continue
+        payload = dict(h.payload or {})
+        payload["doc_id"] = h.doc_id
+        # text_full: retrieval'da sorguya göre dilimlenmiş öz (passage_slicer)
+        full_txt = (
+            getattr(h, "text_full", None)
+            or payload.get(FULL_TEXT_FIELD)
+            or payload.get(QDRANT_FULL_TEXT_FIELD)
+            or ""
+        ).strip()
+        if not full_txt:
+            continue
+        payload[FULL_TEXT_FIELD] = full_txt
+        payload["dava_turu"] = payload.get("dava_turu") or payload.get("dava_turu_norm") or ""
+        payload["karar"] = payload.get("karar") or payload.get("sonuc") or ""
+        payload[PREVIEW_FIELD] = payload.get(PREVIEW_FIELD) or full_txt[:300]
+        payload["score"] = h.score_norm
+        passages.append(payload)
+        seen.add(h.doc_id)
+        if len(passages) >= limit:
+            break
+    return passages
+
+
+def prepare_answer(
+    cleaned_query: str,
+    *,
+    context_query: Optional[str] = None,
+    conversation_history: Optional[List[Dict]] = None,
+    topn: int = MAX_TOTAL_PASSAGES,
+    timer: Optional[StageTimer] = None,
+    fusion: Optional[str] = None,
+) -> RagAnswer:
+    """
+    retrieve → prompt aşamaları. Üretim (generate) çağırana bırakılır;
+    /ask tek parça, /ask/stream akış halinde üretir.
+    Pasaj bulunamazsa passages=[] ve user_prompt=None döner.
+    """
+    timer = timer or StageTimer()
+
+    with timer.stage("retrieve"):
+        hits, retrieval_meta = hybrid_search_with_meta(context_query or cleaned_query, topn=topn, fusion=fusion)
+        passages = hits_to_passages(hits)
+
+    if not passages:
+        return RagAnswer(answer=None, route="legal", passages=[], hits=hits, retrieval=retrieval_meta)
+
+    with timer.stage("prompt"):
+        pack_info: Dict[str, Any] = {}
+        user_prompt, early_answer = build_user_prompt(
+            cleaned_query, passages, conversation_history, pack_info=pack_info
+        )
+    if pack_info:
+        retrieval_meta = {**retrieval_meta, "context": pack_info}
+
+    if early_answer:
+        return RagAnswer(answer=early_answer, route="rule", passages=passages, hits=hits, retrieval=retrieval_meta)
+
+    return RagAnswer(
+        answer=None, route="legal", passages=passages, hits=hits,
+        retrieval=retrieval_meta, user_prompt=user_prompt,
+    )
@@ -0,0 +1,7 @@
+import os
+import sys
+from pathlib import Path
+
+# src.core.db içe aktarılırken engine kurulur; testlerde bağlantı açılmaz
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from src.retrieval.batching import encode_bucketed, plan_batches
+
+
+@pytest.mark.parametrize("lengths,budget,max_batch,expected", [
+    ([], 100, 8, []),
+    ([10, 50, 20, 50, 5], 100, 8, [[1, 3], [2, 0, 4]]),   # uzundan kısaya; 50×2 = bütçe
+    ([1, 1, 1, 1, 1], 1000, 2, [[0, 1], [2, 3], [4]]),    # max_batch sınırı
+    ([500, 10], 100, 8, [[0], [1]]),                     # bütçeyi tek başına aşan kayıt kendi batch'inde
+    ([0, 0, 0], 2, 8, [[0, 1], [2]]),                    # sıfır uzunluk 1 token sayılır
+])
+def test_plan_batches_table(lengths, budget, max_batch, expected):
+    assert plan_batches(lengths, budget, max_batch) == expected
+
+
+def test_plan_batches_respects_token_budget():
+    rng = np.random.default_rng(0)
+    lengths = rng.integers(1, 300, size=200).tolist()
+    batches = plan_batches(lengths, token_budget=1024, max_batch=16)
+
+    assert sorted(i for b in batches for i in b) == list(range(200))
+    for b in batches:
+        assert len(b) <= 16
+        assert max(lengths[i] for i in b) * len(b) <= 1024
+    maxes = [max(lengths[i] for i in b) for b in batches]
+    assert maxes == sorted(maxes, reverse=True)   # en uzun batch önce (bellek hatası iş başında)
+
+
+class FakeModel:
+    """encode: her metin için [uzunluk, batch boyu]; batch çağrıları kaydedilir."""
+
+    tokenizer = None
+    max_seq_length = 512
+
+    def __init__(self):
+        self.calls = []
+
+    def get_sentence_embedding_dimension(self):
+        return 2
+
+    def encode(self, texts, batch_size, **kw):
+        self.calls.append(list(texts))
+        return [[len(t), batch_size] for t in texts]
+
+
+def test_encode_bucketed_restores_input_order():
+    texts = ["kısa", "çok çok uzun bir karar metni", "orta boy metin", "x"]
+    lengths = [1, 7, 3, 1]
+    model = FakeModel()
+    progress = []
+
+    emb, stats = encode_bucketed(model, texts, token_budget=8, max_batch=4, lengths=lengths, on_batch=progress.append)
+
+    assert emb[:, 0].tolist() == [len(t) for t in texts]
+    assert model.calls == [[texts[1]], [texts[2], texts[0]], [texts[3]]]   # uzundan kısaya
+    assert emb[:, 1].tolist() == [2, 1, 2, 1]                                # batch_size = batch boyu
+    assert progress == [1, 2, 1] and stats.batches == 3
+    assert (stats.tokens, stats.padded_tokens) == (12, 7 + 3 * 2 + 1)
+
+
+def test_encode_bucketed_empty_input():
+    emb, stats = encode_bucketed(FakeModel(), [], token_budget=8)
+    assert emb.shape == (0, 2) and stats.records == 0 and stats.batches == 0
@@ -0,0 +1,66 @@
+import pytest
+
+from src.retrieval.chunking import ChunkHit, PASSAGE_SEP, chunk_spans, collapse_chunks
+
+WORDS = " ".join(f"w{i:02d}" for i in range(40))   # 159 karakter, 4 karakterde bir boşluk
+
+
+@pytest.mark.parametrize("text,size,overlap,max_chunks,expected", [
+    ("", 10, 4, 10, []),
+    ("kısa", 10, 4, 10, [(0, 4)]),
+    ("x" * 100, 40, 10, 10, [(0, 40), (30, 70), (60, 100)]),          # boşluk yok: sabit adım
+    ("aaaa bbbb cccc dddd", 10, 4, 10, [(0, 9), (5, 14), (10, 19)]),  # kesim boşlukta, örtüşme bir kelime
+    ("x" * 100, 40, 10, 2, [(0, 40), (30, 70)]),                     # max_chunks sınırı
+])
+def test_chunk_spans_table(text, size, overlap, max_chunks, expected):
+    assert chunk_spans(text, size=size, overlap=overlap, max_chunks=max_chunks) == expected
+
+
+@pytest.mark.parametrize("size,overlap", [(40, 10), (25, 8), (60, 5), (17, 16)])
+def test_chunk_spans_overlap_and_end_coverage(size, overlap):
+    # örtüşme bir kelimeden uzun: kesim bölgesinde her zaman boşluk bulunur
+    spans = chunk_spans(WORDS, size=size, overlap=overlap, max_chunks=1000)
+
+    assert spans[0][0] == 0 and spans[-1][1] == len(WORDS)   # son parça metnin sonuna dayanır
+    for (s0, e0), (s1, e1) in zip(spans, spans[1:]):
+        assert s0 < s1 <= e0                 # boşluk kalmaz, ilerleme var
+        assert e0 - s0 <= size
+        assert WORDS[e0] == " " and WORDS[s1 - 1] == " "   # kelime ortasından kesilmez
+
+
+def _c(doc_id, score, idx, start, end, text):
+    return ChunkHit(doc_id=doc_id, score=score, chunk_idx=idx, start=start, end=end, text=text, payload={})
+
+
+CHUNKS = [
+    _c("d1", 0.9, 0, 0, 9, "aaaa bbbb"),
+    _c("d2", 0.8, 0, 0, 4, "xxxx"),
+    _c("d3", 0.6, 0, 0, 4, "pppp"),
+    _c("d1", 0.5, 1, 5, 14, "bbbb cccc"),
+    _c("d3", 0.5, 3, 20, 24, "rrrr"),
+]
+
+
+@pytest.mark.parametrize("pooling,order,scores", [
+    ("max", ["d1", "d2", "d3"], [0.9, 0.8, 0.6]),
+    ("sum", ["d1", "d3", "d2"], [1.4, 1.1, 0.8]),
+])
+def test_collapse_chunks_pooling(pooling, order, scores):
+    docs = collapse_chunks(CHUNKS, pooling=pooling)
+
+    assert [d.doc_id for d in docs] == order
+    assert [d.score for d in docs] == pytest.approx(scores)
+    d1 = docs[0]
+    assert d1.best.chunk_idx == 0 and len(d1.chunks) == 2
+
+
+def test_collapse_chunks_passage_merges_overlap_and_gaps():
+    d1, d3, _ = collapse_chunks(CHUNKS, pooling="sum")
+    assert d1.passage() == "aaaa bbbb cccc"                  # örtüşen kısım tekrarlanmaz
+    assert d3.passage() == f"pppp{PASSAGE_SEP}rrrr"          # ayrık parçalar ayraçla, metin sırasında
+    assert d3.passage(max_chars=6) == "pppp"                 # bütçe: önce en yüksek skorlu parça
+
+
+def test_collapse_chunks_rejects_unknown_pooling():
+    with pytest.raises(ValueError):
+        collapse_chunks(CHUNKS, pooling="mean")
@@ -0,0 +1,135 @@
+import grpc
+import pytest
+from opensearchpy.exceptions import ConnectionError as OSConnectionError, ConnectionTimeout
+
+from src.retrieval import clients
+
+
+class FakePool:
+    def __init__(self):
+        self.resets = 0
+        self.qdrant_resets = 0
+        self.stale = set()
+
+    def opensearch(self):
+        return object()
+
+    def qdrant(self):
+        return object()
+
+    def reset_opensearch(self):
+        self.stale.discard("opensearch")
+        self.resets += 1
+
+    def reset_qdrant(self):
+        self.stale.discard("qdrant")
+        self.qdrant_resets += 1
+
+    def is_stale(self, name):
+        return name in self.stale
+
+
+class FakeRpcError(grpc.RpcError):
+    def __init__(self, code):
+        self._code = code
+
+    def code(self):
+        return self._code
+
+
+def test_timeouts_are_not_retried(monkeypatch):
+    pool = FakePool()
+    monkeypatch.setattr(clients, "_pool", pool)
+    calls = []
+
+    def timed_out(c):
+        calls.append(c)
+        raise ConnectionTimeout("TIMEOUT", "read timed out", None)
+
+    with pytest.raises(ConnectionTimeout):
+        clients.call_opensearch(timed_out)
+    assert len(calls) == 1 and pool.resets == 0
+
+
+def test_connection_errors_reconnect_once(monkeypatch):
+    pool = FakePool()
+    monkeypatch.setattr(clients, "_pool", pool)
+    calls = []
+
+    def flaky(c):
+        calls.append(c)
+        if len(calls) == 1:
+            raise OSConnectionError("N/A", "connection refused", None)
+        return "ok"
+
+    assert clients.call_opensearch(flaky) == "ok"
+    assert pool.resets == 1
+
+
+@pytest.mark.parametrize("code,reconnects", [
+    (grpc.StatusCode.UNAVAILABLE, 1),
+    (grpc.StatusCode.NOT_FOUND, 0),
+    (grpc.StatusCode.INVALID_ARGUMENT, 0),
+    (grpc.StatusCode.DEADLINE_EXCEEDED, 0),
+])
+def test_qdrant_reconnects_only_on_transport_codes(monkeypatch, code, reconnects):
+    pool = FakePool()
+    monkeypatch.setattr(clients, "_pool", pool)
+    calls = []
+
+    def failing_once(c):
+        calls.append(c)
+        if len(calls) == 1:
+            raise FakeRpcError(code)
+        return "ok"
+
+    if reconnects:
+        assert clients.call_qdrant(failing_once) == "ok"
+    else:
+        with pytest.raises(FakeRpcError):
+            clients.call_qdrant(failing_once)
+    assert pool.qdrant_resets == reconnects and len(calls) == 1 + reconnects
+
+
+class ClosableClient:
+    def __init__(self, healthy):
+        self.healthy = healthy
+        self.closed = False
+
+    def ping(self):
+        return self.healthy
+
+    def get_collections(self):
+        if not self.healthy:
+            raise ConnectionError("down")
+
+    def close(self):
+        self.closed = True
+
+
+def test_health_marks_stale_and_next_call_reconnects(monkeypatch):
+    pool = clients.ClientPool()
+    built = []
+
+    def build(healthy):
+        def _build():
+            c = ClosableClient(healthy)
+            built.append(c)
+            return c
+        return _build
+
+    monkeypatch.setattr(pool, "_build_opensearch", build(False))
+    monkeypatch.setattr(pool, "_build_qdrant", build(False))
+    monkeypatch.setattr(clients, "_pool", pool)
+
+    h = pool.health()
+    assert h["opensearch"] is False and h["qdrant"] is False
+    # izleme thread'i kullanımdaki istemcileri kapatmaz
+    assert len(built) == 2 and not any(c.closed for c in built)
+    assert pool.is_stale("opensearch") and pool.is_stale("qdrant")
+
+    monkeypatch.setattr(pool, "_build_qdrant", build(True))
+    assert clients.call_qdrant(lambda c: c.healthy) is True
+    assert built[1].closed and not pool.is_stale("qdrant")
+    assert pool.stats["qdrant_reconnects"] == 1
+    assert pool.is_stale("opensearch")
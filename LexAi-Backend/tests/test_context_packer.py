@@ -0,0 +1,40 @@
+import logging
+
+import pytest
+
+from src.rag import context_packer
+from src.rag.context_packer import resolve_tokenizer_name, tokenizer_for_model
+
+
+@pytest.mark.parametrize("model,expected", [
+    ("qwen2.5:7b-instruct", "Qwen/Qwen2.5-7B-Instruct"),
+    ("qwen2.5:14b", "Qwen/Qwen2.5-7B-Instruct"),        # aile aynı tokenizer'ı paylaşır
+    ("Qwen/Qwen2.5-7B-Instruct", "Qwen/Qwen2.5-7B-Instruct"),   # vllm/openai: HF deposu
+    ("gpt-4o-mini", None),
+])
+def test_tokenizer_for_model(model, expected):
+    assert tokenizer_for_model(model) == expected
+
+
+@pytest.mark.parametrize("model,configured,expected,warns", [
+    ("qwen2.5:7b-instruct", None, "Qwen/Qwen2.5-7B-Instruct", False),
+    ("qwen2.5:7b-instruct", "Qwen/Qwen2.5-14B-Instruct", "Qwen/Qwen2.5-14B-Instruct", False),
+    ("llama3.1:8b", "Qwen/Qwen2.5-7B-Instruct", "Qwen/Qwen2.5-7B-Instruct", True),
+    ("gpt-4o-mini", None, None, True),
+    ("gpt-4o-mini", "Xenova/gpt-4o", "Xenova/gpt-4o", False),
+])
+def test_resolve_tokenizer_name_warns_on_mismatch(caplog, model, configured, expected, warns):
+    with caplog.at_level(logging.WARNING, logger="uvicorn.error"):
+        assert resolve_tokenizer_name(model, configured) == expected
+    assert any("tokenizer" in r.getMessage().lower() or "LLM_TOKENIZER_NAME" in r.getMessage()
+               for r in caplog.records) == warns
+
+
+def test_get_tokenizer_falls_back_to_chars_without_a_name(monkeypatch):
+    monkeypatch.setattr(context_packer, "_tokenizer_loaded", False)
+    monkeypatch.setattr(context_packer, "_tokenizer", None)
+    monkeypatch.setattr(context_packer, "resolve_tokenizer_name", lambda: None)
+
+    assert context_packer.get_tokenizer() is None
+    assert context_packer.count_tokens("a" * 30) == 10   # CHARS_PER_TOKEN = 3
+    assert context_packer.pack_passages([("metin " * 40, 1.0)]).tokenizer == "chars"
@@ -0,0 +1,119 @@
+import json
+
+import numpy as np
+import pytest
+
+from src.retrieval import embedding_store
+from src.retrieval.embedding_store import EmbeddingStore, UploadLedger, payload_key, text_key
+
+
+def _vecs(n, dim=4, start=0):
+    return np.arange(start, start + n * dim, dtype=np.float32).reshape(n, dim)
+
+
+# ==================== EmbeddingStore ====================
+
+def test_store_roundtrip_and_missing(tmp_path):
+    store = EmbeddingStore(tmp_path, "m", 4)
+    keys = [text_key(t) for t in ("a", "b", "a", "c")]
+    assert store.missing(keys) == [0, 1, 3]   # tekrar eden anahtar bir kez
+
+    store.put([keys[0], keys[1]], _vecs(2))
+    assert store.missing(keys) == [3]
+    np.testing.assert_array_equal(store.get([keys[1], keys[0]]), _vecs(2)[::-1])
+
+
+def test_store_grows_past_capacity_and_reloads(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_store, "_INITIAL_CAPACITY", 4)
+    store = EmbeddingStore(tmp_path, "m", 4)
+    assert store.capacity == 4
+
+    keys = [f"k{i}" for i in range(11)]
+    store.put(keys[:3], _vecs(3))
+    store.put(keys[3:], _vecs(8, start=100))
+    assert store.capacity >= 11
+    store.close()
+
+    again = EmbeddingStore(tmp_path, "m", 4)
+    assert len(again) == 11 and again.capacity == store.capacity
+    np.testing.assert_array_equal(again.get(keys[:3]), _vecs(3))
+    np.testing.assert_array_equal(again.get(keys[3:]), _vecs(8, start=100))
+
+
+def test_store_ignores_torn_last_index_line(tmp_path):
+    store = EmbeddingStore(tmp_path, "m", 4)
+    store.put(["a", "b"], _vecs(2))
+    store.close()
+    with open(tmp_path / "index.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"k": "c", "r"')   # çökme: yarım yazılmış satır
+
+    again = EmbeddingStore(tmp_path, "m", 4)
+    assert set(again.index) == {"a", "b"}
+    again.put(["c"], _vecs(1, start=50))
+    np.testing.assert_array_equal(again.get(["c"]), _vecs(1, start=50))
+    again.close()
+
+    # yarım satır kesildiği için sonraki ekleme de kalıcı
+    third = EmbeddingStore(tmp_path, "m", 4)
+    assert set(third.index) == {"a", "b", "c"}
+    np.testing.assert_array_equal(third.get(["c"]), _vecs(1, start=50))
+
+
+@pytest.mark.parametrize("model,dim", [("other-model", 4), ("m", 8)])
+def test_store_resets_when_model_or_dim_changes(tmp_path, model, dim):
+    store = EmbeddingStore(tmp_path, "m", 4)
+    store.put(["a"], _vecs(1))
+    store.close()
+
+    again = EmbeddingStore(tmp_path, model, dim)
+    assert len(again) == 0 and again.missing(["a"]) == [0]
+    meta = json.loads((tmp_path / "meta.json").read_text(encoding="utf-8"))
+    assert meta["model"] == model and meta["dim"] == dim
+
+
+# ==================== UploadLedger ====================
+
+def test_ledger_record_and_stale_points(tmp_path):
+    ledger = UploadLedger(tmp_path / "uploaded.jsonl")
+    ledger.record({"d1": {1, 2, 3}, "d2": {10}})
+    assert ledger.is_uploaded(2) and not ledger.is_uploaded(4)
+    assert ledger.stale_points("d1", {1, 2, 3}) == set()
+
+    # d1'in içeriği değişti: 3 yerine 4 üretildi
+    assert ledger.stale_points("d1", {1, 2, 4}) == {3}
+    assert ledger.stale_points("new-doc", {7}) == set()
+    ledger.record({"d1": {1, 2, 4}})
+    assert not ledger.is_uploaded(3) and ledger.is_uploaded(4) and ledger.is_uploaded(10)
+
+    again = UploadLedger(tmp_path / "uploaded.jsonl")   # son satır geçerli
+    assert again.by_doc == {"d1": {1, 2, 4}, "d2": {10}}
+    assert not again.is_uploaded(3)
+
+
+def test_ledger_detects_metadata_only_changes(tmp_path):
+    meta = {"doc_id": "d1", "text_sha1": "x", "dava_turu": "kira", "sonuc": "onama"}
+    h = payload_key(meta)
+    assert payload_key(dict(reversed(list(meta.items())))) == h
+
+    ledger = UploadLedger(tmp_path / "uploaded.jsonl")
+    ledger.record({"d1": {1}}, {1: h})
+    assert ledger.is_uploaded(1, h)
+
+    changed = payload_key({**meta, "sonuc": "bozma"})
+    assert not ledger.is_uploaded(1, changed)
+    ledger.record({"d1": {1}}, {1: changed})
+    assert UploadLedger(tmp_path / "uploaded.jsonl").is_uploaded(1, changed)
+
+
+def test_ledger_without_payload_hashes_reuploads_once(tmp_path):
+    path = tmp_path / "uploaded.jsonl"
+    path.write_text(json.dumps({"doc_id": "d1", "pids": [1]}) + "\n" + '{"doc_id": "d2", "pi', encoding="utf-8")
+
+    ledger = UploadLedger(path)
+    assert ledger.by_doc == {"d1": {1}}
+    assert ledger.is_uploaded(1) and not ledger.is_uploaded(1, "h")
+    ledger.record({"d2": {2}}, {2: "h2"})
+    assert UploadLedger(path).by_doc == {"d1": {1}, "d2": {2}}
+
+    ledger.reset()
+    assert not path.exists() and not ledger.is_uploaded(1)
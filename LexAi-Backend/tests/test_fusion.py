@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from src.retrieval.fusion import fuse, to_unit
+
+K = 60
+
+CASES = [
+    # (yöntem, id listeleri, skorlar, ağırlıklar, beklenen sıra, beklenen skorlar)
+    ("rrf", [["a", "b"], ["c", "d"]], [[2, 1], [0.9, 0.1]], None,
+     ["a", "c", "b", "d"], [1 / 61, 1 / 61, 1 / 62, 1 / 62]),
+    ("rrf", [["a", "b"], ["b", "c"]], [[2, 1], [0.9, 0.1]], None,
+     ["b", "a", "c"], [1 / 62 + 1 / 61, 1 / 61, 1 / 62]),
+    ("rrf", [["a", "b"], ["c", "d"]], [[2, 1], [0.9, 0.1]], [1, 3],
+     ["c", "d", "a", "b"], [3 / 61, 3 / 62, 1 / 61, 1 / 62]),
+    ("rrf", [["a", "b"], []], [[2, 1], []], None,
+     ["a", "b"], [1 / 61, 1 / 62]),
+    ("rrf", [["a", "b"], ["b"]], [[2, 1], [5]], None,
+     ["b", "a"], [1 / 62 + 1 / 61, 1 / 61]),
+
+    # z-score: listede olmayan belge kaynağın en düşük z değerini alır
+    ("zscore", [["a", "b"], ["c", "d"]], [[3, 1], [10, 0]], None,
+     ["a", "c", "b", "d"], [0, 0, -2, -2]),
+    ("zscore", [["a", "b", "c"], ["b", "c"]], [[3, 2, 1], [1, 0]], None,
+     ["b", "a", "c"], [1, np.sqrt(1.5) - 1, -np.sqrt(1.5) - 1]),
+    ("zscore", [["a", "b"], []], [[2, 1], []], None,
+     ["a", "b"], [1, -1]),
+    ("zscore", [["a", "b"], ["b"]], [[2, 1], [5]], None,   # tek sonuçlu kaynak sıralamayı ezmez
+     ["a", "b"], [1, -1]),
+
+    # weighted: min-max normalize skorların ağırlıklı toplamı
+    ("weighted", [["a", "b"], ["c", "d"]], [[3, 1], [10, 0]], [0.25, 0.75],
+     ["c", "a", "b", "d"], [0.75, 0.25, 0, 0]),
+    ("weighted", [["a", "b"], ["b", "c"]], [[3, 1], [10, 0]], [0.25, 0.75],
+     ["b", "a", "c"], [0.75, 0.25, 0]),
+    ("weighted", [["a", "b"], []], [[3, 1], []], [0.25, 0.75],
+     ["a", "b"], [0.25, 0]),
+    ("weighted", [["a", "b"], ["b"]], [[2, 1], [5]], [0.25, 0.75],
+     ["b", "a"], [0.75, 0.25]),
+]
+
+
+@pytest.mark.parametrize("method,ids,scores,weights,order,expected", CASES)
+def test_fuse_table(method, ids, scores, weights, order, expected):
+    out_ids, fused = fuse(ids, [np.array(s, dtype=float) for s in scores], method=method, weights=weights, rrf_k=K)
+    assert out_ids == order
+    assert fused == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("method", ["rrf", "zscore", "weighted"])
+def test_fuse_all_sources_empty(method):
+    ids, fused = fuse([[], []], [np.array([]), np.array([])], method=method)
+    assert ids == [] and len(fused) == 0
+
+
+def test_fuse_rejects_unknown_method():
+    with pytest.raises(ValueError):
+        fuse([["a"]], [np.array([1.0])], method="borda")
+
+
+@pytest.mark.parametrize("method,weights,expected", [
+    ("rrf", [1, 1], [1.0, 61 / 62]),   # 1.0 = her kaynakta ilk sırada
+    ("weighted", [0.25, 0.75], [1.0, 0.0]),
+])
+def test_to_unit_scales_to_one(method, weights, expected):
+    ids, fused = fuse([["a", "b"], ["a", "b"]], [np.array([2.0, 1.0]), np.array([5.0, 1.0])],
+                      method=method, weights=weights, rrf_k=K)
+    assert ids == ["a", "b"]
+    assert to_unit(fused, method, weights, K) == pytest.approx(expected)
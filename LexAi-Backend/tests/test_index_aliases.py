@@ -0,0 +1,44 @@
+import pytest
+
+from src.retrieval.index_aliases import _gc_plan, check_count, next_version
+
+NAMES = [f"lexai_v{i}" for i in range(1, 7)] + ["lexai", "other_v1", "lexai_v2_tmp", "lexai_vx"]
+
+
+@pytest.mark.parametrize("live,keep,expected", [
+    ("lexai_v4", 2, ["lexai_v1", "lexai_v2", "lexai_v5", "lexai_v6"]),   # v5/v6: yarım kalmış yeni sürümler
+    ("lexai_v4", 1, ["lexai_v1", "lexai_v2", "lexai_v3", "lexai_v5", "lexai_v6"]),
+    ("lexai_v4", 10, ["lexai_v5", "lexai_v6"]),
+    ("lexai_v4", 0, ["lexai_v1", "lexai_v2", "lexai_v3", "lexai_v5", "lexai_v6"]),   # canlı hiçbir zaman silinmez
+    ("lexai_v6", 3, ["lexai_v1", "lexai_v2", "lexai_v3"]),
+    ("lexai_v1", 2, ["lexai_v2", "lexai_v3", "lexai_v4", "lexai_v5", "lexai_v6"]),
+    ("lexai", 2, []),      # legacy: canlı ad gerçek indeks, sürümler dokunulmaz
+    (None, 2, []),
+])
+def test_gc_plan_keep_window(live, keep, expected):
+    assert _gc_plan(NAMES, "lexai", live, keep) == expected
+
+
+def test_gc_plan_orders_versions_numerically():
+    names = ["lexai_v9", "lexai_v10", "lexai_v11", "lexai_v2"]
+    assert _gc_plan(names, "lexai", "lexai_v10", 2) == ["lexai_v2", "lexai_v11"]
+    assert next_version(names, "lexai") == "lexai_v12"
+    assert next_version(["lexai"], "lexai") == "lexai_v1"
+
+
+@pytest.mark.parametrize("new,live,ratio,ok", [
+    (0, None, 0.8, False),
+    (0, 100, 0.8, False),
+    (10, None, 0.8, True),    # ilk sürüm: karşılaştırılacak canlı yok
+    (10, 0, 0.8, True),
+    (80, 100, 0.8, True),
+    (79, 100, 0.8, False),
+    (150, 100, 0.8, True),
+])
+def test_check_count(new, live, ratio, ok):
+    err = check_count(new, live, min_ratio=ratio)
+    assert (err is None) == ok
+    if new == 0:
+        assert err == "new version is empty"
+    elif not ok:
+        assert str(live) in err and str(new) in err
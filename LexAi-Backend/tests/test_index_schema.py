@@ -0,0 +1,18 @@
+from src.retrieval import index_schema
+
+
+def test_synonyms_are_equivalence_groups_only(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)   # yollar çalışma dizininden bağımsız çözülür
+    rules = index_schema.build_synonyms()
+
+    assert "kiracı, müstecir" in rules
+    assert any(r.startswith("TBK") and r.endswith("6098") for r in rules)
+    # keywords.yml konu başlıkları eş anlamlı olarak genişletilmez
+    assert not any("=>" in r or r.startswith("aile") for r in rules)
+
+
+def test_synonyms_are_built_with_the_index_body_only():
+    assert index_schema.INDEX_SETTINGS["analysis"]["filter"]["lexai_synonyms"]["synonyms"] == []
+    body = index_schema.index_body()
+    assert body["settings"]["analysis"]["filter"]["lexai_synonyms"]["synonyms"]
+    assert body["mappings"] == index_schema.INDEX_MAPPINGS
@@ -0,0 +1,54 @@
+import grpc
+import httpx
+import pytest
+from qdrant_client.http.exceptions import UnexpectedResponse
+
+from src.retrieval import index_version
+
+
+class FakeRpcError(grpc.RpcError):
+    def __init__(self, code):
+        self._code = code
+
+    def code(self):
+        return self._code
+
+
+def _raise(e):
+    def call(fn):
+        raise e
+    return call
+
+
+@pytest.mark.parametrize("error", [
+    UnexpectedResponse(404, "Not Found", b"{}", httpx.Headers()),
+    FakeRpcError(grpc.StatusCode.NOT_FOUND),
+])
+def test_missing_meta_collection_reads_as_generation_zero(monkeypatch, error):
+    monkeypatch.setattr(index_version, "call_qdrant", _raise(error))
+    assert index_version.read_qdrant_generation("lexai_cases") == 0
+
+
+@pytest.mark.parametrize("error", [
+    UnexpectedResponse(500, "Internal Server Error", b"{}", httpx.Headers()),
+    FakeRpcError(grpc.StatusCode.UNAVAILABLE),
+    ConnectionError("qdrant down"),
+])
+def test_outages_are_not_hidden(monkeypatch, error):
+    monkeypatch.setattr(index_version, "call_qdrant", _raise(error))
+    with pytest.raises(type(error)):
+        index_version.read_qdrant_generation("lexai_cases")
+
+
+def test_current_version_falls_back_to_unknown_on_outage(monkeypatch):
+    monkeypatch.setattr(index_version, "_cached_version", None)
+    monkeypatch.setattr(index_version, "read_opensearch_generation", lambda: 3)
+    monkeypatch.setattr(index_version, "call_qdrant", _raise(FakeRpcError(grpc.StatusCode.UNAVAILABLE)))
+    assert index_version.current_index_version(max_age=0) == "unknown"
+
+    monkeypatch.setattr(index_version, "call_qdrant", _raise(FakeRpcError(grpc.StatusCode.NOT_FOUND)))
+    assert index_version.current_index_version(max_age=0) == "os3-qd0"
+
+    # sonraki kesintide son bilinen sürüm kullanılır
+    monkeypatch.setattr(index_version, "call_qdrant", _raise(ConnectionError("down")))
+    assert index_version.current_index_version(max_age=0) == "os3-qd0"
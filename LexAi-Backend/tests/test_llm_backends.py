@@ -0,0 +1,165 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from src.rag.llm_backends import LLMRequest, OllamaBackend, OpenAICompatBackend
+from src.rag.llm_client import AsyncLLMClient
+
+OPTIONS = {"num_predict": 64, "temperature": 0.2, "top_p": 0.8, "top_k": 40, "repeat_penalty": 1.1}
+
+
+class ChunkedStream(httpx.AsyncByteStream):
+    """Gövdeyi verilen parçalar halinde akıtır (satırlar parça sınırında bölünebilir)."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def __aiter__(self):
+        for c in self.chunks:
+            yield c.encode()
+
+
+def _mock(backend, handler):
+    backend._client = httpx.AsyncClient(base_url=backend.base_url, transport=httpx.MockTransport(handler))
+    return backend
+
+
+def _req(prompt="p", options=None):
+    return LLMRequest(prompt=prompt, messages=[{"role": "user", "content": prompt}], options=options or dict(OPTIONS))
+
+
+async def _collect(agen):
+    return [x async for x in agen]
+
+
+# ==================== Ollama ====================
+
+def test_ollama_stream_buffers_partial_lines_and_stops_at_done():
+    lines = [{"response": "Kira"}, {"response": " tespiti"}, {"response": "", "done": True}, {"response": "SONRASI"}]
+    body = "".join(json.dumps(x, ensure_ascii=False) + "\n" for x in lines)
+    chunks = [body[:7], body[7:30], body[30:]]   # satır ortasından bölünmüş parçalar
+
+    def handler(request):
+        assert request.url.path == "/api/generate"
+        assert json.loads(request.content)["stream"] is True
+        return httpx.Response(200, stream=ChunkedStream(chunks))
+
+    backend = _mock(OllamaBackend("http://ollama", "qwen"), handler)
+    assert asyncio.run(_collect(backend.stream(_req()))) == ["Kira", " tespiti"]
+
+
+def test_ollama_stream_raises_on_error_line():
+    body = json.dumps({"response": "Kira"}) + "\n" + json.dumps({"error": "model not found"}) + "\n"
+    backend = _mock(OllamaBackend("http://ollama", "qwen"), lambda r: httpx.Response(200, text=body))
+
+    with pytest.raises(RuntimeError, match="model not found"):
+        asyncio.run(_collect(backend.stream(_req())))
+
+
+# ==================== OpenAI uyumlu ====================
+
+def test_openai_chat_completions_sends_only_openai_fields():
+    seen = {}
+
+    def handler(request):
+        seen["path"] = request.url.path
+        seen["body"] = json.loads(request.content)
+        seen["auth"] = request.headers.get("authorization")
+        return httpx.Response(200, json={"choices": [{"message": {"content": " Cevap "}}]})
+
+    backend = _mock(OpenAICompatBackend("http://api", "gpt", api_key="k"), handler)
+    backend._client.headers.update(backend._headers())
+    assert asyncio.run(backend.generate(_req("soru"))) == "Cevap"
+
+    assert seen["path"] == "/v1/chat/completions"
+    assert seen["auth"] == "Bearer k"
+    assert seen["body"]["messages"] == [{"role": "user", "content": "soru"}]
+    assert seen["body"]["max_tokens"] == 64
+    assert "top_k" not in seen["body"] and "repetition_penalty" not in seen["body"]
+
+
+def test_vllm_batches_prompt_list_and_maps_choices_by_index():
+    seen = {}
+
+    def handler(request):
+        seen["path"] = request.url.path
+        seen["body"] = json.loads(request.content)
+        return httpx.Response(200, json={"choices": [
+            {"index": 1, "text": "ikinci"}, {"index": 0, "text": "birinci"},
+        ]})
+
+    backend = _mock(OpenAICompatBackend("http://vllm/v1", "qwen", batching=True), handler)
+    out = asyncio.run(backend.generate_batch([_req("a"), _req("b")]))
+
+    assert out == ["birinci", "ikinci"]
+    assert seen["path"] == "/v1/completions"
+    assert seen["body"]["prompt"] == ["a", "b"]
+    assert seen["body"]["top_k"] == 40 and seen["body"]["repetition_penalty"] == 1.1
+
+
+# ==================== RequestCoalescer ====================
+
+def _vllm_client(handler, **kw):
+    backend = _mock(OpenAICompatBackend("http://vllm", "qwen", batching=True), handler)
+    return AsyncLLMClient(backend=backend, max_concurrency=2, batch_max=8, batch_window_ms=50, **kw)
+
+
+def test_coalescer_fans_out_one_batch_to_all_callers():
+    calls = []
+
+    def handler(request):
+        prompts = json.loads(request.content)["prompt"]
+        calls.append(prompts)
+        return httpx.Response(200, json={"choices": [
+            {"index": i, "text": f"cevap:{p}"} for i, p in enumerate(prompts)
+        ]})
+
+    async def run():
+        client = _vllm_client(handler)
+        try:
+            return await asyncio.gather(*(client.generate(_req(p)) for p in ("a", "b", "c")))
+        finally:
+            await client.close()
+
+    assert asyncio.run(run()) == ["cevap:a", "cevap:b", "cevap:c"]
+    assert calls == [["a", "b", "c"]]
+
+
+def test_coalescer_groups_by_sampling_options():
+    calls = []
+
+    def handler(request):
+        prompts = json.loads(request.content)["prompt"]
+        calls.append(sorted(prompts))
+        return httpx.Response(200, json={"choices": [{"index": i, "text": p} for i, p in enumerate(prompts)]})
+
+    async def run():
+        client = _vllm_client(handler)
+        try:
+            return await asyncio.gather(
+                client.generate(_req("a")),
+                client.generate(_req("b", {**OPTIONS, "temperature": 0.9})),
+                client.generate(_req("c")),
+            )
+        finally:
+            await client.close()
+
+    assert asyncio.run(run()) == ["a", "b", "c"]
+    assert sorted(calls) == [["a", "c"], ["b"]]
+
+
+def test_coalescer_propagates_backend_errors_to_every_caller():
+    async def run():
+        client = _vllm_client(lambda r: httpx.Response(500, text="boom"))
+        try:
+            return await asyncio.gather(
+                *(client.generate(_req(p)) for p in ("a", "b")), return_exceptions=True
+            )
+        finally:
+            await client.close()
+
+    results = asyncio.run(run())
+    assert len(results) == 2
+    assert all(isinstance(r, RuntimeError) and "500" in str(r) for r in results)
@@ -0,0 +1,50 @@
+import numpy as np
+
+from src.retrieval.passage_slicer import slice_texts
+
+
+class CountingModel:
+    """Her birimi 'kira' geçiyorsa sorgu yönünde, değilse dik bir vektöre gömer."""
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts, normalize_embeddings=True):
+        self.encoded.extend(texts)
+        return np.array([[1.0, 0.0] if "kira" in t.lower() else [0.0, 1.0] for t in texts], dtype=np.float32)
+
+
+def _long_text(n, needle_at):
+    units = [f"Cümle {i} usul ve esasa ilişkin genel bir açıklama içermektedir." for i in range(n)]
+    units[needle_at] = "Kiracının tahliyesine ilişkin kira bedeli uyuşmazlığı burada tartışılmıştır."
+    return " ".join(units)
+
+
+def test_encode_work_is_bounded_per_request():
+    model = CountingModel()
+    texts = [_long_text(400, needle_at=300 + i) for i in range(8)]
+
+    out = slice_texts("kira bedeli tahliye", np.array([1.0, 0.0]), texts, model,
+                      max_chars=600, per_hit=4, budget=10, budget_chars=100_000)
+
+    assert 0 < len(model.encoded) <= 10
+    # sözcük ön seçimi ilgili birimi bütçe dolmadan encode'a sokar
+    assert all("Kiracının tahliyesine" in o for o in out)
+    assert all(len(o) <= 600 for o in out)
+
+
+def test_char_budget_and_lexical_fallback():
+    model = CountingModel()
+    texts = [_long_text(400, needle_at=250)]
+
+    out = slice_texts("kira bedeli tahliye", np.array([1.0, 0.0]), texts, model,
+                      max_chars=600, budget_chars=0)
+
+    assert model.encoded == []
+    assert "Kiracının tahliyesine" in out[0]
+
+
+def test_short_texts_are_untouched():
+    model = CountingModel()
+    assert slice_texts("kira", np.array([1.0, 0.0]), ["kısa metin"], model) == ["kısa metin"]
+    assert model.encoded == []
@@ -0,0 +1,26 @@
+import numpy as np
+
+from src.retrieval.query_cache import QueryVectorCache, encode_query
+from src.retrieval import query_cache
+
+
+class RecordingModel:
+    name = "fake"
+
+    def __init__(self):
+        self.seen = []
+
+    def encode(self, text, normalize_embeddings=True):
+        self.seen.append(text)
+        return np.ones(3, dtype=np.float32)
+
+
+def test_encodes_original_query_and_keys_on_normalized_text(monkeypatch):
+    monkeypatch.setattr(query_cache, "_cache", QueryVectorCache(shelf_path=None))
+    model = RecordingModel()
+
+    encode_query(model, "  TBK 344. Madde kira artışı ")
+    encode_query(model, "tbk 344. madde   kira artışı")
+
+    assert model.seen == ["TBK 344. Madde kira artışı"]
+    assert query_cache._cache.hits == 1
@@ -0,0 +1,169 @@
+import asyncio
+import json
+from contextlib import nullcontext
+from functools import partial
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from src.api.auth.security import get_current_user
+from src.api.rag import routers
+from src.core.deps import get_db
+from src.rag import llm_client
+from src.rag.llm_backends import LLMBackend
+from src.user_input.query_service import RagAnswer
+
+
+class FakeBackend(LLMBackend):
+    name = "fake"
+
+    def __init__(self):
+        super().__init__("http://llm.invalid", "fake-model")
+        self.requests = []
+        self.fail_after = None   # stream: bu kadar parçadan sonra hata
+        self.hang = False        # generate: iptal edilene kadar bekle
+        self.cancelled = False
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def generate(self, req):
+        self.requests.append(req)
+        if self.hang:
+            try:
+                await asyncio.sleep(30)
+            except asyncio.CancelledError:
+                self.cancelled = True
+                raise
+        return "Kiracı tahliye edilemez."
+
+    async def stream(self, req):
+        self.requests.append(req)
+        for i, piece in enumerate(["Kiracı ", "tahliye ", "edilemez."]):
+            if i == self.fail_after:
+                raise RuntimeError("Ollama generate error: model not found")
+            yield piece
+
+
+USER_ID, QUESTION_ID, ANSWER_ID, FEEDBACK_ID = (uuid4() for _ in range(4))
+
+
+@pytest.fixture
+def client(monkeypatch):
+    backend = FakeBackend()
+    monkeypatch.setattr(llm_client, "_llm_client", llm_client.AsyncLLMClient(backend=backend))
+
+    monkeypatch.setattr(routers, "process_user_query", lambda q, timer: (q, None, "legal"))
+    monkeypatch.setattr(routers, "_start_turn", lambda db, req, user, q: ("s-1", SimpleNamespace(id=QUESTION_ID)))
+    monkeypatch.setattr(routers, "_prepare", lambda *a, **kw: RagAnswer(
+        answer=None, route="legal", passages=[{"doc_id": "d1"}], hits=[],
+        retrieval={"fusion": "rrf"}, user_prompt="SORU: kira tahliyesi",
+    ))
+    stored = []
+    monkeypatch.setattr(routers, "add_message", lambda **kw: stored.append(kw) or SimpleNamespace(id=ANSWER_ID))
+    monkeypatch.setattr(routers, "SessionLocal", lambda: nullcontext(None))
+    monkeypatch.setattr(routers.feedback_crud, "create_feedback", lambda db, fb: SimpleNamespace(id=FEEDBACK_ID))
+
+    app = FastAPI()
+    app.include_router(routers.router)
+    app.dependency_overrides[get_db] = lambda: None
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=USER_ID)
+    with TestClient(app) as c:
+        c.backend = backend
+        c.stored = stored
+        yield c
+
+
+def test_ask_generates_through_llm_client(client):
+    r = client.post("/ask", json={"query": "kira tahliyesi"})
+
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["answer"] == "Kiracı tahliye edilemez."
+    assert body["answer_id"] == str(ANSWER_ID) and body["feedback_id"] == str(FEEDBACK_ID)
+    assert "generate" in body["timings"]
+    assert len(client.backend.requests) == 1
+    assert "SORU: kira tahliyesi" in client.backend.requests[0].prompt
+
+
+
+def test_ask_returns_499_and_cancels_generation_on_disconnect(client, monkeypatch):
+    async def disconnected(self):
+        return True
+
+    client.backend.hang = True
+    monkeypatch.setattr(Request, "is_disconnected", disconnected)
+    monkeypatch.setattr(routers, "run_until_disconnect", partial(llm_client.run_until_disconnect, poll_interval=0.01))
+
+    r = client.post("/ask", json={"query": "kira tahliyesi"})
+
+    assert r.status_code == 499
+    assert client.backend.cancelled
+    assert client.stored == []
+
+
+def test_ask_returns_503_when_llm_queue_is_full(client, monkeypatch):
+    llm = llm_client.AsyncLLMClient(backend=client.backend, max_concurrency=1, queue_timeout=0.05)
+    llm._sem = asyncio.Semaphore(0)   # tüm üretim yuvaları dolu
+    monkeypatch.setattr(llm_client, "_llm_client", llm)
+
+    r = client.post("/ask", json={"query": "kira tahliyesi"})
+
+    assert r.status_code == 503
+    assert "kuyruğu" in r.json()["detail"]
+    assert llm.stats["queue_timeouts"] == 1
+    assert client.backend.requests == []
+
+def _events(r):
+    out = []
+    for block in r.text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        out.append((lines["event"], json.loads(lines["data"])))
+    return out
+
+
+def test_ask_stream_emits_cases_tokens_done(client):
+    r = client.post("/ask/stream", json={"query": "kira tahliyesi"})
+
+    assert r.status_code == 200 and r.headers["content-type"].startswith("text/event-stream")
+    events = _events(r)
+    assert [e for e, _ in events] == ["cases", "token", "token", "token", "done"]
+    assert events[0][1]["doc_ids"] == ["d1"] and events[0][1]["question_id"] == str(QUESTION_ID)
+    assert "".join(d["t"] for e, d in events if e == "token") == "Kiracı tahliye edilemez."
+    done = events[-1][1]
+    assert done["answer"] == "Kiracı tahliye edilemez." and done["feedback_id"] == str(FEEDBACK_ID)
+    assert "ttft" in done["timings"]
+    assert client.stored[-1]["meta_info"]["stream"] is True
+
+
+def test_ask_stream_reports_backend_failure_as_error_event(client):
+    client.backend.fail_after = 1
+    r = client.post("/ask/stream", json={"query": "kira tahliyesi"})
+
+    assert r.status_code == 200
+    events = _events(r)
+    assert [e for e, _ in events] == ["cases", "token", "error"]
+    assert "model not found" in events[-1][1]["detail"]
+    assert client.stored == []   # hata durumunda cevap kaydedilmez
+
+
+def test_rule_answer_after_retrieval_records_real_route(client, monkeypatch):
+    monkeypatch.setattr(routers, "_prepare", lambda *a, **kw: RagAnswer(
+        answer="Bu konuda karar bulunamadı.", route="rule", passages=[{"doc_id": "d1"}], hits=[],
+        retrieval={"fusion": "rrf"},
+    ))
+
+    events = _events(client.post("/ask/stream", json={"query": "kira tahliyesi"}))
+    assert [e for e, _ in events] == ["done"]
+    assert client.stored[-1]["meta_info"] == {"route": "rule"}
+
+    r = client.post("/ask", json={"query": "kira tahliyesi"})
+    assert r.status_code == 200 and r.json()["answer"] == "Bu konuda karar bulunamadı."
+    assert client.stored[-1]["meta_info"]["route"] == "rule"
+    assert client.backend.requests == []
@@ -0,0 +1,85 @@
+import numpy as np
+
+from src.retrieval import retrieve_combined as rc
+from src.retrieval.index_schema import FULL_TEXT_FIELD
+from src.retrieval.retrieve_combined import Hit, fuse_hits, hydrate_full_text
+
+
+def _os_hit(doc_id, score):
+    # search_opensearch yalnızca HOT_SOURCE_FIELDS çeker: özet alanları ve tam metin yok
+    payload = {"doc_id": doc_id, "dava_turu": "kira", "sonuc": "ONAMA", "karar_preview": "önizleme"}
+    return Hit(doc_id, score, 1.0, "opensearch", payload, "önizleme", "")
+
+
+def _qd_hit(doc_id, score):
+    payload = {"doc_id": doc_id, "karar_metni_meta": f"{doc_id} tam metin", "karar_preview": "önizleme"}
+    return Hit(doc_id, score, 1.0, "qdrant", payload, "önizleme", f"{doc_id} tam metin",
+               vector=np.ones(4, dtype=np.float32))
+
+
+def test_fuse_hits_merges_payloads_of_both_legs():
+    fused = {h.doc_id: h for h in fuse_hits([_os_hit("d1", 12.0)], [_qd_hit("d1", 0.8), _qd_hit("d2", 0.7)])}
+
+    d1 = fused["d1"]
+    assert d1.payload["dava_turu"] == "kira"
+    assert d1.payload["karar_metni_meta"] == "d1 tam metin"
+    assert d1.text_full == "d1 tam metin"
+    assert d1.vector is not None
+
+
+def test_fused_opensearch_hit_keeps_summary_fields(monkeypatch):
+    calls = []
+
+    class FakeOS:
+        def mget(self, index, body, _source_includes):
+            calls.append(_source_includes)
+            return {"docs": [
+                {"_id": d, "found": True, "_source": {
+                    "karar_metni_raw": f"{d} ham metin", "gerekce": f"{d} gerekçe",
+                    "karar": f"{d} hüküm", "hikaye": f"{d} olay",
+                }} for d in body["ids"]
+            ]}
+
+    monkeypatch.setattr(rc, "call_opensearch", lambda fn: fn(FakeOS()))
+    hits = fuse_hits([_os_hit("d1", 12.0), _os_hit("d3", 9.0)], [_qd_hit("d1", 0.8)])
+
+    assert hydrate_full_text(hits) == 2
+    assert len(calls) == 1
+    by_id = {h.doc_id: h for h in hits}
+    for doc_id in ("d1", "d3"):
+        p = by_id[doc_id].payload
+        assert (p["gerekce"], p["karar"], p["hikaye"]) == (f"{doc_id} gerekçe", f"{doc_id} hüküm", f"{doc_id} olay")
+    # Qdrant'tan gelen tam metin korunur, yalnız OpenSearch'te olan belgeye ham metin yazılır
+    assert by_id["d1"].text_full == "d1 tam metin"
+    assert by_id["d3"].text_full == "d3 ham metin"
+    assert by_id["d3"].payload[FULL_TEXT_FIELD] == "d3 ham metin"
+
+
+def test_opensearch_leg_is_bounded_by_its_deadline(monkeypatch):
+    seen = {}
+
+    class FakeOS:
+        def search(self, index, body, **kw):
+            seen.update(body=body, kw=kw)
+            return {"hits": {"hits": [{"_id": "d1", "_score": 3.0, "_source": {"doc_id": "d1"}}]}}
+
+    monkeypatch.setattr(rc, "call_opensearch", lambda fn: fn(FakeOS()))
+    hits = rc.search_opensearch("kira tespiti", top_k=5, timeout=2.5)
+
+    assert [h.doc_id for h in hits] == ["d1"]
+    assert seen["kw"] == {"request_timeout": 2.5}
+    assert seen["body"]["timeout"] == "2500ms"
+
+
+def test_text_fields_read_schema_constants():
+    from src.rag import prompt_builder
+    from src.retrieval.index_schema import PREVIEW_FIELD, QDRANT_FULL_TEXT_FIELD
+    from src.user_input.query_service import hits_to_passages
+
+    qd = {QDRANT_FULL_TEXT_FIELD: "qdrant metni", PREVIEW_FIELD: "özet"}
+    assert rc._text_fields(qd) == ("özet", "qdrant metni")
+    assert rc._text_fields({FULL_TEXT_FIELD: "ham metin"}) == ("ham metin", "ham metin")
+
+    passages = hits_to_passages([Hit("d1", 1.0, 1.0, "qdrant", dict(qd), "özet", "")])
+    assert passages[0][FULL_TEXT_FIELD] == "qdrant metni" and "karar_metni" not in passages[0]
+    assert prompt_builder._text_fields(passages[0]) == ("özet", "qdrant metni")
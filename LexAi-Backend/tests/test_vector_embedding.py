@@ -0,0 +1,111 @@
+import json
+import threading
+
+import numpy as np
+import pytest
+
+from src.retrieval import vector_embedding as ve
+from src.retrieval.embedding_store import EmbeddingStore, UploadLedger
+
+
+class FakeQdrant:
+    """upsert/delete çağrılarını kaydeder; fail_on_upsert'inci upsert'te hata verir."""
+
+    def __init__(self, fail_on_upsert=None):
+        self.fail_on_upsert = fail_on_upsert
+        self.upserts = []
+        self.deletes = []
+
+    def upsert(self, collection_name, points, wait):
+        if len(self.upserts) + 1 == self.fail_on_upsert:
+            self.fail_on_upsert = None
+            raise ConnectionError("qdrant down")
+        self.upserts.append((collection_name, [p.id for p in points], wait))
+
+    def delete(self, collection_name, points_selector, wait):
+        self.deletes.append(list(points_selector.points))
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    src = tmp_path / "in.jsonl"
+    src.write_text("".join(
+        json.dumps({"doc_id": f"d{i}", "karar_metni": f"karar {i} metni", "dava_turu": "kira"}) + "\n"
+        for i in range(5)
+    ), encoding="utf-8")
+    encoded = []
+
+    def fake_encode(model, recs, idx):   # sahte model: metin uzunluğundan vektör
+        encoded.extend(recs)
+        return np.array([[len(r), idx, 0, 1] for r in recs], dtype=np.float32)
+
+    monkeypatch.setattr(ve, "INPUT_FILE", str(src))
+    monkeypatch.setattr(ve, "STATE_FILE", tmp_path / "state.json")
+    monkeypatch.setattr(ve, "CHUNK_RECORDS", 2)
+    monkeypatch.setattr(ve, "QDRANT_CHUNKED", False)
+    monkeypatch.setattr(ve, "UPSERT_MAX_RETRIES", 1)
+    monkeypatch.setattr(ve, "encode_records", fake_encode)
+    env = type("Env", (), {})()
+    env.tmp, env.src, env.encoded = tmp_path, src, encoded
+    env.store = lambda: EmbeddingStore(tmp_path / "store", "fake", 4)
+    env.ledger = lambda: UploadLedger(tmp_path / "uploaded.jsonl")
+    return env
+
+
+def _uploaded(client):
+    return [pid for _, ids, _ in client.upserts for pid in ids]
+
+
+def test_pipeline_uploads_all_packs_in_order_and_records_state(env):
+    client, ledger = FakeQdrant(), env.ledger()
+    read, enc, up = ve.run_pipeline(None, client, env.store(), ledger, collection="c_v1")
+
+    assert (read.packs, read.records) == (3, 5)
+    assert (enc.packs, up.packs, up.records) == (3, 3, 5)
+    assert len(_uploaded(client)) == 5 and all(w is True and c == "c_v1" for c, _, w in client.upserts)
+    assert set(ledger.by_doc) == {f"d{i}" for i in range(5)}
+    st = json.loads(ve.STATE_FILE.read_text(encoding="utf-8"))
+    assert (st["chunk_idx"], st["next_line_after"], st["collection"]) == (2, 5, "c_v1")
+
+    # ikinci çalıştırma: encode depodan, upsert defterden atlanır
+    env.encoded.clear()
+    again = FakeQdrant()
+    counters = ve.run_pipeline(None, again, env.store(), env.ledger(), collection="c_v1")
+    assert env.encoded == [] and again.upserts == [] and counters[2].records == 0
+
+
+def test_upload_error_stops_pipeline_and_keeps_resume_state_consistent(env):
+    client = FakeQdrant(fail_on_upsert=2)   # ikinci parçanın upsert'i düşer
+    with pytest.raises(ConnectionError, match="qdrant down"):
+        ve.run_pipeline(None, client, env.store(), env.ledger(), collection="c_v1")
+    assert not any(t.name in ("read-stage", "upload-stage") for t in threading.enumerate())
+
+    # yalnız tamamen yüklenen ilk parça kayıtlı
+    st = json.loads(ve.STATE_FILE.read_text(encoding="utf-8"))
+    assert (st["chunk_idx"], st["next_line_after"]) == (0, 2)
+    ledger = env.ledger()
+    assert set(ledger.by_doc) == {"d0", "d1"}
+
+    # kaldığı yerden devam: kalan üç kayıt yüklenir, encode depodan gelir
+    env.encoded.clear()
+    resumed = FakeQdrant()
+    ve.run_pipeline(None, resumed, env.store(), ledger, start_line=st["next_line_after"],
+                    chunk_idx=st["chunk_idx"] + 1, collection="c_v1")
+    assert len(_uploaded(resumed)) == 3
+    assert env.encoded == []   # ilk denemede encode edilip depoya yazılmıştı
+    assert set(ledger.by_doc) == {f"d{i}" for i in range(5)}
+    assert json.loads(ve.STATE_FILE.read_text(encoding="utf-8"))["next_line_after"] == 5
+
+
+def test_reader_error_propagates_and_stops_other_stages(env):
+    with open(env.src, "a", encoding="utf-8") as f:
+        f.write("{bozuk satır\n")
+    client = FakeQdrant()
+
+    with pytest.raises(ValueError):
+        ve.run_pipeline(None, client, env.store(), env.ledger(), collection="c_v1")
+    assert not any(t.name in ("read-stage", "upload-stage") for t in threading.enumerate())
+    # hata öncesi tamamlanan parçalar yüklenmiş olabilir; durum dosyası defterden ileri gitmez
+    done = json.loads(ve.STATE_FILE.read_text(encoding="utf-8"))["next_line_after"] if ve.STATE_FILE.exists() else 0
+    assert done in (0, 2, 4)
+    assert set(env.ledger().by_doc) == {f"d{i}" for i in range(done)}